@@ -48,5 +48,12 @@ async def get_user_profile():
         "username": "demo_user",
         "email": "demo@gramsathi.com",
         "district": "Sample District",
-        "phone": "+91-9876543210"
+        "phone": "+91-9876543210",
+        # Household details used for scheme eligibility
+        "age": 42,
+        "gender": "male",
+        "occupation": "farmer",
+        "land_acres": 2.5,
+        "annual_income": 120000,
+        "social_category": "obc"
     }
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
+import hmac
+import os
+from app.services.catalogue import CatalogueError, catalogues
+
+router = APIRouter()
+
+# Shared secret for triggering a reload; reloading is disabled when unset
+CATALOGUE_ADMIN_TOKEN = os.getenv("CATALOGUE_ADMIN_TOKEN", "")
+
+def describe():
+    snapshot = catalogues.snapshot
+    return {
+        "version": snapshot.version,
+        "loaded_at": snapshot.loaded_at,
+        "reloads": catalogues.reloads,
+        "catalogues": {
+            name: {"file": catalogues.files.get(name), "entries": len(content)}
+            for name, content in snapshot.data.items()
+        },
+    }
+
+@router.get("/")
+async def get_catalogue_versions():
+    """Version of the reference data currently being served"""
+    return describe()
+
+@router.post("/reload")
+async def reload_catalogues(x_admin_token: Optional[str] = Header(None)):
+    """Re-read the catalogue files now instead of waiting for the watcher"""
+    if not CATALOGUE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Catalogue reload is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, CATALOGUE_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    try:
+        changed = await catalogues.reload()
+    except CatalogueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"changed": changed, **describe()}
@@ -1,6 +1,12 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from app.services.catalogue import catalogues
+from app.services.symptom_checker import symptom_checker
+from app.services.telemedicine import CLINIC_TZ, WEEKDAYS, parse_time, telemedicine_scheduler
+from app.storage import get_storage
+from app.utils.cached_response import CATALOGUE_CACHE_CONTROL, cached_endpoint, cached_json_response
 
 router = APIRouter()
 
@@ -9,6 +15,48 @@ class SymptomCheck(BaseModel):
     age: Optional[int] = None
     gender: Optional[str] = None
 
+class SymptomCheckBatch(BaseModel):
+    cases: List[SymptomCheck] = Field(..., max_length=1000)
+
+class Condition(BaseModel):
+    name: str
+    severity: str
+    emergency: bool = False
+    recommendations: List[str]
+    # Symptom -> how strongly it points to this condition
+    weights: Dict[str, float]
+
+class RedFlag(BaseModel):
+    id: str
+    # Every symptom must be present; an empty list would fire for every case
+    symptoms: List[str] = Field(..., min_length=1)
+    condition: str
+    reason: str
+    # Ages in whole years; the flag only applies inside the range
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+
+class SymptomCatalogue(BaseModel):
+    # Canonical symptom -> synonyms, local spellings and Devanagari
+    symptoms: Dict[str, List[str]]
+    conditions: Dict[str, Condition]
+    # Checked in order; the first that fires decides the advice
+    red_flags: List[RedFlag] = []
+
+    @model_validator(mode="after")
+    def check_references(self):
+        unknown = {
+            name
+            for condition in self.conditions.values() for name in condition.weights
+            if name not in self.symptoms
+        } | {name for flag in self.red_flags for name in flag.symptoms if name not in self.symptoms}
+        if unknown:
+            raise ValueError(f"Unknown symptoms: {', '.join(sorted(unknown))}")
+        missing = [flag.condition for flag in self.red_flags if flag.condition not in self.conditions]
+        if missing:
+            raise ValueError(f"Unknown red flag conditions: {', '.join(missing)}")
+        return self
+
 class HealthTip(BaseModel):
     id: str
     title: str
@@ -16,91 +64,54 @@ class HealthTip(BaseModel):
     category: str
     urgency: str
 
-# Mock health tips data
-HEALTH_TIPS = [
-    {
-        "id": "fever-care",
-        "title": "Fever Management",
-        "description": "Keep hydrated, rest well, use cold compress on forehead. Seek medical help if fever exceeds 102°F or persists for more than 3 days.",
-        "category": "general",
-        "urgency": "medium"
-    },
-    {
-        "id": "diarrhea-care",
-        "title": "Diarrhea Treatment",
-        "description": "Drink ORS solution, avoid dairy and spicy foods. Seek immediate medical attention if blood in stool or severe dehydration.",
-        "category": "digestive",
-        "urgency": "high"
-    },
-    {
-        "id": "wound-care",
-        "title": "Wound Care",
-        "description": "Clean with clean water, apply antiseptic, cover with clean bandage. Change dressing daily and watch for signs of infection.",
-        "category": "injury",
-        "urgency": "medium"
-    }
-]
+class Doctor(BaseModel):
+    name: str
+    specialty: str
+    languages: List[str] = []
+    # Weekly roster in clinic local time: {"mon": [["09:00", "13:00"], ...]}
+    hours: Dict[str, List[List[str]]]
+
+    @model_validator(mode="after")
+    def check_hours(self):
+        for day, shifts in self.hours.items():
+            if day not in WEEKDAYS:
+                raise ValueError(f"Unknown weekday {day!r}")
+            for shift in shifts:
+                if len(shift) != 2:
+                    raise ValueError(f"Shift on {day} must be [opens, closes]")
+                opens, closes = (datetime.strptime(t, "%H:%M") for t in shift)
+                if opens >= closes:
+                    raise ValueError(f"Shift on {day} closes before it opens")
+        return self
+
+# Tips are edited in data/health_tips.json and served from the catalogue snapshot
+catalogues.validate_with("health_tips", List[HealthTip])
+catalogues.validate_with("symptom_checker", SymptomCatalogue)
+catalogues.validate_with("doctors", Dict[str, Doctor])
+
+def get_symptom_checker():
+    if symptom_checker.model is None:
+        symptom_checker.build(catalogues.snapshot.data["symptom_checker"])
+    return symptom_checker
 
 @router.post("/symptom-check")
 async def check_symptoms(symptom_data: SymptomCheck):
-    """Basic symptom checker"""
-    symptoms = [s.lower() for s in symptom_data.symptoms]
-    
-    # Simple symptom analysis
-    if any(s in symptoms for s in ["fever", "temperature", "hot"]):
-        return {
-            "condition": "Possible Fever",
-            "severity": "Medium",
-            "recommendations": [
-                "Rest and stay hydrated",
-                "Monitor temperature regularly",
-                "Consult doctor if fever persists or exceeds 102°F"
-            ],
-            "emergency": False
-        }
-    elif any(s in symptoms for s in ["chest pain", "heart pain", "breathing"]):
-        return {
-            "condition": "Possible Cardiac/Respiratory Issue",
-            "severity": "High",
-            "recommendations": [
-                "Seek immediate medical attention",
-                "Call emergency services if severe",
-                "Do not ignore chest pain"
-            ],
-            "emergency": True
-        }
-    elif any(s in symptoms for s in ["headache", "head pain"]):
-        return {
-            "condition": "Headache",
-            "severity": "Low to Medium",
-            "recommendations": [
-                "Rest in a quiet, dark room",
-                "Stay hydrated",
-                "Consider mild pain relief",
-                "Consult doctor if severe or persistent"
-            ],
-            "emergency": False
-        }
-    else:
-        return {
-            "condition": "General Health Concern",
-            "severity": "Unknown",
-            "recommendations": [
-                "Monitor symptoms closely",
-                "Consult healthcare provider for proper diagnosis",
-                "Maintain good hygiene and rest"
-            ],
-            "emergency": False
-        }
+    """Score symptoms against every known condition; red flags always win"""
+    return get_symptom_checker().check(symptom_data.symptoms, symptom_data.age)
+
+@router.post("/symptom-check/batch")
+async def check_symptoms_batch(batch: SymptomCheckBatch):
+    """Check many cases at once, e.g. a day of ASHA worker visits"""
+    results = get_symptom_checker().check_batch([(case.symptoms, case.age) for case in batch.cases])
+    return {"results": [{"index": i, **result} for i, result in enumerate(results)]}
 
 @router.get("/tips", response_model=List[HealthTip])
-async def get_health_tips(category: Optional[str] = None):
+async def get_health_tips(request: Request, category: Optional[str] = None):
     """Get health tips"""
-    if category:
-        return [tip for tip in HEALTH_TIPS if tip["category"] == category]
-    return HEALTH_TIPS
+    return cached_json_response(request, *catalogues.snapshot.body("health_tips", category), CATALOGUE_CACHE_CONTROL)
 
 @router.get("/emergency-contacts")
+@cached_endpoint()
 async def get_emergency_contacts():
     """Get emergency contact numbers"""
     return {
@@ -118,16 +129,66 @@ async def book_consultation(
     patient_name: str,
     phone: str,
     preferred_time: str,
-    symptoms: str
+    symptoms: str,
+    specialty: Optional[str] = None,
+    doctor_id: Optional[str] = None
 ):
-    """Book a telemedicine consultation"""
-    # Mock booking system
-    return {
-        "booking_id": "CONS-2024-001",
-        "status": "confirmed",
-        "patient_name": patient_name,
-        "scheduled_time": preferred_time,
-        "doctor": "Dr. Rajesh Kumar",
-        "consultation_link": "https://meet.gramsathi.com/consultation/CONS-2024-001",
-        "message": "Your consultation has been booked. You will receive a call/video link at the scheduled time."
-    }
+    """Book the telemedicine slot nearest to preferred_time, or join the waitlist"""
+    try:
+        preferred_ts = parse_time(preferred_time)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="preferred_time must be an ISO date and time")
+    if doctor_id and doctor_id not in telemedicine_scheduler.doctors:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    # Nobody could ever take a booking no doctor matches: it would wait forever
+    if specialty and not telemedicine_scheduler.candidates(specialty, doctor_id):
+        raise HTTPException(status_code=404, detail="No doctor with this specialty")
+    booking = await telemedicine_scheduler.book(
+        get_storage(),
+        {"patient_name": patient_name, "phone": phone, "symptoms": symptoms},
+        preferred_ts,
+        specialty=specialty,
+        doctor_id=doctor_id
+    )
+    if booking["status"] == "waitlisted":
+        message = "All doctors are fully booked. You are on the waitlist and will be given the next free slot."
+    else:
+        message = "Your consultation has been booked. You will receive a call/video link at the scheduled time."
+    return {**booking, "message": message}
+
+@router.get("/consultations/{booking_id}")
+async def get_consultation(booking_id: str):
+    """Booking status, including promotion from the waitlist"""
+    booking = await get_storage().get_booking(booking_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Consultation not found")
+    return booking
+
+@router.post("/consultations/{booking_id}/cancel")
+async def cancel_consultation(booking_id: str):
+    """Cancel a booking; its slot goes to the first waitlisted patient"""
+    booking = await telemedicine_scheduler.cancel(get_storage(), booking_id)
+    if booking is None:
+        existing = await get_storage().get_booking(booking_id)
+        if existing is None:
+            raise HTTPException(status_code=404, detail="Consultation not found")
+        raise HTTPException(status_code=409, detail=f"Consultation is already {existing['status']}")
+    return booking
+
+@router.get("/availability")
+async def get_availability(
+    date: Optional[str] = None,
+    days: int = Query(1, ge=1, le=7),
+    specialty: Optional[str] = None,
+    doctor_id: Optional[str] = None
+):
+    """Free consultation slots per doctor, from date (default today) for a number of days"""
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d") if date else datetime.now(CLINIC_TZ)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="date must be YYYY-MM-DD")
+    start = day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=CLINIC_TZ)
+    doctors = telemedicine_scheduler.availability(
+        start.timestamp(), (start + timedelta(days=days)).timestamp(), specialty=specialty, doctor_id=doctor_id
+    )
+    return {"date": start.date().isoformat(), "days": days, "doctors": doctors}
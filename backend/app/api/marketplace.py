@@ -1,8 +1,23 @@
-from fastapi import APIRouter, UploadFile, File
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import os
+import time
 import uuid
 from datetime import datetime
+from app.services.catalogue import catalogues
+from app.services.product_store import SORT_KEYS, InvalidCursorError, encode_cursor, decode_cursor
+from app.services.product_search import product_search
+from app.services.geo import locate, resolve_location
+from app.services.image_store import (
+    MEDIA_TYPES, VARIANTS, ImageTooLargeError, UnsupportedImageError, image_store, is_image_id
+)
+from app.services.product_import import ImportFormatError, import_products as bulk_import
+from app.services.reservations import IdempotencyConflictError, OutOfStockError, reserve
+from app.utils.cached_response import cached_endpoint
+from app.utils.file_response import file_response
+from app.storage import get_storage
+from app.storage.base import ProductExistsError
 
 router = APIRouter()
 
@@ -19,6 +34,8 @@ class Product(BaseModel):
     quantity_available: int
     unit: str
     created_at: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class ProductCreate(BaseModel):
     name: str
@@ -30,79 +47,132 @@ class ProductCreate(BaseModel):
     location: str
     quantity_available: int
     unit: str
+    # Resolved from the district in ``location`` when not given
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
-# Mock products data
-PRODUCTS_DATA = [
-    {
-        "id": "prod-001",
-        "name": "Fresh Tomatoes",
-        "description": "Organic tomatoes grown without pesticides",
-        "price": 40.0,
-        "category": "vegetables",
-        "seller_name": "Ramesh Kumar",
-        "seller_phone": "+91-9876543210",
-        "location": "Village Rampur, District Meerut",
-        "image_url": "/static/images/tomatoes.jpg",
-        "quantity_available": 50,
-        "unit": "kg",
-        "created_at": "2024-01-15T10:30:00"
-    },
-    {
-        "id": "prod-002",
-        "name": "Pure Honey",
-        "description": "Natural honey from local beekeepers",
-        "price": 300.0,
-        "category": "dairy",
-        "seller_name": "Sunita Devi",
-        "seller_phone": "+91-9876543211",
-        "location": "Village Madhavpur, District Mathura",
-        "image_url": "/static/images/honey.jpg",
-        "quantity_available": 20,
-        "unit": "bottle (500ml)",
-        "created_at": "2024-01-14T15:45:00"
-    },
-    {
-        "id": "prod-003",
-        "name": "Handwoven Baskets",
-        "description": "Traditional bamboo baskets for storage",
-        "price": 150.0,
-        "category": "handicrafts",
-        "seller_name": "Mohan Lal",
-        "seller_phone": "+91-9876543212",
-        "location": "Village Bamboo Nagar, District Bareilly",
-        "image_url": "/static/images/baskets.jpg",
-        "quantity_available": 15,
-        "unit": "piece",
-        "created_at": "2024-01-13T09:20:00"
-    }
-]
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
 
-@router.get("/products", response_model=List[Product])
-async def get_all_products(category: Optional[str] = None, location: Optional[str] = None):
-    """Get all products or filter by category/location"""
-    products = PRODUCTS_DATA.copy()
-    
-    if category:
-        products = [p for p in products if p["category"] == category]
-    
-    if location:
-        products = [p for p in products if location.lower() in p["location"].lower()]
-    
-    return products
+class ProductSearchResult(Product):
+    score: float
+
+class NearbyProduct(Product):
+    distance_km: float
+
+class ProductPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+# Page size bounds for product listings
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+PRODUCT_ID_ATTEMPTS = 5
+
+# Seed products come from data/products.json; stock then lives in storage
+catalogues.validate_with("products", List[Product])
+
+@router.get("/products", response_model=ProductPage)
+async def get_all_products(
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    sort: str = "newest",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    """Get a page of products, optionally filtered by category/location"""
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_KEYS)}")
+    projection = None
+    if fields:
+        projection = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in projection if name not in Product.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    storage = get_storage()
+    products, next_key = await storage.page_products(
+        sort, limit, after, category=category, location=location
+    )
+    if projection:
+        items = [{name: product.get(name) for name in projection} for product in products]
+    else:
+        items = products
+    return ProductPage(
+        items=items,
+        next_cursor=encode_cursor(next_key) if next_key else None,
+        total=await storage.count_products(category=category, location=location) if include_total else None
+    )
+
+@router.get("/search", response_model=List[ProductSearchResult])
+async def search_products(
+    q: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Ranked search over product name, description, category and location"""
+    storage = get_storage()
+    ranked = await product_search.search(
+        storage, q, limit, category=category, min_price=min_price, max_price=max_price
+    )
+    scores = dict(ranked)
+    products = await storage.get_products([product_id for product_id, _ in ranked])
+    return [{**product, "score": round(scores[product["id"]], 4)} for product in products]
+
+@router.get("/nearby", response_model=List[NearbyProduct])
+async def nearby_products(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    near: Optional[str] = None,
+    radius_km: Optional[float] = Query(None, gt=0, le=2000),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Products nearest to a point (lat/lon, or a district/city name in ``near``).
+
+    With ``radius_km`` only products within that distance are returned;
+    otherwise the ``limit`` closest ones.
+    """
+    if lat is None or lon is None:
+        if not near:
+            raise HTTPException(status_code=422, detail="Pass lat and lon, or near")
+        coords = resolve_location(near)
+        if coords is None:
+            raise HTTPException(status_code=404, detail=f"Unknown location: {near}")
+        lat, lon = coords
+
+    storage = get_storage()
+    ranked = await product_search.nearby(storage, lat, lon, limit, radius_km=radius_km, category=category)
+    distances = dict(ranked)
+    products = await storage.get_products([product_id for product_id, _ in ranked])
+    return [{**product, "distance_km": round(distances[product["id"]], 1)} for product in products]
 
 @router.get("/products/{product_id}", response_model=Product)
 async def get_product_details(product_id: str):
     """Get details of a specific product"""
-    for product in PRODUCTS_DATA:
-        if product["id"] == product_id:
-            return product
-    return {"error": "Product not found"}
+    product = await get_storage().get_product(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
 
 @router.post("/products", response_model=Product)
 async def create_product(product: ProductCreate):
     """Create a new product listing"""
     new_product = {
-        "id": f"prod-{uuid.uuid4().hex[:6]}",
+        "id": None,
         "name": product.name,
         "description": product.description,
         "price": product.price,
@@ -113,27 +183,117 @@ async def create_product(product: ProductCreate):
         "image_url": None,
         "quantity_available": product.quantity_available,
         "unit": product.unit,
-        "created_at": datetime.now().isoformat()
+        "created_at": datetime.now().isoformat(),
+        "latitude": product.latitude,
+        "longitude": product.longitude
     }
-    
-    PRODUCTS_DATA.append(new_product)
+    locate(new_product)
+
+    storage = get_storage()
+    # Short ids collide eventually; draw another rather than lose the listing
+    for _ in range(PRODUCT_ID_ATTEMPTS):
+        new_product["id"] = f"prod-{uuid.uuid4().hex[:6]}"
+        try:
+            await storage.add_products([new_product])
+            break
+        except ProductExistsError:
+            continue
+    else:
+        raise HTTPException(status_code=503, detail="Could not allocate a product id, please retry")
+    await product_search.sync(storage, force=True)
     return new_product
 
-@router.post("/products/{product_id}/upload-image")
+@router.post("/products/import")
+async def import_products(request: Request, format: Optional[str] = Query(None, pattern="^(csv|ndjson)$")):
+    """Bulk-create listings from a streamed CSV or NDJSON request body.
+
+    Send the file as the raw body (Content-Type text/csv or
+    application/x-ndjson, or pass ``format``). CSV needs a header row with
+    the ProductCreate field names. Valid rows are stored in batches; the
+    response lists the rows that were rejected and why.
+    """
+    fmt = format or IMPORT_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass format")
+
+    storage = get_storage()
+
+    async def index_batch(batch: List[dict]):
+        await product_search.sync(storage, force=True)
+
+    try:
+        return await bulk_import(storage, request.stream(), fmt, ProductCreate, on_batch=index_batch)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/products/{product_id}/upload-image", status_code=202)
 async def upload_product_image(product_id: str, file: UploadFile = File(...)):
-    """Upload image for a product"""
-    # Mock image upload
-    image_url = f"/static/images/{product_id}_{file.filename}"
-    
+    """Upload image for a product; thumbnails are generated in the background"""
+    storage = get_storage()
+    if not await storage.get_product(product_id):
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    try:
+        image_id, _ = await image_store.save(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    image_store.schedule(image_id, retry=True)
+    image_url = f"/api/marketplace/images/{image_id}"
+
     # Update product with image URL
-    for product in PRODUCTS_DATA:
-        if product["id"] == product_id:
-            product["image_url"] = image_url
-            break
-    
-    return {"message": "Image uploaded successfully", "image_url": image_url}
+    await storage.update_product(product_id, image_url=image_url)
+
+    return {
+        "message": "Image uploaded successfully",
+        "image_url": image_url,
+        "job": image_store.status(image_id)
+    }
+
+@router.get("/images/{image_id}/status")
+async def get_image_status(image_id: str):
+    """Thumbnail generation status for an uploaded image"""
+    status = image_store.status(image_id) if is_image_id(image_id) else None
+    if status is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return status
+
+@router.get("/images/{image_id}")
+async def get_image(request: Request, image_id: str, variant: str = "medium"):
+    """Serve an uploaded image or one of its variants (original, medium, thumb)"""
+    if variant != "original" and variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant: {variant}")
+    original = image_store.original_path(image_id) if is_image_id(image_id) else None
+    if original is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if variant != "original":
+        path = image_store.variant_path(image_id, variant)
+        if os.path.exists(path):
+            # Content-addressed, so the bytes behind this URL never change
+            return file_response(
+                request, path, "image/jpeg",
+                etag=f'"{image_id}-{variant}"',
+                cache_control="public, max-age=31536000, immutable"
+            )
+        # Not rendered yet: serve the original without letting it be cached as the variant
+        image_store.schedule(image_id)
+        return file_response(
+            request, original[0], MEDIA_TYPES[original[1]],
+            etag=f'"{image_id}"',
+            cache_control="no-cache"
+        )
+
+    return file_response(
+        request, original[0], MEDIA_TYPES[original[1]],
+        etag=f'"{image_id}"',
+        cache_control="public, max-age=31536000, immutable"
+    )
 
 @router.get("/categories")
+@cached_endpoint()
 async def get_categories():
     """Get all product categories"""
     return {
@@ -147,37 +307,88 @@ async def get_categories():
         ]
     }
 
+def order_response(order: dict) -> dict:
+    return {name: value for name, value in order.items() if name not in ("expires_ts", "idempotency_key")}
+
 @router.post("/checkout")
 async def checkout(
     product_id: str,
-    quantity: int,
-    buyer_name: str,
-    buyer_phone: str,
-    delivery_address: str
+    quantity: int = Query(..., gt=0),
+    buyer_name: str = Query(...),
+    buyer_phone: str = Query(...),
+    delivery_address: str = Query(...),
+    idempotency_key: Optional[str] = Header(None, max_length=128)
 ):
-    """Process checkout for a product"""
+    """Reserve stock for a product; the order must be confirmed before the reservation expires.
+
+    Retrying with the same Idempotency-Key header returns the original order
+    instead of reserving again.
+    """
+    storage = get_storage()
     # Find product
-    product = None
-    for p in PRODUCTS_DATA:
-        if p["id"] == product_id:
-            product = p
-            break
+    product = await storage.get_product(product_id)
     
     if not product:
-        return {"error": "Product not found"}
-    
-    total_amount = product["price"] * quantity
+        raise HTTPException(status_code=404, detail="Product not found")
     
+    buyer = {"buyer_name": buyer_name, "buyer_phone": buyer_phone, "delivery_address": delivery_address}
+    try:
+        order = await reserve(storage, product, quantity, buyer, idempotency_key)
+    except OutOfStockError:
+        # Re-read: the count from before the attempt is stale when others
+        # are checking out at the same time
+        current = await storage.get_product(product_id) or {**product, "quantity_available": 0}
+        raise HTTPException(
+            status_code=409,
+            detail=f"Only {current['quantity_available']} {current['unit']} available"
+        )
+    except IdempotencyConflictError:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different checkout")
+
     return {
-        "order_id": f"ORD-{uuid.uuid4().hex[:8].upper()}",
-        "product_name": product["name"],
-        "quantity": quantity,
-        "unit_price": product["price"],
-        "total_amount": total_amount,
-        "seller_contact": product["seller_phone"],
-        "buyer_name": buyer_name,
-        "buyer_phone": buyer_phone,
-        "delivery_address": delivery_address,
-        "status": "confirmed",
-        "message": "Order placed successfully! Seller will contact you soon."
+        **order_response(order),
+        "message": "Stock reserved! Confirm the order before it expires."
     }
+
+@router.get("/orders/{order_id}")
+async def get_order(order_id: str):
+    """Get an order and its reservation status"""
+    order = await get_storage().get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_response(order)
+
+@router.post("/orders/{order_id}/confirm")
+async def confirm_order(order_id: str):
+    """Confirm a reserved order"""
+    storage = get_storage()
+    order = await storage.confirm_order(order_id, time.time())
+    if order:
+        return {**order_response(order), "message": "Order placed successfully! Seller will contact you soon."}
+
+    order = await storage.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["status"] == "confirmed":
+        # Retried confirmation
+        return {**order_response(order), "message": "Order placed successfully! Seller will contact you soon."}
+    if order["status"] == "reserved":
+        # Past its deadline but not swept yet: release the stock now
+        await storage.expire_orders(time.time())
+        raise HTTPException(status_code=409, detail="Reservation expired")
+    raise HTTPException(status_code=409, detail=f"Order is {order['status']}")
+
+@router.post("/orders/{order_id}/cancel")
+async def cancel_order(order_id: str):
+    """Cancel a reserved order and release its stock"""
+    storage = get_storage()
+    order = await storage.cancel_order(order_id)
+    if order:
+        return order_response(order)
+
+    order = await storage.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["status"] == "cancelled":
+        return order_response(order)
+    raise HTTPException(status_code=409, detail=f"Order is {order['status']}")
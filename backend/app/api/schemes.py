@@ -1,9 +1,40 @@
-from fastapi import APIRouter, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import List, Optional
+from app.api.auth import get_user_profile
+from app.services.catalogue import catalogues
+from app.services.eligibility import eligibility_engine
+from app.services.scheme_intents import scheme_intents
+from app.services.scheme_search import scheme_search
+from app.utils.cached_response import CATALOGUE_CACHE_CONTROL, cached_json_response
 
 router = APIRouter()
 
+class RuleRange(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.min is not None and self.max is not None and self.min > self.max:
+            raise ValueError(f"min {self.min} is above max {self.max}")
+        return self
+
+class EligibilityRules(BaseModel):
+    # A misspelled field would silently match every profile, so unknown keys are refused
+    model_config = ConfigDict(extra="forbid")
+
+    land_acres: Optional[RuleRange] = None
+    annual_income: Optional[RuleRange] = None
+    age: Optional[RuleRange] = None
+    # Accepted values; empty means any
+    gender: List[str] = []
+    districts: List[str] = []
+    social_category: List[str] = []
+    occupation: List[str] = []
+
 class Scheme(BaseModel):
     id: str
     name: str
@@ -13,93 +44,88 @@ class Scheme(BaseModel):
     application_process: str
     documents_required: List[str]
     category: str
+    # Words users ask with; compiled into the chat intent matcher
+    keywords: List[str] = []
+    # Structured approximation of ``eligibility`` used for pre-screening
+    # (format in app.services.eligibility); the department decides finally
+    rules: EligibilityRules = EligibilityRules()
+
+class EligibilityProfile(BaseModel):
+    age: Optional[int] = Field(None, ge=0, le=120)
+    gender: Optional[str] = None
+    annual_income: Optional[float] = Field(None, ge=0)
+    land_acres: Optional[float] = Field(None, ge=0)
+    district: Optional[str] = None
+    social_category: Optional[str] = None
+    occupation: Optional[str] = None
 
-# Mock schemes data
-SCHEMES_DATA = [
-    {
-        "id": "pm-kisan",
-        "name": "PM-KISAN Samman Nidhi",
-        "description": "Direct income support to farmers",
-        "eligibility": "Small and marginal farmers with cultivable land",
-        "benefits": "₹6,000 per year in three installments",
-        "application_process": "Apply online through PM-KISAN portal or visit nearest CSC",
-        "documents_required": ["Aadhaar Card", "Bank Account Details", "Land Records"],
-        "category": "agriculture"
-    },
-    {
-        "id": "ayushman-bharat",
-        "name": "Ayushman Bharat - PMJAY",
-        "description": "Health insurance scheme for poor families",
-        "eligibility": "Families listed in SECC-2011 database",
-        "benefits": "Health cover up to ₹5 lakh per family per year",
-        "application_process": "Visit nearest hospital or health center",
-        "documents_required": ["Aadhaar Card", "Ration Card", "SECC-2011 verification"],
-        "category": "health"
-    },
-    {
-        "id": "mudra-yojana",
-        "name": "Pradhan Mantri MUDRA Yojana",
-        "description": "Micro-finance scheme for small businesses",
-        "eligibility": "Non-corporate, non-farm small/micro enterprises",
-        "benefits": "Loans up to ₹10 lakh without collateral",
-        "application_process": "Apply through banks, NBFCs, or MFIs",
-        "documents_required": ["Business Plan", "Identity Proof", "Address Proof", "Bank Statements"],
-        "category": "business"
-    }
-]
+class EligibilityBatchRequest(BaseModel):
+    profiles: List[EligibilityProfile] = Field(..., max_length=1000)
+    scheme_ids: Optional[List[str]] = None
+
+# Schemes are edited in data/schemes.json and served from the catalogue snapshot
+catalogues.validate_with("schemes", List[Scheme])
 
 @router.get("/", response_model=List[Scheme])
-async def get_all_schemes(category: Optional[str] = Query(None)):
+async def get_all_schemes(request: Request, category: Optional[str] = Query(None)):
     """Get all government schemes or filter by category"""
-    if category:
-        return [scheme for scheme in SCHEMES_DATA if scheme["category"] == category]
-    return SCHEMES_DATA
+    return cached_json_response(request, *catalogues.snapshot.body("schemes", category), CATALOGUE_CACHE_CONTROL)
+
+async def get_eligibility_engine():
+    if eligibility_engine.matrix is None:
+        eligibility_engine.build(catalogues.snapshot.data["schemes"])
+    return eligibility_engine
+
+@router.post("/eligibility")
+async def check_eligibility(profile: Optional[EligibilityProfile] = None):
+    """Schemes a household qualifies for; defaults to the logged-in user's profile"""
+    if profile is None:
+        profile = EligibilityProfile(**{
+            name: value for name, value in (await get_user_profile()).items()
+            if name in EligibilityProfile.model_fields
+        })
+    engine = await get_eligibility_engine()
+    profile_data = profile.model_dump()
+    return {"profile": profile_data, "schemes": engine.eligible_schemes(profile_data)}
+
+@router.post("/eligibility/batch")
+async def check_eligibility_batch(request: EligibilityBatchRequest):
+    """Eligible scheme ids for each of many profiles (optionally only some schemes)"""
+    engine = await get_eligibility_engine()
+    if request.scheme_ids:
+        unknown = [s for s in request.scheme_ids if s not in engine.matrix.position]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown schemes: {', '.join(unknown)}")
+    eligible = engine.eligible_batch([p.model_dump() for p in request.profiles], request.scheme_ids or None)
+    return {"results": [{"index": i, "eligible_schemes": ids} for i, ids in enumerate(eligible)]}
 
 @router.get("/{scheme_id}", response_model=Scheme)
 async def get_scheme_details(scheme_id: str):
     """Get details of a specific scheme"""
-    for scheme in SCHEMES_DATA:
-        if scheme["id"] == scheme_id:
-            return scheme
-    return {"error": "Scheme not found"}
+    scheme = catalogues.snapshot.by_id["schemes"].get(scheme_id)
+    if not scheme:
+        raise HTTPException(status_code=404, detail="Scheme not found")
+    return scheme
 
 @router.post("/search")
-async def search_schemes(query: str):
-    """Search schemes based on query"""
-    results = []
-    query_lower = query.lower()
-    
-    for scheme in SCHEMES_DATA:
-        if (query_lower in scheme["name"].lower() or 
-            query_lower in scheme["description"].lower() or
-            query_lower in scheme["category"].lower()):
-            results.append(scheme)
-    
+async def search_schemes(
+    query: str,
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Ranked search over all scheme text, with synonyms and highlighted snippets"""
+    if not scheme_search.schemes:
+        scheme_search.build(catalogues.snapshot.data["schemes"])
+
+    results = [
+        {**scheme, "score": round(score, 4), "highlights": highlights}
+        for scheme, score, highlights in scheme_search.search(query, limit, category=category)
+    ]
     return {"query": query, "results": results}
 
 @router.post("/chat")
 async def scheme_chat(message: str):
     """Chat interface for scheme queries"""
-    message_lower = message.lower()
-    
-    # Simple keyword-based responses
-    if "farmer" in message_lower or "agriculture" in message_lower:
-        return {
-            "response": "For farmers, I recommend PM-KISAN Samman Nidhi scheme which provides ₹6,000 per year. You can also check Crop Insurance schemes.",
-            "suggested_schemes": ["pm-kisan"]
-        }
-    elif "health" in message_lower or "medical" in message_lower:
-        return {
-            "response": "For health benefits, Ayushman Bharat provides health cover up to ₹5 lakh per family. Check if you're eligible!",
-            "suggested_schemes": ["ayushman-bharat"]
-        }
-    elif "business" in message_lower or "loan" in message_lower:
-        return {
-            "response": "For business loans, MUDRA Yojana offers loans up to ₹10 lakh without collateral for small enterprises.",
-            "suggested_schemes": ["mudra-yojana"]
-        }
-    else:
-        return {
-            "response": "I can help you find government schemes. Try asking about farmer schemes, health benefits, or business loans.",
-            "suggested_schemes": []
-        }
+    if scheme_intents.automaton is None:
+        scheme_intents.build(catalogues.snapshot.data["schemes"])
+    return scheme_intents.reply(message)
@@ -1,23 +1,63 @@
-from fastapi import APIRouter, UploadFile, File
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from pydantic import AfterValidator, BaseModel, Field, model_validator
+from typing import Annotated, Dict, List, Literal, Optional, Union
+from app.services.catalogue import catalogues
+from app.services.crop_suitability import SEASONS, SoilTestError, crop_advisor
+from app.services.image_store import ImageTooLargeError, UnsupportedImageError
+from app.services.soil_vision import (
+    MUNSELL_PATTERN, RETRY_AFTER, NoSoilVisibleError, SoilImageBusyError, soil_image_classifier
+)
+from app.utils.cached_response import CATALOGUE_CACHE_CONTROL, cached_endpoint, cached_json_response
 
 router = APIRouter()
 
 class SoilAnalysis(BaseModel):
     soil_type: str
-    ph_level: Optional[float] = None
-    nitrogen: Optional[str] = None
-    phosphorus: Optional[str] = None
-    potassium: Optional[str] = None
-    organic_matter: Optional[str] = None
+    ph_level: Optional[float] = Field(None, ge=0, le=14)
+    # Available N, P2O5, K2O in kg/ha, or a soil health card rating: low, medium, high
+    nitrogen: Optional[Union[float, str]] = None
+    phosphorus: Optional[Union[float, str]] = None
+    potassium: Optional[Union[float, str]] = None
+    # Organic carbon in %, or low, medium, high
+    organic_matter: Optional[Union[float, str]] = None
+    # Sowing season: kharif, rabi or zaid; any season when left out
+    season: Optional[Literal[SEASONS]] = None
+
+class SoilAnalysisBatch(BaseModel):
+    samples: List[SoilAnalysis] = Field(..., max_length=1000)
+    limit: int = Field(5, ge=1, le=50)
 
 class CropRecommendation(BaseModel):
+    crop_id: str
     crop_name: str
     suitability_score: int
     season: str
     expected_yield: str
     care_instructions: List[str]
+    limiting_factors: List[str]
+
+class Crop(BaseModel):
+    id: str
+    category: str
+    name: str
+    # Optimal pH range, and the limits beyond which the crop fails
+    ph: List[float] = Field(..., min_length=2, max_length=2)
+    ph_limits: List[float] = Field(..., min_length=2, max_length=2)
+    # Recommended N, P2O5, K2O dose in kg/ha
+    npk: List[float] = Field(..., min_length=3, max_length=3)
+    # Soil type -> how well the crop does on it, 0..1
+    soils: Dict[str, float]
+    seasons: List[Literal[SEASONS]] = Field(..., min_length=1)
+    expected_yield: str
+    care_instructions: List[str]
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        if not self.ph_limits[0] <= self.ph[0] <= self.ph[1] <= self.ph_limits[1]:
+            raise ValueError(f"{self.id}: ph must lie within ph_limits")
+        if any(value < 0 for value in self.npk) or any(not 0 <= f <= 1 for f in self.soils.values()):
+            raise ValueError(f"{self.id}: npk must be non-negative and soil factors within 0..1")
+        return self
 
 class FertilizerRecommendation(BaseModel):
     fertilizer_type: str
@@ -25,146 +65,75 @@ class FertilizerRecommendation(BaseModel):
     application_method: str
     timing: str
 
-# Mock soil and crop data
-SOIL_TYPES = {
-    "clay": {
-        "description": "Heavy soil with good water retention but poor drainage",
-        "characteristics": ["High water retention", "Poor drainage", "Rich in nutrients", "Hard when dry"],
-        "suitable_crops": ["rice", "wheat", "sugarcane", "cotton"]
-    },
-    "sandy": {
-        "description": "Light soil with good drainage but low water retention",
-        "characteristics": ["Good drainage", "Low water retention", "Easy to work", "Low nutrient retention"],
-        "suitable_crops": ["millet", "groundnut", "watermelon", "carrot"]
-    },
-    "loamy": {
-        "description": "Ideal soil with balanced properties",
-        "characteristics": ["Balanced drainage", "Good water retention", "Rich in nutrients", "Easy to work"],
-        "suitable_crops": ["tomato", "potato", "corn", "beans", "most vegetables"]
-    },
-    "black": {
-        "description": "Cotton soil with high clay content",
-        "characteristics": ["High clay content", "Rich in lime", "Good for cotton", "Swells when wet"],
-        "suitable_crops": ["cotton", "soybean", "sorghum", "chickpea"]
-    }
-}
-
-CROP_RECOMMENDATIONS = {
-    "clay": [
-        {
-            "crop_name": "Rice",
-            "suitability_score": 95,
-            "season": "Kharif (June-October)",
-            "expected_yield": "4-6 tons per hectare",
-            "care_instructions": [
-                "Maintain water level 2-5 cm",
-                "Apply nitrogen in 3 splits",
-                "Control weeds in early stages",
-                "Harvest when 80% grains are golden"
-            ]
-        },
-        {
-            "crop_name": "Wheat",
-            "suitability_score": 85,
-            "season": "Rabi (November-April)",
-            "expected_yield": "3-5 tons per hectare",
-            "care_instructions": [
-                "Sow in November for best results",
-                "Apply phosphorus at sowing",
-                "Irrigate at critical stages",
-                "Harvest when moisture is 20-25%"
-            ]
-        }
-    ],
-    "sandy": [
-        {
-            "crop_name": "Groundnut",
-            "suitability_score": 90,
-            "season": "Kharif (June-October)",
-            "expected_yield": "2-3 tons per hectare",
-            "care_instructions": [
-                "Ensure good drainage",
-                "Apply gypsum for pod development",
-                "Control leaf spot diseases",
-                "Harvest when pods are mature"
-            ]
-        }
-    ],
-    "loamy": [
-        {
-            "crop_name": "Tomato",
-            "suitability_score": 95,
-            "season": "Year-round with protection",
-            "expected_yield": "40-60 tons per hectare",
-            "care_instructions": [
-                "Provide support for plants",
-                "Regular watering but avoid waterlogging",
-                "Apply balanced fertilizer",
-                "Control pests and diseases regularly"
-            ]
-        }
+class SoilImageProfile(BaseModel):
+    # Typical dry color, e.g. "7.5YR 4/3"
+    munsell: str = Field(pattern=MUNSELL_PATTERN)
+    # 0 for smooth surfaces .. 1 for gritty, grainy ones
+    granularity: float = Field(ge=0, le=1)
+
+class SoilType(BaseModel):
+    name: str
+    description: str
+    characteristics: List[str]
+    suitable_crops: List[str]
+    # Reference for photo analysis; types without one are never detected
+    image_profile: Optional[SoilImageProfile] = None
+
+def has_image_profiles(soil_types: Dict[str, SoilType]) -> Dict[str, SoilType]:
+    if not any(soil.image_profile for soil in soil_types.values()):
+        raise ValueError("At least one soil type needs an image_profile for photo analysis")
+    return soil_types
+
+# Edited in data/soil_types.json and data/crops.json
+catalogues.validate_with("soil_types", Annotated[Dict[str, SoilType], AfterValidator(has_image_profiles)])
+# Every analysis reports a best crop, so the list cannot be empty
+catalogues.validate_with("crops", Annotated[List[Crop], Field(min_length=1)])
+catalogues.add_view("soil_type_list", lambda snapshot: {
+    "soil_types": [
+        {"id": soil_id, "name": soil["name"], "description": soil["description"]}
+        for soil_id, soil in snapshot.data["soil_types"].items()
     ]
-}
+})
+
+def crop_recommendation(entry: dict) -> dict:
+    crop = entry["crop"]
+    return {
+        "crop_id": crop["id"],
+        "crop_name": crop["name"],
+        "suitability_score": entry["score"],
+        "season": crop_advisor.season_label(crop),
+        "expected_yield": crop["expected_yield"],
+        "care_instructions": crop["care_instructions"],
+        "limiting_factors": entry["limiting_factors"]
+    }
+
+def recommend(samples: List[SoilAnalysis], limit: int) -> List[dict]:
+    try:
+        return crop_advisor.recommend_batch([sample.model_dump() for sample in samples], limit)
+    except SoilTestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.post("/analyze")
-async def analyze_soil(soil_data: SoilAnalysis):
-    """Analyze soil and provide recommendations"""
+async def analyze_soil(soil_data: SoilAnalysis, limit: int = Query(5, ge=1, le=50)):
+    """Analyze soil and rank crops by suitability to it"""
     soil_type = soil_data.soil_type.lower()
+    snapshot = catalogues.snapshot
     
-    if soil_type not in SOIL_TYPES:
+    if soil_type not in snapshot.data["soil_types"]:
         return {"error": "Soil type not recognized"}
     
-    soil_info = SOIL_TYPES[soil_type]
-    crop_recommendations = CROP_RECOMMENDATIONS.get(soil_type, [])
-    
-    # Generate fertilizer recommendations based on soil type
-    fertilizer_recommendations = []
-    if soil_type == "sandy":
-        fertilizer_recommendations = [
-            {
-                "fertilizer_type": "Organic Compost",
-                "quantity": "5-10 tons per hectare",
-                "application_method": "Mix with soil before planting",
-                "timing": "Before sowing"
-            },
-            {
-                "fertilizer_type": "NPK (10:26:26)",
-                "quantity": "200-300 kg per hectare",
-                "application_method": "Broadcast and incorporate",
-                "timing": "At sowing"
-            }
-        ]
-    elif soil_type == "clay":
-        fertilizer_recommendations = [
-            {
-                "fertilizer_type": "Organic Matter",
-                "quantity": "3-5 tons per hectare",
-                "application_method": "Mix with soil",
-                "timing": "Before monsoon"
-            },
-            {
-                "fertilizer_type": "Gypsum",
-                "quantity": "500 kg per hectare",
-                "application_method": "Broadcast",
-                "timing": "Before plowing"
-            }
-        ]
-    else:
-        fertilizer_recommendations = [
-            {
-                "fertilizer_type": "Balanced NPK",
-                "quantity": "As per soil test",
-                "application_method": "Based on crop requirement",
-                "timing": "Split application"
-            }
-        ]
+    soil_info = snapshot.data["soil_types"][soil_type]
+    result = recommend([soil_data.model_copy(update={"soil_type": soil_type})], limit)[0]
     
     return {
         "soil_type": soil_type,
         "soil_description": soil_info["description"],
         "characteristics": soil_info["characteristics"],
-        "crop_recommendations": crop_recommendations,
-        "fertilizer_recommendations": fertilizer_recommendations,
+        "soil_test": result["soil_test"],
+        "crop_recommendations": [crop_recommendation(entry) for entry in result["crops"]],
+        "fertilizer_for": result["crops"][0]["crop"]["name"],
+        "nutrient_requirement": result["nutrient_requirement"],
+        "fertilizer_recommendations": result["fertilizer"],
         "general_tips": [
             "Get soil tested every 2-3 years",
             "Maintain soil organic matter",
@@ -173,39 +142,94 @@ async def analyze_soil(soil_data: SoilAnalysis):
         ]
     }
 
+@router.post("/analyze/batch")
+async def analyze_soil_batch(batch: SoilAnalysisBatch):
+    """Rank crops for many soil samples at once"""
+    soil_types = catalogues.snapshot.data["soil_types"]
+    samples = [sample.model_copy(update={"soil_type": sample.soil_type.lower()}) for sample in batch.samples]
+    unknown = [i for i, sample in enumerate(samples) if sample.soil_type not in soil_types]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Soil type not recognized in samples: {unknown}")
+    results = recommend(samples, batch.limit)
+    return {
+        "results": [
+            {
+                "index": i,
+                "crops": [
+                    {"crop_id": entry["crop"]["id"], "crop_name": entry["crop"]["name"],
+                     "suitability_score": entry["score"]}
+                    for entry in result["crops"]
+                ],
+                "fertilizer_for": result["crops"][0]["crop"]["name"],
+                "nutrient_requirement": result["nutrient_requirement"]
+            }
+            for i, result in enumerate(results)
+        ]
+    }
+
+def image_recommendations(reading: dict, soil: dict) -> List[str]:
+    recommendations = []
+    if reading["confidence"] < 50:
+        recommendations.append("Photo was hard to read; retake it of bare soil in daylight for a surer result")
+    if reading["organic_content"] == "Low":
+        recommendations.append("Add compost or farmyard manure to build organic matter")
+    if reading["moisture"] == "Dry":
+        recommendations.append("Soil looks dry; irrigate before sowing")
+    elif reading["moisture"] == "Moist":
+        recommendations.append("Soil looks wet; check drainage before working the field")
+    recommendations.append(f"Suitable crops: {', '.join(soil['suitable_crops'])}")
+    recommendations.append("Confirm with a soil test (pH, NPK) before deciding fertilizer doses")
+    return recommendations
+
 @router.post("/image-analysis")
 async def analyze_soil_image(file: UploadFile = File(...)):
     """Analyze soil from uploaded image"""
-    # Mock image analysis - in real implementation, use AI/ML model
+    try:
+        reading = await soil_image_classifier.analyze(file)
+    except SoilImageBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER)})
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except NoSoilVisibleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    features = reading["features"]
+    soil = catalogues.snapshot.data["soil_types"].get(reading["soil_type"])
+    if soil is None:
+        # Removed by a catalogue reload while the photo was being analyzed
+        raise HTTPException(
+            status_code=503,
+            detail="Soil types were just updated, please retry",
+            headers={"Retry-After": str(RETRY_AFTER)}
+        )
     return {
-        "detected_soil_type": "loamy",
-        "confidence": 85,
+        "detected_soil_type": reading["soil_type"],
+        "soil_name": soil["name"],
+        "confidence": reading["confidence"],
         "analysis": {
-            "color": "Dark brown",
-            "texture": "Medium",
-            "moisture": "Moderate",
-            "organic_content": "Good"
+            "color": reading["color"],
+            "munsell_color": reading["munsell"],
+            "texture": reading["texture"],
+            "moisture": reading["moisture"],
+            "organic_content": reading["organic_content"]
         },
-        "recommendations": [
-            "Soil appears healthy for most crops",
-            "Consider adding organic matter",
-            "Test pH level for optimal results"
-        ]
+        "scores": {soil_id: round(score * 100) for soil_id, score in features["scores"].items()},
+        "dominant_colors": [
+            {"munsell": color["munsell"], "share": round(color["share"], 3)}
+            for color in features["dominant_colors"]
+        ],
+        "recommendations": image_recommendations(reading, soil)
     }
 
 @router.get("/soil-types")
-async def get_soil_types():
+async def get_soil_types(request: Request):
     """Get all supported soil types"""
-    return {
-        "soil_types": [
-            {"id": "clay", "name": "Clay Soil", "description": SOIL_TYPES["clay"]["description"]},
-            {"id": "sandy", "name": "Sandy Soil", "description": SOIL_TYPES["sandy"]["description"]},
-            {"id": "loamy", "name": "Loamy Soil", "description": SOIL_TYPES["loamy"]["description"]},
-            {"id": "black", "name": "Black Soil", "description": SOIL_TYPES["black"]["description"]}
-        ]
-    }
+    return cached_json_response(request, *catalogues.snapshot.body("soil_type_list"), CATALOGUE_CACHE_CONTROL)
 
 @router.get("/crop-calendar/{district}")
+@cached_endpoint()
 async def get_crop_calendar(district: str):
     """Get crop calendar for a district"""
     # Mock crop calendar
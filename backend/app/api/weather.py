@@ -1,9 +1,19 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
-import requests
-from typing import Optional, List
+import asyncio
+import httpx
+from typing import Optional, List, Dict
+from collections import Counter
 import json
+from app.utils.http_client import get_http_client
+from app.utils.cache import TTLCache
+from app.utils.cached_response import cached_endpoint
+from app.utils.circuit_breaker import CircuitBreaker, CallBudget, CircuitOpenError, BudgetExhaustedError
+from app.services.forecast_aggregator import aggregate_forecast
+from app.services.city_index import CITIES, city_index, normalize
+from app.services.weather_alerts import AlertHub, SubscriberLimitError, format_sse
 
 router = APIRouter()
 
@@ -20,6 +30,8 @@ class WeatherResponse(BaseModel):
     visibility: Optional[float] = None
     uv_index: Optional[float] = None
     icon: Optional[str] = None
+    stale: bool = False
+    data_age_seconds: Optional[int] = None
 
 class ForecastDay(BaseModel):
     date: str
@@ -28,39 +40,137 @@ class ForecastDay(BaseModel):
     description: str
     humidity: int
     icon: Optional[str] = None
+    temperature_mean: Optional[float] = None
+    wind_speed_max: Optional[float] = None
+    rain_total: Optional[float] = None
+    rain_probability: Optional[int] = None
 
 class ForecastResponse(BaseModel):
     location: str
     forecast: List[ForecastDay]
+    stale: bool = False
+    data_age_seconds: Optional[int] = None
+
+class BatchWeatherRequest(BaseModel):
+    locations: List[str]
+    include_current: bool = True
+    include_forecast: bool = False
+    days: int = 5
+
+class BatchWeatherItem(BaseModel):
+    location: str
+    current: Optional[WeatherResponse] = None
+    forecast: Optional[ForecastResponse] = None
+    errors: Dict[str, str] = {}
+
+class BatchWeatherResponse(BaseModel):
+    results: List[BatchWeatherItem]
 
 # Indian cities database
-INDIAN_CITIES = [
-    # Major metros
-    "Mumbai", "Delhi", "Bangalore", "Hyderabad", "Chennai", "Kolkata", "Pune", "Ahmedabad",
-    # State capitals
-    "Lucknow", "Jaipur", "Bhopal", "Gandhinagar", "Thiruvananthapuram", "Panaji", "Shimla",
-    "Srinagar", "Jammu", "Chandigarh", "Dehradun", "Ranchi", "Patna", "Raipur", "Bhubaneswar",
-    "Guwahati", "Agartala", "Aizawl", "Kohima", "Itanagar", "Imphal", "Shillong", "Gangtok",
-    # Other major cities
-    "Agra", "Varanasi", "Kanpur", "Nagpur", "Indore", "Thane", "Visakhapatnam", "Vadodara",
-    "Faridabad", "Ghaziabad", "Ludhiana", "Rajkot", "Kochi", "Coimbatore", "Madurai", "Jodhpur",
-    "Gwalior", "Vijayawada", "Mysore", "Salem", "Meerut", "Nashik", "Aurangabad", "Allahabad",
-    "Amritsar", "Bareilly", "Moradabad", "Gurgaon", "Aligarh", "Jalandhar", "Tiruchirappalli",
-    "Bhubaneswar", "Cuttack", "Bikaner", "Udaipur", "Ajmer", "Bhilai", "Durg", "Rourkela"
-]
+INDIAN_CITIES = [city.name for city in CITIES]
+
+# Cached upstream responses; current conditions change faster than forecasts
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", 2048))
+current_weather_cache = TTLCache(
+    "current_weather",
+    ttl=float(os.getenv("WEATHER_CURRENT_TTL", 600)),
+    stale_ttl=float(os.getenv("WEATHER_CURRENT_STALE_TTL", 300)),
+    max_entries=WEATHER_CACHE_MAX_ENTRIES
+)
+forecast_cache = TTLCache(
+    "forecast",
+    ttl=float(os.getenv("WEATHER_FORECAST_TTL", 1800)),
+    stale_ttl=float(os.getenv("WEATHER_FORECAST_STALE_TTL", 900)),
+    max_entries=WEATHER_CACHE_MAX_ENTRIES
+)
+
+# Batch fan-out limits
+WEATHER_BATCH_MAX_LOCATIONS = int(os.getenv("WEATHER_BATCH_MAX_LOCATIONS", 100))
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", 8))
+
+# Alert streams
+WEATHER_ALERT_MAX_LOCATIONS = int(os.getenv("WEATHER_ALERT_MAX_LOCATIONS", 20))
+WEATHER_ALERT_HEARTBEAT = float(os.getenv("WEATHER_ALERT_HEARTBEAT", 15))
+
+# User-facing request counts per location, used to pick cities to pre-warm
+LOCATION_REQUESTS_MAX_TRACKED = 5000
+location_requests: Counter = Counter()
+location_names: Dict[str, str] = {}
+
+# OpenWeatherMap upstream protection: fail fast while it is erroring or slow,
+# and never exceed the plan's per-minute call allowance
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5")
+openweather_breaker = CircuitBreaker(
+    "openweather",
+    budget=CallBudget(int(os.getenv("OPENWEATHER_CALLS_PER_MINUTE", 60))),
+    min_calls=int(os.getenv("OPENWEATHER_BREAKER_MIN_CALLS", 10)),
+    failure_ratio=float(os.getenv("OPENWEATHER_BREAKER_FAILURE_RATIO", 0.5)),
+    slow_call_seconds=float(os.getenv("OPENWEATHER_BREAKER_SLOW_SECONDS", 5)),
+    open_seconds=float(os.getenv("OPENWEATHER_BREAKER_OPEN_SECONDS", 30))
+)
+
+class CitySuggestion(BaseModel):
+    name: str
+    state: str
+    lat: float
+    lon: float
+
+def normalize_location(location: str) -> str:
+    """Cache key form of a location name; aliases share their city's key"""
+    city = city_index.lookup(location)
+    if city is not None:
+        return normalize(city.name)
+    return normalize(location)
+
+async def openweather_get(path: str, params: dict) -> httpx.Response:
+    """GET an OpenWeatherMap endpoint through the circuit breaker"""
+    return await openweather_breaker.call(
+        lambda: get_http_client().get(f"{OPENWEATHER_BASE_URL}/{path}", params=params),
+        # Unknown cities (404) are the caller's problem, not an outage
+        is_failure=lambda response: response.status_code >= 500 or response.status_code == 429
+    )
+
+def location_params(location: str) -> dict:
+    """Upstream query parameters, using coordinates for known cities"""
+    city = city_index.lookup(location)
+    if city is not None:
+        return {"lat": city.lat, "lon": city.lon}
+    return {"q": location}
+
+def record_location_request(location: str):
+    key = normalize_location(location)
+    location_requests[key] += 1
+    city = city_index.lookup(location)
+    location_names.setdefault(key, city.name if city else location.strip())
+    if len(location_requests) > LOCATION_REQUESTS_MAX_TRACKED:
+        # Keep the busiest half so one-off typos do not grow this forever
+        keep = dict(location_requests.most_common(LOCATION_REQUESTS_MAX_TRACKED // 2))
+        location_requests.clear()
+        location_requests.update(keep)
+        for name in list(location_names):
+            if name not in keep:
+                del location_names[name]
+
+def hot_locations(limit: int) -> List[str]:
+    """Most requested locations, busiest first"""
+    return [location_names[key] for key, _ in location_requests.most_common(limit)]
 
 @router.get("/cities")
+@cached_endpoint()
 async def get_indian_cities():
     """Get list of supported Indian cities"""
-    return {"cities": sorted(INDIAN_CITIES)}
+    return {"cities": city_index.sorted_names}
 
-@router.get("/current/{location}", response_model=WeatherResponse)
-async def get_current_weather(location: str):
-    """Get current weather for a location in India"""
+@router.get("/cities/search", response_model=List[CitySuggestion])
+async def search_cities(q: str, limit: int = 10):
+    """Autocomplete Indian city names (prefix, alternate spellings, typos)"""
+    return [city._asdict() for city in city_index.search(q, max(1, min(limit, 50)))]
+
+async def fetch_current_weather(location: str) -> WeatherResponse:
+    """Fetch current weather for a location from OpenWeatherMap"""
     api_key = os.getenv("OPENWEATHER_API_KEY")
 
-    # Add India to location for better accuracy
-    search_location = f"{location},IN" if location in INDIAN_CITIES else location
+    city = city_index.lookup(location)
 
     if not api_key:
         # Return realistic mock data for Indian cities
@@ -80,20 +190,19 @@ async def get_current_weather(location: str):
         )
 
     try:
-        url = "http://api.openweathermap.org/data/2.5/weather"
         params = {
-            "q": search_location,
+            **location_params(location),
             "appid": api_key,
             "units": "metric"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = await openweather_get("weather", params)
         response.raise_for_status()
         data = response.json()
 
         return WeatherResponse(
-            location=data["name"],
-            state=data.get("sys", {}).get("state", ""),
+            location=city.name if city else data["name"],
+            state=city.state if city else data.get("sys", {}).get("state", ""),
             country=data["sys"]["country"],
             temperature=round(data["main"]["temp"], 1),
             feels_like=round(data["main"]["feels_like"], 1),
@@ -105,21 +214,36 @@ async def get_current_weather(location: str):
             uv_index=None,  # UV index requires separate API call
             icon=data["weather"][0]["icon"]
         )
-    except requests.RequestException as e:
+    except (CircuitOpenError, BudgetExhaustedError) as e:
+        print(f"Weather API skipped: {e}")
+        raise HTTPException(status_code=503, detail=f"Weather service temporarily unavailable for {location}")
+    except httpx.HTTPError as e:
         print(f"Weather API error: {e}")
         raise HTTPException(status_code=500, detail=f"Weather service unavailable for {location}")
     except KeyError as e:
         print(f"Weather data parsing error: {e}")
         raise HTTPException(status_code=500, detail="Invalid weather data received")
 
-@router.get("/forecast/{location}", response_model=ForecastResponse)
-async def get_weather_forecast(location: str, days: Optional[int] = 5):
-    """Get weather forecast for a location in India"""
+def forecast_day(day: dict) -> ForecastDay:
+    """Build a ForecastDay from an aggregated daily dict"""
+    return ForecastDay(
+        date=day["date"],
+        temperature_max=round(day["temperature_max"], 1),
+        temperature_min=round(day["temperature_min"], 1),
+        description=day["description"].title(),
+        humidity=round(day["humidity"]),
+        icon=day["icon"],
+        temperature_mean=round(day["temperature_mean"], 1),
+        wind_speed_max=round(day["wind_speed_max"], 1),
+        rain_total=round(day["rain_total"], 1),
+        rain_probability=round(day["rain_probability"])
+    )
+
+async def fetch_weather_forecast(location: str, days: int) -> ForecastResponse:
+    """Fetch weather forecast for a location from OpenWeatherMap"""
     api_key = os.getenv("OPENWEATHER_API_KEY")
 
-    # Limit days to 5 (free tier limit)
-    days = min(days, 5)
-    search_location = f"{location},IN" if location in INDIAN_CITIES else location
+    city = city_index.lookup(location)
 
     if not api_key:
         # Return mock forecast data
@@ -141,58 +265,166 @@ async def get_weather_forecast(location: str, days: Optional[int] = 5):
         return ForecastResponse(location=location, forecast=forecast)
 
     try:
-        url = "http://api.openweathermap.org/data/2.5/forecast"
         params = {
-            "q": search_location,
+            **location_params(location),
             "appid": api_key,
             "units": "metric",
             "cnt": days * 8  # 8 forecasts per day (3-hour intervals)
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = await openweather_get("forecast", params)
         response.raise_for_status()
         data = response.json()
 
-        # Process forecast data (group by day)
-        from datetime import datetime
-        daily_forecasts = {}
-
-        for item in data["list"]:
-            date = datetime.fromtimestamp(item["dt"]).strftime("%Y-%m-%d")
-
-            if date not in daily_forecasts:
-                daily_forecasts[date] = {
-                    "temps": [],
-                    "humidity": [],
-                    "descriptions": [],
-                    "icons": []
-                }
-
-            daily_forecasts[date]["temps"].append(item["main"]["temp"])
-            daily_forecasts[date]["humidity"].append(item["main"]["humidity"])
-            daily_forecasts[date]["descriptions"].append(item["weather"][0]["description"])
-            daily_forecasts[date]["icons"].append(item["weather"][0]["icon"])
-
-        # Create forecast response
-        forecast = []
-        for date, day_data in list(daily_forecasts.items())[:days]:
-            forecast.append(ForecastDay(
-                date=date,
-                temperature_max=round(max(day_data["temps"]), 1),
-                temperature_min=round(min(day_data["temps"]), 1),
-                description=max(set(day_data["descriptions"]), key=day_data["descriptions"].count).title(),
-                humidity=round(sum(day_data["humidity"]) / len(day_data["humidity"])),
-                icon=max(set(day_data["icons"]), key=day_data["icons"].count)
-            ))
+        # Process forecast data (group by local day)
+        forecast = [forecast_day(day) for day in aggregate_forecast(data, days)]
 
         return ForecastResponse(
-            location=data["city"]["name"],
+            location=city.name if city else data["city"]["name"],
             forecast=forecast
         )
 
-    except requests.RequestException as e:
+    except (CircuitOpenError, BudgetExhaustedError) as e:
+        print(f"Forecast API skipped: {e}")
+        raise HTTPException(status_code=503, detail=f"Forecast service temporarily unavailable for {location}")
+    except httpx.HTTPError as e:
         print(f"Forecast API error: {e}")
         raise HTTPException(status_code=500, detail=f"Forecast service unavailable for {location}")
     except KeyError as e:
         print(f"Forecast data parsing error: {e}")
         raise HTTPException(status_code=500, detail="Invalid forecast data received")
+
+async def with_fallback(cache: TTLCache, key, fetch):
+    """Serve from cache; on upstream failure fall back to the last known value"""
+    try:
+        return await cache.get_or_fetch(key, fetch)
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise
+        known = cache.last_known(key)
+        if known is None:
+            raise
+        value, age = known
+        return value.model_copy(update={"stale": True, "data_age_seconds": int(age)})
+
+async def cached_current_weather(location: str, limit: Optional[asyncio.Semaphore] = None) -> WeatherResponse:
+    """Current weather through the cache; ``limit`` bounds upstream calls only"""
+    async def fetch():
+        if limit is None:
+            return await fetch_current_weather(location)
+        async with limit:
+            return await fetch_current_weather(location)
+
+    return await with_fallback(current_weather_cache, normalize_location(location), fetch)
+
+async def cached_weather_forecast(location: str, days: int, limit: Optional[asyncio.Semaphore] = None) -> ForecastResponse:
+    """Weather forecast through the cache; ``limit`` bounds upstream calls only"""
+    async def fetch():
+        if limit is None:
+            return await fetch_weather_forecast(location, days)
+        async with limit:
+            return await fetch_weather_forecast(location, days)
+
+    return await with_fallback(forecast_cache, (normalize_location(location), days), fetch)
+
+@router.get("/current/{location}", response_model=WeatherResponse)
+async def get_current_weather(location: str):
+    """Get current weather for a location in India"""
+    record_location_request(location)
+    return await cached_current_weather(location)
+
+@router.get("/forecast/{location}", response_model=ForecastResponse)
+async def get_weather_forecast(location: str, days: Optional[int] = 5):
+    """Get weather forecast for a location in India"""
+    # Limit days to 5 (free tier limit)
+    days = min(days, 5)
+    record_location_request(location)
+    return await cached_weather_forecast(location, days)
+
+# One poller per watched location, shared by every subscriber
+alert_hub = AlertHub(fetch=cached_current_weather, key=normalize_location)
+
+@router.get("/alerts/stream")
+async def stream_weather_alerts(locations: str):
+    """Server-sent events with rain/heat/wind alerts for comma separated locations"""
+    names = [name.strip() for name in locations.split(",") if name.strip()]
+    if not names:
+        raise HTTPException(status_code=400, detail="No locations given")
+    if len(names) > WEATHER_ALERT_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {WEATHER_ALERT_MAX_LOCATIONS} locations per stream"
+        )
+    try:
+        subscription = alert_hub.subscribe(names)
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), WEATHER_ALERT_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            alert_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _error_detail(error: Exception) -> str:
+    if isinstance(error, HTTPException):
+        return str(error.detail)
+    return "Weather service unavailable"
+
+@router.post("/batch", response_model=BatchWeatherResponse)
+async def get_batch_weather(batch: BatchWeatherRequest):
+    """Get current weather and/or forecasts for many locations at once"""
+    # De-duplicate while keeping the caller's order
+    unique = {}
+    for location in batch.locations:
+        if location.strip():
+            unique.setdefault(normalize_location(location), location.strip())
+    locations = list(unique.values())
+    if len(locations) > WEATHER_BATCH_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {WEATHER_BATCH_MAX_LOCATIONS} locations per batch"
+        )
+    days = max(1, min(batch.days, 5))
+    limit = asyncio.Semaphore(WEATHER_BATCH_CONCURRENCY)
+
+    async def load(location: str) -> BatchWeatherItem:
+        item = BatchWeatherItem(location=location)
+        jobs = {}
+        if batch.include_current:
+            jobs["current"] = cached_current_weather(location, limit)
+        if batch.include_forecast:
+            jobs["forecast"] = cached_weather_forecast(location, days, limit)
+        outcomes = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for kind, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                item.errors[kind] = _error_detail(outcome)
+            else:
+                setattr(item, kind, outcome)
+        return item
+
+    results = await asyncio.gather(*(load(location) for location in locations))
+    return BatchWeatherResponse(results=results)
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get weather cache hit/miss counters and upstream circuit state"""
+    return {
+        "current": current_weather_cache.stats(),
+        "forecast": forecast_cache.stats(),
+        "upstream": openweather_breaker.stats(),
+        "alerts": alert_hub.stats()
+    }
@@ -0,0 +1 @@
+# Business logic services
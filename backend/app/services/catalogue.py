@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+
+from app.utils.cached_response import dump_json, strong_etag
+
+try:
+    import yaml
+except ImportError:  # YAML catalogues are optional; JSON needs nothing extra
+    yaml = None
+
+# Reference data edited by the content (and clinical) team, one file per catalogue:
+# <CATALOGUE_DIR>/<name>.json, .yaml or .yml; backend/data unless overridden,
+# so the app starts from any working directory
+CATALOGUE_DIR = os.getenv(
+    "CATALOGUE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data")
+)
+# Seconds between checks for edited files; 0 turns the watcher off
+CATALOGUE_WATCH_INTERVAL = float(os.getenv("CATALOGUE_WATCH_INTERVAL", 10))
+
+# "records" catalogues are lists of dicts with an id and a category;
+# "mapping" catalogues are objects keyed by id
+CATALOGUES = {
+    "schemes": "records",
+    "health_tips": "records",
+    "products": "records",
+    "soil_types": "mapping",
+    "crops": "records",
+    "symptom_checker": "mapping",
+    "doctors": "mapping",
+}
+EXTENSIONS = (".json", ".yaml", ".yml")
+
+
+class CatalogueError(Exception):
+    pass
+
+
+def _parse(path: str, raw: bytes) -> Any:
+    if path.endswith(".json"):
+        return json.loads(raw)
+    if yaml is None:
+        raise CatalogueError(f"{os.path.basename(path)}: install PyYAML to load YAML catalogues")
+    return yaml.safe_load(raw)
+
+
+class CatalogueSnapshot:
+    """One immutable, fully prepared version of every catalogue.
+
+    Lookups by id and category and the JSON bodies of the list endpoints
+    are computed once here, so requests only pick out bytes. Readers keep
+    whichever snapshot they started with; a reload builds a new one.
+    """
+
+    def __init__(self, data: Dict[str, Any], version: str, views: Dict[str, Callable[["CatalogueSnapshot"], Any]]):
+        self.data = data
+        self.version = version
+        self.loaded_at = time.time()
+        self.by_id: Dict[str, Dict[str, dict]] = {}
+        self.by_category: Dict[str, Dict[str, List[dict]]] = {}
+        self._bodies: Dict[Tuple[str, Optional[str]], Tuple[bytes, str]] = {}
+
+        for name, kind in CATALOGUES.items():
+            if kind != "records":
+                continue
+            records = data[name]
+            self.by_id[name] = {record["id"]: record for record in records}
+            groups: Dict[str, List[dict]] = {}
+            for record in records:
+                groups.setdefault(record["category"], []).append(record)
+            self.by_category[name] = groups
+            self._store(name, None, records)
+            for category, group in groups.items():
+                self._store(name, category, group)
+        for name, build in views.items():
+            self._store(name, None, build(self))
+        self._empty = self._body([])
+
+    @staticmethod
+    def _body(content: Any) -> Tuple[bytes, str]:
+        body = dump_json(content)
+        return body, strong_etag(body)
+
+    def _store(self, name: str, key: Optional[str], content: Any):
+        self._bodies[(name, key)] = self._body(content)
+
+    def body(self, name: str, key: Optional[str] = None) -> Tuple[bytes, str]:
+        """(JSON bytes, ETag) of a catalogue or view; an empty list for unknown keys"""
+        return self._bodies.get((name, key), self._empty)
+
+
+class CatalogueStore:
+    """Loads catalogue files and swaps in new snapshots when they change.
+
+    Validation, and everything listeners build from a snapshot, happens
+    before the swap, so a broken edit is reported and the previous
+    snapshot (and what was built from it) keeps serving.
+    """
+
+    def __init__(self, directory: str = CATALOGUE_DIR):
+        self.directory = os.path.abspath(directory)
+        self.snapshot: Optional[CatalogueSnapshot] = None
+        self.files: Dict[str, str] = {}
+        self.reloads = 0
+        self._schemas: Dict[str, TypeAdapter] = {}
+        self._views: Dict[str, Callable[[CatalogueSnapshot], Any]] = {}
+        self._listeners: List[Callable[[CatalogueSnapshot], Awaitable[Callable[[], None]]]] = []
+        self._stamp: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def validate_with(self, name: str, schema: Any):
+        """Check (and normalize) a catalogue against a Pydantic type on every load"""
+        self._schemas[name] = TypeAdapter(schema)
+
+    def add_view(self, name: str, build: Callable[[CatalogueSnapshot], Any]):
+        """Precompute another response body from each snapshot"""
+        self._views[name] = build
+
+    def on_reload(self, prepare: Callable[[CatalogueSnapshot], Awaitable[Callable[[], None]]]):
+        """Build derived state with every new snapshot.
+
+        ``prepare`` builds from the snapshot without changing what is
+        served and returns an ``install`` callable; installs run together
+        with the swap, and only once every ``prepare`` succeeded.
+        """
+        self._listeners.append(prepare)
+
+    def _path(self, name: str) -> str:
+        for extension in EXTENSIONS:
+            path = os.path.join(self.directory, name + extension)
+            if os.path.exists(path):
+                return path
+        raise CatalogueError(f"No {name} catalogue in {self.directory}")
+
+    def _stat(self) -> tuple:
+        stamp = []
+        for name in CATALOGUES:
+            try:
+                stat = os.stat(self._path(name))
+                stamp.append((name, stat.st_mtime_ns, stat.st_size))
+            except (CatalogueError, OSError):
+                stamp.append((name, None, None))
+        return tuple(stamp)
+
+    def read(self) -> CatalogueSnapshot:
+        """Build a snapshot from the files on disk"""
+        digest = hashlib.sha256()
+        data: Dict[str, Any] = {}
+        files: Dict[str, str] = {}
+        for name, kind in CATALOGUES.items():
+            path = self._path(name)
+            with open(path, "rb") as f:
+                raw = f.read()
+            digest.update(name.encode() + b"\0" + raw + b"\0")
+            try:
+                content = _parse(path, raw)
+                if name in self._schemas:
+                    schema = self._schemas[name]
+                    content = schema.dump_python(schema.validate_python(content), mode="json")
+            except (ValueError, ValidationError) as e:
+                raise CatalogueError(f"{os.path.basename(path)}: {e}") from e
+            if kind == "records":
+                if not isinstance(content, list) or not all(
+                    isinstance(record, dict) and "id" in record and "category" in record for record in content
+                ):
+                    raise CatalogueError(f"{os.path.basename(path)}: expected a list of records with id and category")
+                ids = [record["id"] for record in content]
+                if len(set(ids)) != len(ids):
+                    raise CatalogueError(f"{os.path.basename(path)}: duplicate ids")
+            elif not isinstance(content, dict):
+                raise CatalogueError(f"{os.path.basename(path)}: expected an object")
+            data[name] = content
+            files[name] = path
+        try:
+            snapshot = CatalogueSnapshot(data, digest.hexdigest()[:16], self._views)
+        except (KeyError, TypeError, ValueError) as e:
+            raise CatalogueError(f"Could not prepare catalogue responses: {e!r}") from e
+        self.files = files
+        return snapshot
+
+    def load(self) -> CatalogueSnapshot:
+        """Read the files without notifying listeners; errors are raised"""
+        self._stamp = self._stat()
+        self.snapshot = self.read()
+        return self.snapshot
+
+    async def open(self) -> CatalogueSnapshot:
+        """Load at startup; errors are raised so a bad deploy fails fast"""
+        self._stamp = self._stat()
+        await self._swap(self.read())
+        return self.snapshot
+
+    async def _swap(self, snapshot: CatalogueSnapshot):
+        try:
+            installs = [await prepare(snapshot) for prepare in self._listeners]
+        except Exception as e:
+            raise CatalogueError(f"Could not build from catalogue version {snapshot.version}: {e!r}") from e
+        # No await from here on: requests see the old or the new snapshot
+        # and structures, never a mix
+        self.snapshot = snapshot
+        for install in installs:
+            install()
+
+    async def reload(self) -> bool:
+        """Re-read the files; True if a different version was swapped in"""
+        async with self._lock:
+            snapshot = await run_in_threadpool(self.read)
+            if self.snapshot is not None and snapshot.version == self.snapshot.version:
+                return False
+            await self._swap(snapshot)
+            self.reloads += 1
+            return True
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(CATALOGUE_WATCH_INTERVAL)
+            try:
+                stamp = await run_in_threadpool(self._stat)
+                if stamp != self._stamp:
+                    # Remember it even if the reload fails, so a broken file
+                    # is reported once rather than on every check
+                    self._stamp = stamp
+                    if await self.reload():
+                        print(f"Catalogues reloaded, version {self.snapshot.version}")
+            except Exception as e:
+                print(f"Catalogue reload failed, keeping version {self.snapshot.version}: {e}")
+
+    def start(self):
+        if self._task is None and CATALOGUE_WATCH_INTERVAL > 0:
+            self._task = asyncio.create_task(self.watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+catalogues = CatalogueStore()
@@ -0,0 +1,177 @@
+import difflib
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional
+
+
+class City(NamedTuple):
+    name: str
+    state: str
+    lat: float
+    lon: float
+
+
+# Supported Indian cities with coordinates, so upstream weather queries can
+# use lat/lon instead of free-text lookups
+CITIES = [
+    # Major metros
+    City("Mumbai", "Maharashtra", 19.076, 72.8777),
+    City("Delhi", "Delhi", 28.6139, 77.209),
+    City("Bangalore", "Karnataka", 12.9716, 77.5946),
+    City("Hyderabad", "Telangana", 17.385, 78.4867),
+    City("Chennai", "Tamil Nadu", 13.0827, 80.2707),
+    City("Kolkata", "West Bengal", 22.5726, 88.3639),
+    City("Pune", "Maharashtra", 18.5204, 73.8567),
+    City("Ahmedabad", "Gujarat", 23.0225, 72.5714),
+    # State capitals
+    City("Lucknow", "Uttar Pradesh", 26.8467, 80.9462),
+    City("Jaipur", "Rajasthan", 26.9124, 75.7873),
+    City("Bhopal", "Madhya Pradesh", 23.2599, 77.4126),
+    City("Gandhinagar", "Gujarat", 23.2156, 72.6369),
+    City("Thiruvananthapuram", "Kerala", 8.5241, 76.9366),
+    City("Panaji", "Goa", 15.4909, 73.8278),
+    City("Shimla", "Himachal Pradesh", 31.1048, 77.1734),
+    City("Srinagar", "Jammu and Kashmir", 34.0837, 74.7973),
+    City("Jammu", "Jammu and Kashmir", 32.7266, 74.857),
+    City("Chandigarh", "Chandigarh", 30.7333, 76.7794),
+    City("Dehradun", "Uttarakhand", 30.3165, 78.0322),
+    City("Ranchi", "Jharkhand", 23.3441, 85.3096),
+    City("Patna", "Bihar", 25.5941, 85.1376),
+    City("Raipur", "Chhattisgarh", 21.2514, 81.6296),
+    City("Bhubaneswar", "Odisha", 20.2961, 85.8245),
+    City("Guwahati", "Assam", 26.1445, 91.7362),
+    City("Agartala", "Tripura", 23.8315, 91.2868),
+    City("Aizawl", "Mizoram", 23.7271, 92.7176),
+    City("Kohima", "Nagaland", 25.6751, 94.1086),
+    City("Itanagar", "Arunachal Pradesh", 27.0844, 93.6053),
+    City("Imphal", "Manipur", 24.817, 93.9368),
+    City("Shillong", "Meghalaya", 25.5788, 91.8933),
+    City("Gangtok", "Sikkim", 27.3389, 88.6065),
+    # Other major cities
+    City("Agra", "Uttar Pradesh", 27.1767, 78.0081),
+    City("Varanasi", "Uttar Pradesh", 25.3176, 82.9739),
+    City("Kanpur", "Uttar Pradesh", 26.4499, 80.3319),
+    City("Nagpur", "Maharashtra", 21.1458, 79.0882),
+    City("Indore", "Madhya Pradesh", 22.7196, 75.8577),
+    City("Thane", "Maharashtra", 19.2183, 72.9781),
+    City("Visakhapatnam", "Andhra Pradesh", 17.6868, 83.2185),
+    City("Vadodara", "Gujarat", 22.3072, 73.1812),
+    City("Faridabad", "Haryana", 28.4089, 77.3178),
+    City("Ghaziabad", "Uttar Pradesh", 28.6692, 77.4538),
+    City("Ludhiana", "Punjab", 30.901, 75.8573),
+    City("Rajkot", "Gujarat", 22.3039, 70.8022),
+    City("Kochi", "Kerala", 9.9312, 76.2673),
+    City("Coimbatore", "Tamil Nadu", 11.0168, 76.9558),
+    City("Madurai", "Tamil Nadu", 9.9252, 78.1198),
+    City("Jodhpur", "Rajasthan", 26.2389, 73.0243),
+    City("Gwalior", "Madhya Pradesh", 26.2183, 78.1828),
+    City("Vijayawada", "Andhra Pradesh", 16.5062, 80.648),
+    City("Mysore", "Karnataka", 12.2958, 76.6394),
+    City("Salem", "Tamil Nadu", 11.6643, 78.146),
+    City("Meerut", "Uttar Pradesh", 28.9845, 77.7064),
+    City("Nashik", "Maharashtra", 19.9975, 73.7898),
+    City("Aurangabad", "Maharashtra", 19.8762, 75.3433),
+    City("Allahabad", "Uttar Pradesh", 25.4358, 81.8463),
+    City("Amritsar", "Punjab", 31.634, 74.8723),
+    City("Bareilly", "Uttar Pradesh", 28.367, 79.4304),
+    City("Moradabad", "Uttar Pradesh", 28.8386, 78.7733),
+    City("Gurgaon", "Haryana", 28.4595, 77.0266),
+    City("Aligarh", "Uttar Pradesh", 27.8974, 78.088),
+    City("Jalandhar", "Punjab", 31.326, 75.5762),
+    City("Tiruchirappalli", "Tamil Nadu", 10.7905, 78.7047),
+    City("Cuttack", "Odisha", 20.4625, 85.883),
+    City("Bikaner", "Rajasthan", 28.0229, 73.3119),
+    City("Udaipur", "Rajasthan", 24.5854, 73.7125),
+    City("Ajmer", "Rajasthan", 26.4499, 74.6399),
+    City("Bhilai", "Chhattisgarh", 21.1938, 81.3509),
+    City("Durg", "Chhattisgarh", 21.1904, 81.2849),
+    City("Rourkela", "Odisha", 22.2604, 84.8536),
+]
+
+# Official renames and common alternate spellings
+ALIASES = {
+    "Mumbai": ["Bombay"],
+    "Delhi": ["New Delhi", "Dilli"],
+    "Bangalore": ["Bengaluru"],
+    "Chennai": ["Madras"],
+    "Kolkata": ["Calcutta"],
+    "Pune": ["Poona"],
+    "Thiruvananthapuram": ["Trivandrum"],
+    "Panaji": ["Panjim"],
+    "Shimla": ["Simla"],
+    "Guwahati": ["Gauhati"],
+    "Varanasi": ["Banaras", "Benares", "Kashi"],
+    "Kanpur": ["Cawnpore"],
+    "Visakhapatnam": ["Vizag", "Vishakhapatnam"],
+    "Vadodara": ["Baroda"],
+    "Kochi": ["Cochin"],
+    "Mysore": ["Mysuru"],
+    "Allahabad": ["Prayagraj"],
+    "Gurgaon": ["Gurugram"],
+    "Tiruchirappalli": ["Trichy", "Tiruchi"],
+    "Aurangabad": ["Chhatrapati Sambhajinagar"],
+    "Bhubaneswar": ["Bhubaneshwar"],
+}
+
+
+def normalize(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a place name"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = "".join(ch if ch.isalnum() else " " for ch in text.lower())
+    return " ".join(text.split())
+
+
+class CityIndex:
+    """Normalized lookup and prefix/fuzzy autocomplete over CITIES"""
+
+    def __init__(self, cities: List[City], aliases: Dict[str, List[str]]):
+        self.cities = cities
+        self.sorted_names = sorted(city.name for city in cities)
+        by_name = {city.name: city for city in cities}
+        self._by_key: Dict[str, City] = {}
+        for city in cities:
+            self._by_key[normalize(city.name)] = city
+        for name, alternates in aliases.items():
+            if name not in by_name:
+                continue
+            for alternate in alternates:
+                self._by_key.setdefault(normalize(alternate), by_name[name])
+        # Sorted keys for bisect-based prefix search
+        self._keys: List[str] = sorted(self._by_key)
+
+    def lookup(self, location: str) -> Optional[City]:
+        """Exact lookup by name or alias, ignoring case and accents"""
+        key = normalize(location)
+        city = self._by_key.get(key)
+        if city is None and "," in location:
+            # "Meerut, UP" / "Pune,IN"
+            city = self._by_key.get(normalize(location.split(",")[0]))
+        return city
+
+    def search(self, query: str, limit: int = 10) -> List[City]:
+        """Prefix matches first, then close fuzzy matches"""
+        key = normalize(query)
+        if not key:
+            return []
+        matches: List[City] = []
+
+        def add(city: City):
+            if city not in matches:
+                matches.append(city)
+
+        start = bisect_left(self._keys, key)
+        for candidate in self._keys[start:]:
+            if not candidate.startswith(key) or len(matches) >= limit:
+                break
+            add(self._by_key[candidate])
+
+        if len(matches) < limit:
+            for candidate in difflib.get_close_matches(key, self._keys, n=limit, cutoff=0.75):
+                if len(matches) >= limit:
+                    break
+                add(self._by_key[candidate])
+        return matches
+
+
+city_index = CityIndex(CITIES, ALIASES)
@@ -0,0 +1,291 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+NUTRIENTS = ("nitrogen", "phosphorus", "potassium")
+SEASONS = ("kharif", "rabi", "zaid")
+SEASON_LABELS = {
+    "kharif": "Kharif (June-October)",
+    "rabi": "Rabi (November-April)",
+    "zaid": "Zaid (March-June)",
+}
+
+# Soil health card ratings of available N, P2O5 and K2O (kg/ha):
+# low below the first row, high from the second
+LOW_BELOW = np.array([280.0, 23.0, 141.0])
+HIGH_FROM = np.array([560.0, 56.0, 336.0])
+# Level assumed for a nutrient reported only as a rating
+RATING_LEVELS = {
+    "low": LOW_BELOW * 0.7,
+    "medium": (LOW_BELOW + HIGH_FROM) / 2,
+    "high": HIGH_FROM * 1.25,
+}
+# Organic carbon (%) ratings; nitrogen is estimated from it when untested
+ORGANIC_CARBON = {"low": 0.35, "medium": 0.62, "high": 0.9}
+OC_LOW_BELOW, OC_HIGH_FROM = 0.5, 0.75
+
+# Score multiplier for a soil texture a crop does not list, and for sowing
+# outside the crop's seasons
+OTHER_SOIL = 0.3
+OFF_SEASON = 0.25
+# Nutrient shortfalls are fixed with fertilizer, so they cost at most this
+# share of the score, unlike pH, texture or season
+NUTRIENT_WEIGHT = 0.3
+# Recommended dose is raised this much on low-testing soil and cut as much
+# on high-testing soil (soil test based fertilizer adjustment)
+DOSE_ADJUSTMENT = 0.25
+
+# Nutrient content of the straight fertilizers doses are given in
+UREA_N, DAP_N, DAP_P2O5, MOP_K2O = 0.46, 0.18, 0.46, 0.60
+
+
+class SoilTestError(Exception):
+    pass
+
+
+def _reading(value, field: str) -> Optional[str]:
+    """A rating (low, medium, high) or a non-negative number as text; None if blank"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in RATING_LEVELS:
+            return text
+        try:
+            number = float(text)
+        except ValueError:
+            raise SoilTestError(f"{field} must be a number or one of low, medium, high")
+    else:
+        number = float(value)
+    if not np.isfinite(number) or number < 0:
+        raise SoilTestError(f"{field} must be a non-negative number or one of low, medium, high")
+    return str(number)
+
+
+def nutrient_levels(samples: List[dict]) -> np.ndarray:
+    """samples x (N, P2O5, K2O) available kg/ha; NaN where unknown"""
+    levels = np.full((len(samples), len(NUTRIENTS)), np.nan)
+    for row, sample in enumerate(samples):
+        for k, field in enumerate(NUTRIENTS):
+            reading = _reading(sample.get(field), field)
+            if reading is not None:
+                levels[row, k] = RATING_LEVELS[reading][k] if reading in RATING_LEVELS else float(reading)
+        organic = _reading(sample.get("organic_matter"), "organic_matter")
+        if np.isnan(levels[row, 0]) and organic is not None:
+            carbon = ORGANIC_CARBON.get(organic) or float(organic)
+            levels[row, 0] = np.interp(carbon, [OC_LOW_BELOW / 2, OC_LOW_BELOW, OC_HIGH_FROM, OC_HIGH_FROM * 1.5],
+                                       [LOW_BELOW[0] / 2, LOW_BELOW[0], HIGH_FROM[0], HIGH_FROM[0] * 1.25])
+    return levels
+
+
+def organic_carbon(sample: dict) -> Optional[float]:
+    organic = _reading(sample.get("organic_matter"), "organic_matter")
+    if organic is None:
+        return None
+    return ORGANIC_CARBON.get(organic) or float(organic)
+
+
+def rating(level: float, k: int) -> Optional[str]:
+    if np.isnan(level):
+        return None
+    return "low" if level < LOW_BELOW[k] else "high" if level >= HIGH_FROM[k] else "medium"
+
+
+class CropTable:
+    """Crop requirements compiled into per-crop column arrays.
+
+    Each factor of the score (pH, texture, season, nutrients) is a
+    broadcast over a samples x crops grid, so scoring many samples against
+    hundreds of crops is a few array operations rather than a loop per
+    crop. The nutrient penalty is one samples x 3 by 3 x crops product.
+    """
+
+    def __init__(self, crops: List[dict], soil_types: List[str]):
+        self.crops = crops
+        self.ids = [crop["id"] for crop in crops]
+        self.ph = np.array([crop["ph"] for crop in crops], dtype=float).reshape(-1, 2)
+        self.ph_limits = np.array([crop["ph_limits"] for crop in crops], dtype=float).reshape(-1, 2)
+        self.npk = np.array([crop["npk"] for crop in crops], dtype=float).reshape(-1, 3)
+        totals = self.npk.sum(axis=1, keepdims=True)
+        # Each crop's demand split across N, P and K
+        self.demand = np.divide(self.npk, totals, out=np.zeros_like(self.npk), where=totals > 0)
+
+        self.soil_index = {soil: i for i, soil in enumerate(soil_types)}
+        for crop in crops:
+            for soil in crop["soils"]:
+                self.soil_index.setdefault(soil, len(self.soil_index))
+        # soils x crops, plus a last row of ones for samples of unknown texture
+        self.texture = np.full((len(self.soil_index) + 1, len(crops)), OTHER_SOIL)
+        self.texture[-1] = 1.0
+        for j, crop in enumerate(crops):
+            for soil, factor in crop["soils"].items():
+                self.texture[self.soil_index[soil], j] = factor
+
+        # seasons x crops, plus a last row of ones for samples with no season
+        self.season = np.full((len(SEASONS) + 1, len(crops)), OFF_SEASON)
+        self.season[-1] = 1.0
+        for j, crop in enumerate(crops):
+            for season in crop["seasons"]:
+                self.season[SEASONS.index(season), j] = 1.0
+
+    def factors(self, samples: List[dict]) -> Dict[str, np.ndarray]:
+        """samples x crops multiplier for each part of the score"""
+        ph = np.array([np.nan if s.get("ph_level") is None else s["ph_level"] for s in samples], dtype=float)[:, None]
+        lowest, highest = self.ph_limits[:, 0], self.ph_limits[:, 1]
+        low, high = self.ph[:, 0], self.ph[:, 1]
+        # 1 inside the optimal range, falling linearly to 0 at the crop's limits
+        ph_fit = np.minimum((ph - lowest) / np.maximum(low - lowest, 0.1), (highest - ph) / np.maximum(highest - high, 0.1))
+        ph_fit = np.where(np.isnan(ph), 1.0, np.clip(ph_fit, 0.0, 1.0))
+
+        soils = np.array([self.soil_index.get(s.get("soil_type"), -1) for s in samples])
+        seasons = np.array([SEASONS.index(s["season"]) if s.get("season") in SEASONS else -1 for s in samples])
+
+        levels = nutrient_levels(samples)
+        shortfall = np.nan_to_num(np.clip((HIGH_FROM - levels) / HIGH_FROM, 0.0, 1.0), nan=0.0)
+        return {
+            "ph": ph_fit,
+            "texture": self.texture[soils],
+            "season": self.season[seasons],
+            "nutrients": 1.0 - NUTRIENT_WEIGHT * (shortfall @ self.demand.T),
+            "levels": levels,
+        }
+
+    def scores(self, factors: Dict[str, np.ndarray]) -> np.ndarray:
+        return 100 * factors["ph"] * factors["texture"] * factors["season"] * factors["nutrients"]
+
+    def doses(self, levels: np.ndarray, crops: np.ndarray) -> np.ndarray:
+        """N, P2O5, K2O kg/ha for each sample's crop: the crop's recommended
+        dose raised on low-testing soil and cut on high-testing soil"""
+        position = np.clip((levels - LOW_BELOW) / (HIGH_FROM - LOW_BELOW), 0.0, 1.0)
+        scale = np.where(np.isnan(levels), 1.0, 1 + DOSE_ADJUSTMENT - 2 * DOSE_ADJUSTMENT * position)
+        return self.npk[crops] * scale
+
+
+def fertilizer_plan(dose: np.ndarray, sample: dict) -> List[dict]:
+    """Straight fertilizers (and amendments) that supply an N, P2O5, K2O dose"""
+    nitrogen, phosphorus, potassium = dose
+    dap = phosphorus / DAP_P2O5
+    urea = max(nitrogen - dap * DAP_N, 0.0) / UREA_N
+    mop = potassium / MOP_K2O
+    plan = []
+    if dap >= 5:
+        plan.append({
+            "fertilizer_type": "DAP (18:46:0)",
+            "quantity": f"{5 * round(dap / 5):.0f} kg per hectare",
+            "application_method": "Place below the seed or drill with it",
+            "timing": "At sowing"
+        })
+    if urea >= 5:
+        plan.append({
+            "fertilizer_type": "Urea (46% N)",
+            "quantity": f"{5 * round(urea / 5):.0f} kg per hectare",
+            "application_method": "Split: one third at sowing, the rest as two top dressings",
+            "timing": "At sowing, then about 30 and 60 days after"
+        })
+    if mop >= 5:
+        plan.append({
+            "fertilizer_type": "Muriate of Potash (60% K2O)",
+            "quantity": f"{5 * round(mop / 5):.0f} kg per hectare",
+            "application_method": "Broadcast and incorporate",
+            "timing": "Before sowing"
+        })
+    carbon = organic_carbon(sample)
+    if carbon is not None and carbon < OC_LOW_BELOW:
+        plan.append({
+            "fertilizer_type": "Farmyard manure or compost",
+            "quantity": "5-10 tons per hectare",
+            "application_method": "Mix with soil",
+            "timing": "2-3 weeks before sowing"
+        })
+    ph = sample.get("ph_level")
+    if ph is not None and ph < 5.5:
+        plan.append({
+            "fertilizer_type": "Agricultural lime",
+            "quantity": "As per lime requirement test (usually 2-4 tons per hectare)",
+            "application_method": "Broadcast and mix into the top soil",
+            "timing": "2-4 weeks before sowing"
+        })
+    elif ph is not None and ph > 8.5:
+        plan.append({
+            "fertilizer_type": "Gypsum",
+            "quantity": "As per gypsum requirement test",
+            "application_method": "Broadcast and mix, then leach with good quality water",
+            "timing": "Before plowing"
+        })
+    return plan
+
+
+class CropAdvisor:
+    """Holds the compiled crop table for the current catalogue"""
+
+    def __init__(self):
+        self.table: Optional[CropTable] = None
+
+    def compile(self, crops: List[dict], soil_types: Dict[str, dict]) -> CropTable:
+        return CropTable(crops, list(soil_types))
+
+    def install(self, table: CropTable):
+        self.table = table
+
+    def build(self, crops: List[dict], soil_types: Dict[str, dict]):
+        self.install(self.compile(crops, soil_types))
+
+    def season_label(self, crop: dict) -> str:
+        if len(crop["seasons"]) == len(SEASONS):
+            return "Year-round"
+        return ", ".join(SEASON_LABELS[season] for season in SEASONS if season in crop["seasons"])
+
+    def limiting_factors(self, factors: Dict[str, np.ndarray], row: int, j: int, sample: dict) -> List[str]:
+        crop = self.table.crops[j]
+        limits = []
+        if factors["ph"][row, j] < 1:
+            limits.append(f"pH {sample['ph_level']:g} is outside {crop['ph'][0]:g}-{crop['ph'][1]:g}")
+        if factors["texture"][row, j] < 0.7:
+            limits.append(f"Not well suited to {sample['soil_type']} soil")
+        if factors["season"][row, j] < 1:
+            limits.append(f"Not a {sample['season']} crop")
+        levels = factors["levels"][row]
+        for k, nutrient in enumerate(NUTRIENTS):
+            if rating(levels[k], k) == "low" and self.table.demand[j, k] > 0:
+                limits.append(f"Low {nutrient}; covered by the fertilizer dose")
+        return limits
+
+    def recommend_batch(self, samples: List[dict], limit: int = 5) -> List[dict]:
+        """Best crops for each sample, with a fertilizer plan for the best one"""
+        table = self.table
+        factors = table.factors(samples)
+        scores = table.scores(factors)
+        # Highest scores first; crops tie-break in catalogue order
+        ranked = np.argsort(-scores, axis=1, kind="stable")[:, :limit]
+        doses = table.doses(factors["levels"], ranked[:, 0])
+        results = []
+        for row, sample in enumerate(samples):
+            levels = factors["levels"][row]
+            results.append({
+                "crops": [
+                    {
+                        "crop": table.crops[j],
+                        "score": int(round(scores[row, j])),
+                        "limiting_factors": self.limiting_factors(factors, row, j, sample),
+                    }
+                    for j in ranked[row]
+                ],
+                "soil_test": {
+                    nutrient: {
+                        "kg_per_ha": None if np.isnan(levels[k]) else round(float(levels[k])),
+                        "rating": rating(levels[k], k),
+                    }
+                    for k, nutrient in enumerate(NUTRIENTS)
+                },
+                "nutrient_requirement": {
+                    nutrient: round(float(doses[row, k])) for k, nutrient in enumerate(NUTRIENTS)
+                },
+                "fertilizer": fertilizer_plan(doses[row], sample),
+            })
+        return results
+
+    def recommend(self, sample: dict, limit: int = 5) -> dict:
+        return self.recommend_batch([sample], limit)[0]
+
+
+crop_advisor = CropAdvisor()
@@ -0,0 +1,182 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.city_index import normalize
+
+# Structured eligibility rules, stored per scheme under "rules":
+#   {"land_acres": {"min": 0.01, "max": 4.94}, "annual_income": {"max": 250000},
+#    "age": {"min": 18, "max": 60}, "gender": ["female"], "districts": ["Meerut"],
+#    "social_category": ["sc", "st"], "occupation": ["farmer"]}
+# A scheme without a rule for a field (or with null / [] for it) accepts any
+# value of it. The shape is checked by app.api.schemes.EligibilityRules.
+RANGE_FIELDS = ("land_acres", "annual_income", "age")
+# Rule key -> profile field for set-membership rules
+SET_FIELDS = {
+    "gender": "gender",
+    "districts": "district",
+    "social_category": "social_category",
+    "occupation": "occupation",
+}
+PROFILE_FIELDS = RANGE_FIELDS + tuple(SET_FIELDS.values())
+
+
+def _key(value) -> str:
+    return normalize(str(value))
+
+
+def _bound(value, default: float) -> float:
+    return default if value is None else value
+
+
+class EligibilityMatrix:
+    """Scheme rules compiled into per-field column arrays.
+
+    Range rules become ``min``/``max`` float columns (±inf when absent) and
+    set rules become a boolean schemes x vocabulary table, so checking P
+    profiles against S schemes is a handful of broadcast comparisons over
+    a P x S grid instead of a Python loop per rule.
+    """
+
+    def __init__(self, schemes: List[dict]):
+        self.scheme_ids = [scheme["id"] for scheme in schemes]
+        self.position = {scheme_id: i for i, scheme_id in enumerate(self.scheme_ids)}
+        n = len(schemes)
+        rules = [scheme.get("rules") or {} for scheme in schemes]
+
+        self.minimum: Dict[str, np.ndarray] = {}
+        self.maximum: Dict[str, np.ndarray] = {}
+        for field in RANGE_FIELDS:
+            ranges = [r.get(field) or {} for r in rules]
+            self.minimum[field] = np.array([_bound(rng.get("min"), -np.inf) for rng in ranges], dtype=float)
+            self.maximum[field] = np.array([_bound(rng.get("max"), np.inf) for rng in ranges], dtype=float)
+
+        self.vocab: Dict[str, Dict[str, int]] = {}
+        self.constrained: Dict[str, np.ndarray] = {}
+        self.allowed: Dict[str, np.ndarray] = {}
+        for rule_key, field in SET_FIELDS.items():
+            vocab: Dict[str, int] = {}
+            for r in rules:
+                for value in r.get(rule_key) or []:
+                    vocab.setdefault(_key(value), len(vocab))
+            # Last column stands for values no scheme mentions
+            allowed = np.zeros((n, len(vocab) + 1), dtype=bool)
+            constrained = np.zeros(n, dtype=bool)
+            for i, r in enumerate(rules):
+                values = r.get(rule_key) or []
+                if values:
+                    constrained[i] = True
+                    allowed[i, [vocab[_key(value)] for value in values]] = True
+            self.vocab[field] = vocab
+            self.allowed[field] = allowed
+            self.constrained[field] = constrained
+
+    def __len__(self) -> int:
+        return len(self.scheme_ids)
+
+    def columns(self, profiles: List[dict]) -> Dict[str, np.ndarray]:
+        """Profile values as arrays: floats (NaN when unknown) or vocabulary codes (-1 when unknown)"""
+        columns: Dict[str, np.ndarray] = {}
+        for field in RANGE_FIELDS:
+            columns[field] = np.array(
+                [np.nan if profile.get(field) is None else float(profile[field]) for profile in profiles],
+                dtype=float,
+            )
+        for field in SET_FIELDS.values():
+            vocab = self.vocab[field]
+            unseen = len(vocab)
+            columns[field] = np.array(
+                [-1 if not profile.get(field) else vocab.get(_key(profile[field]), unseen) for profile in profiles],
+                dtype=np.int64,
+            )
+        return columns
+
+    def evaluate(self, profiles: List[dict], scheme_ids: Optional[List[str]] = None):
+        """(eligible, unverified) for profiles x schemes.
+
+        ``eligible`` is a bool matrix; a rule on a field the profile leaves
+        blank does not exclude the scheme, but is counted in ``unverified``
+        (an int matrix of such rules) so callers can ask for the missing data.
+        """
+        columns = self.columns(profiles)
+        schemes = slice(None) if scheme_ids is None else np.array([self.position[s] for s in scheme_ids], dtype=np.int64)
+        shape = (len(profiles), len(self.scheme_ids) if scheme_ids is None else len(scheme_ids))
+        eligible = np.ones(shape, dtype=bool)
+        unverified = np.zeros(shape, dtype=np.int32)
+
+        for field in RANGE_FIELDS:
+            low, high = self.minimum[field][schemes], self.maximum[field][schemes]
+            value = columns[field][:, None]
+            unknown = np.isnan(value)
+            has_rule = np.isfinite(low) | np.isfinite(high)
+            with np.errstate(invalid="ignore"):
+                passes = (value >= low) & (value <= high)
+            eligible &= passes | unknown
+            unverified += unknown & has_rule
+
+        for field in SET_FIELDS.values():
+            codes = columns[field]
+            unknown = (codes < 0)[:, None]
+            allowed = self.allowed[field][schemes]
+            constrained = self.constrained[field][schemes]
+            # Fancy-index each profile's vocabulary column: S x P, transposed
+            passes = allowed[:, np.maximum(codes, 0)].T | ~constrained
+            eligible &= passes | unknown
+            unverified += unknown & constrained
+        return eligible, unverified
+
+    def missing_fields(self, scheme_id: str, profile: dict) -> List[str]:
+        """Profile fields a scheme has rules for that the profile leaves blank"""
+        i = self.position[scheme_id]
+        missing = []
+        for field in RANGE_FIELDS:
+            if profile.get(field) is None and (
+                np.isfinite(self.minimum[field][i]) or np.isfinite(self.maximum[field][i])
+            ):
+                missing.append(field)
+        for field in SET_FIELDS.values():
+            if not profile.get(field) and self.constrained[field][i]:
+                missing.append(field)
+        return missing
+
+
+class EligibilityEngine:
+    """Holds the compiled matrix for the current scheme catalogue"""
+
+    def __init__(self):
+        self.matrix: Optional[EligibilityMatrix] = None
+        self.schemes: Dict[str, dict] = {}
+
+    def compile(self, schemes: List[dict]) -> Tuple[EligibilityMatrix, Dict[str, dict]]:
+        return EligibilityMatrix(schemes), {scheme["id"]: scheme for scheme in schemes}
+
+    def install(self, compiled: Tuple[EligibilityMatrix, Dict[str, dict]]):
+        self.matrix, self.schemes = compiled
+
+    def build(self, schemes: List[dict]):
+        self.install(self.compile(schemes))
+
+    def eligible_schemes(self, profile: dict) -> List[dict]:
+        """Schemes one profile qualifies for: fully verified ones first"""
+        matrix, schemes = self.matrix, self.schemes
+        eligible, unverified = matrix.evaluate([profile])
+        positions = np.flatnonzero(eligible[0])
+        order = positions[np.argsort(unverified[0, positions], kind="stable")]
+        return [
+            {
+                **schemes[matrix.scheme_ids[i]],
+                "verified": bool(unverified[0, i] == 0),
+                "missing_fields": matrix.missing_fields(matrix.scheme_ids[i], profile) if unverified[0, i] else [],
+            }
+            for i in order
+        ]
+
+    def eligible_batch(self, profiles: List[dict], scheme_ids: Optional[List[str]] = None) -> List[List[str]]:
+        """Eligible scheme ids for each profile"""
+        matrix = self.matrix
+        ids = matrix.scheme_ids if scheme_ids is None else scheme_ids
+        eligible, _ = matrix.evaluate(profiles, scheme_ids)
+        return [[ids[j] for j in np.flatnonzero(row)] for row in eligible]
+
+
+eligibility_engine = EligibilityEngine()
@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Daily aggregation of OpenWeatherMap 3-hour forecast series.
+#
+# The series is flattened into column arrays, rows are bucketed by local
+# calendar day using the location's UTC offset from the payload
+# (``city.timezone``), and each output field is one reduceat/bincount over
+# the whole series. Each city is aggregated inside its own cached fetch, so
+# it keeps its own cache entry, coalescing and stale fallback.
+#
+# There is deliberately no multi-city entry point: batch and pre-warm
+# requests would have to wait for every city's upstream fetch before any
+# of them could be aggregated, for no measurable saving over one
+# vectorized pass per city.
+
+SECONDS_PER_DAY = 86400
+
+# Numeric columns pulled from each 3-hour item
+COLUMNS: Dict[str, Callable[[dict], float]] = {
+    "temp": lambda item: item["main"]["temp"],
+    "humidity": lambda item: item["main"]["humidity"],
+    "wind": lambda item: item.get("wind", {}).get("speed", 0.0) * 3.6,  # m/s to km/h
+    "rain": lambda item: item.get("rain", {}).get("3h", 0.0),
+    "pop": lambda item: item.get("pop", 0.0) * 100,  # fraction to percent
+}
+
+# Categorical columns; the daily value is the most frequent one
+CATEGORIES: Dict[str, Callable[[dict], str]] = {
+    "description": lambda item: item["weather"][0]["description"],
+    "icon": lambda item: item["weather"][0]["icon"],
+}
+
+# (output field, column, reducer) for ForecastDay
+DAILY_FIELDS: List[Tuple[str, str, str]] = [
+    ("temperature_max", "temp", "max"),
+    ("temperature_min", "temp", "min"),
+    ("temperature_mean", "temp", "mean"),
+    ("humidity", "humidity", "mean"),
+    ("wind_speed_max", "wind", "max"),
+    ("rain_total", "rain", "sum"),
+    ("rain_probability", "pop", "max"),
+]
+
+
+def _reduce(values: np.ndarray, starts: np.ndarray, counts: np.ndarray, reducer: str) -> np.ndarray:
+    if reducer == "max":
+        return np.maximum.reduceat(values, starts)
+    if reducer == "min":
+        return np.minimum.reduceat(values, starts)
+    if reducer == "sum":
+        return np.add.reduceat(values, starts)
+    if reducer == "mean":
+        return np.add.reduceat(values, starts) / counts
+    raise ValueError(f"Unknown reducer: {reducer}")
+
+
+def _mode(codes: np.ndarray, group_ids: np.ndarray, n_groups: int, n_codes: int) -> np.ndarray:
+    # Codes are numbered in order of first appearance, so argmax breaks
+    # ties in favour of the value seen first that day
+    counts = np.zeros((n_groups, n_codes), dtype=np.int32)
+    np.add.at(counts, (group_ids, codes), 1)
+    return counts.argmax(axis=1)
+
+
+def aggregate_forecast(payload: dict, days: int) -> List[dict]:
+    """Aggregate one forecast payload into at most ``days`` daily dicts"""
+    items = payload["list"]
+    n_rows = len(items)
+    if n_rows == 0:
+        return []
+
+    offset = payload.get("city", {}).get("timezone", 0)
+    local_day = np.empty(n_rows, dtype=np.int64)
+    columns = {name: np.empty(n_rows, dtype=np.float64) for name in COLUMNS}
+    vocab: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORIES}
+    codes = {name: np.empty(n_rows, dtype=np.int64) for name in CATEGORIES}
+
+    for row, item in enumerate(items):
+        local_day[row] = (item["dt"] + offset) // SECONDS_PER_DAY
+        for name, extract in COLUMNS.items():
+            columns[name][row] = extract(item)
+        for name, extract in CATEGORIES.items():
+            codes[name][row] = vocab[name].setdefault(extract(item), len(vocab[name]))
+
+    # Rows are grouped by local day; a stable sort keeps 3-hour order
+    order = np.argsort(local_day, kind="stable")
+    local_day = local_day[order]
+    is_start = np.ones(n_rows, dtype=bool)
+    is_start[1:] = local_day[1:] != local_day[:-1]
+    starts = np.flatnonzero(is_start)
+    counts = np.diff(np.append(starts, n_rows))
+    group_ids = np.cumsum(is_start) - 1
+    n_groups = min(len(starts), days)
+
+    reduced = {
+        field: _reduce(columns[column][order], starts, counts, reducer)
+        for field, column, reducer in DAILY_FIELDS
+    }
+    modes = {}
+    for name in CATEGORIES:
+        labels = list(vocab[name])
+        winners = _mode(codes[name][order], group_ids, len(starts), len(labels))
+        modes[name] = [labels[code] for code in winners]
+
+    daily: List[dict] = []
+    for group in range(n_groups):
+        date = datetime.fromtimestamp(int(local_day[starts[group]]) * SECONDS_PER_DAY, tz=timezone.utc)
+        day = {"date": date.strftime("%Y-%m-%d")}
+        for field in reduced:
+            day[field] = float(reduced[field][group])
+        for name in CATEGORIES:
+            day[name] = modes[name][group]
+        daily.append(day)
+    return daily
@@ -0,0 +1,188 @@
+import math
+import re
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from app.services.city_index import city_index, normalize
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# District headquarters that are not weather cities, so rural listings
+# ("Village Madhavpur, District Mathura") still resolve to coordinates
+DISTRICTS: Dict[str, Tuple[float, float]] = {
+    "Mathura": (27.4924, 77.6737),
+    "Saharanpur": (29.968, 77.5552),
+    "Muzaffarnagar": (29.4727, 77.7085),
+    "Bulandshahr": (28.4069, 77.8498),
+    "Hapur": (28.7306, 77.7759),
+    "Baghpat": (28.9447, 77.2183),
+    "Rampur": (28.8154, 79.0256),
+    "Jhansi": (25.4484, 78.5685),
+    "Gorakhpur": (26.7606, 83.3732),
+    "Muzaffarpur": (26.1209, 85.3647),
+    "Gaya": (24.7914, 85.0002),
+    "Karnal": (29.6857, 76.9905),
+    "Hisar": (29.1492, 75.7217),
+    "Patiala": (30.3398, 76.3869),
+    "Bathinda": (30.211, 74.9455),
+    "Kota": (25.2138, 75.8648),
+    "Kolhapur": (16.705, 74.2433),
+    "Sangli": (16.8524, 74.5815),
+    "Satara": (17.6805, 74.0183),
+    "Solapur": (17.6599, 75.9064),
+    "Ahmednagar": (19.0948, 74.748),
+    "Jalgaon": (21.0077, 75.5626),
+    "Ratnagiri": (16.9902, 73.312),
+    "Anand": (22.5645, 72.928),
+    "Belgaum": (15.8497, 74.4977),
+    "Hubli": (15.3647, 75.124),
+    "Davangere": (14.4644, 75.9218),
+    "Guntur": (16.3067, 80.4365),
+    "Warangal": (17.9689, 79.5941),
+    "Thanjavur": (10.787, 79.1378),
+    "Sambalpur": (21.4669, 83.9812),
+}
+_DISTRICT_KEYS = {normalize(name): coords for name, coords in DISTRICTS.items()}
+
+_PLACE_PREFIX = re.compile(r"^(district|dist|village|vill|tehsil|taluka|block|city)\b\.?\s*", re.IGNORECASE)
+
+
+def _place(name: str) -> Optional[Tuple[float, float]]:
+    key = normalize(name)
+    if not key:
+        return None
+    coords = _DISTRICT_KEYS.get(key)
+    if coords is not None:
+        return coords
+    city = city_index.lookup(key)
+    return (city.lat, city.lon) if city else None
+
+
+def resolve_location(location: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of the district named in a free-text location.
+
+    Parts are tried from most to least specific admin level: an explicit
+    "District X" first, then the comma-separated parts from the right.
+    """
+    parts = [part.strip() for part in location.split(",") if part.strip()]
+    districts = [part for part in parts if re.match(r"^(district|dist)\b", part, re.IGNORECASE)]
+    for part in districts + parts[::-1]:
+        coords = _place(_PLACE_PREFIX.sub("", part))
+        if coords is not None:
+            return coords
+    return None
+
+
+def locate(product: dict) -> dict:
+    """Fill in missing coordinates from the product's location"""
+    if product.get("latitude") is None or product.get("longitude") is None:
+        coords = resolve_location(product.get("location") or "")
+        product["latitude"], product["longitude"] = coords if coords else (None, None)
+    return product
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoIndex:
+    """Points bucketed into a fixed lat/lon grid.
+
+    A radius query only visits the cells overlapping the circle's bounding
+    box; a nearest-N query visits rings of cells outwards until the N-th
+    closest point found is nearer than any unvisited cell can be.
+    """
+
+    def __init__(self, cell_degrees: float = 0.25):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float]]] = {}
+        self._cell_of: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, key: Hashable, lat: float, lon: float):
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._cell_of[key] = cell
+
+    def remove(self, key: Hashable):
+        cell = self._cell_of.pop(key, None)
+        if cell is not None:
+            points = self._cells[cell]
+            del points[key]
+            if not points:
+                del self._cells[cell]
+
+    def _scan(self, cells: Iterator[Tuple[int, int]], lat: float, lon: float, accept) -> Iterator[Tuple[Hashable, float]]:
+        for cell in cells:
+            for key, (plat, plon) in self._cells.get(cell, {}).items():
+                if accept is None or accept(key):
+                    yield key, haversine_km(lat, lon, plat, plon)
+
+    def within(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = None,
+        accept: Optional[Callable[[Hashable], bool]] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """(key, distance) pairs within ``radius_km``, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 0.01))
+        (i0, j0), (i1, j1) = self._cell(lat - dlat, lon - dlon), self._cell(lat + dlat, lon + dlon)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            cells = iter(list(self._cells))
+        else:
+            cells = ((i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+        found = [(key, d) for key, d in self._scan(cells, lat, lon, accept) if d <= radius_km]
+        found.sort(key=lambda item: item[1])
+        return found[:limit] if limit is not None else found
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int,
+        accept: Optional[Callable[[Hashable], bool]] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """The ``limit`` closest points, nearest first"""
+        if not self._cells:
+            return []
+        ci, cj = self._cell(lat, lon)
+        found: List[Tuple[Hashable, float]] = []
+        ring = 0
+        while True:
+            if ring and (2 * ring + 1) ** 2 > len(self._cells):
+                # Sparse grid: cheaper to scan the remaining occupied cells
+                cells = [cell for cell in self._cells if max(abs(cell[0] - ci), abs(cell[1] - cj)) >= ring]
+                found.extend(self._scan(iter(cells), lat, lon, accept))
+                found.sort(key=lambda item: item[1])
+                return found[:limit]
+            if ring == 0:
+                cells = [(ci, cj)]
+            else:
+                cells = [(ci + di, cj + dj)
+                         for di in range(-ring, ring + 1)
+                         for dj in range(-ring, ring + 1)
+                         if max(abs(di), abs(dj)) == ring]
+            found.extend(self._scan(iter(cells), lat, lon, accept))
+            found.sort(key=lambda item: item[1])
+            del found[limit:]
+            # Every unvisited cell is at least ``ring`` cell widths away;
+            # widths use the narrowest longitude spacing those cells can have
+            far_lat = min(abs(lat) + (ring + 1) * self.cell_degrees, 89.0)
+            cell_km = self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(far_lat))
+            if len(found) == limit and found[-1][1] <= ring * cell_km:
+                return found
+            ring += 1
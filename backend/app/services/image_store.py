@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+IMAGE_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "./media")
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 15 * 1024 * 1024))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Longest edge of each generated variant, in pixels
+VARIANTS: Dict[str, int] = {
+    "thumb": 200,
+    "medium": 800,
+}
+
+# Magic bytes of accepted uploads (WebP is checked separately)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+)
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+class ImageTooLargeError(Exception):
+    pass
+
+
+class UnsupportedImageError(Exception):
+    pass
+
+
+def is_image_id(value: str) -> bool:
+    """Image ids are sha256 hex digests; anything else never touches the filesystem"""
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+def sniff_image(head: bytes) -> Optional[str]:
+    """Extension for a supported image format, from its first bytes"""
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def render_variants(source: str, destination: str, sizes: Dict[str, int]):
+    """Write a JPEG per variant next to each other (runs in a worker process)"""
+    from PIL import Image, ImageOps
+
+    os.makedirs(destination, exist_ok=True)
+    for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        with Image.open(source) as image:
+            # Let the JPEG decoder downscale by 1/2..1/8 while decoding
+            image.draft("RGB", (edge, edge))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            target = os.path.join(destination, f"{name}.jpg")
+            tmp = f"{target}.{os.getpid()}.tmp"
+            image.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+            os.replace(tmp, target)
+
+
+class ImageStore:
+    """Content-addressed image storage with background variant generation.
+
+    Originals live at ``originals/<2 hex>/<sha256>.<ext>`` so re-uploading
+    the same photo is a no-op. Thumbnail and medium variants are rendered in
+    a process pool; the files on disk are the source of truth for job
+    status, so any worker can answer for an image.
+    """
+
+    def __init__(self, root: str = IMAGE_STORAGE_DIR, workers: int = IMAGE_WORKERS):
+        self.root = root
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, asyncio.Future] = {}
+        self._failed: Dict[str, str] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def original_path(self, digest: str) -> Optional[Tuple[str, str]]:
+        """(path, extension) of a stored original"""
+        for extension in MEDIA_TYPES:
+            path = os.path.join(self.root, "originals", digest[:2], f"{digest}.{extension}")
+            if os.path.exists(path):
+                return path, extension
+        return None
+
+    def variant_path(self, digest: str, variant: str) -> str:
+        return os.path.join(self.root, "variants", digest[:2], digest, f"{variant}.jpg")
+
+    async def save(self, upload: UploadFile) -> Tuple[str, str]:
+        """Stream an upload to disk; returns (sha256 digest, extension)"""
+        incoming = os.path.join(self.root, "incoming")
+        await run_in_threadpool(os.makedirs, incoming, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=incoming)
+        digest = hashlib.sha256()
+        size = 0
+        extension = None
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if extension is None:
+                        extension = sniff_image(chunk)
+                        if extension is None:
+                            raise UnsupportedImageError("Only JPEG, PNG and WebP images are supported")
+                    size += len(chunk)
+                    if size > IMAGE_MAX_BYTES:
+                        raise ImageTooLargeError(f"Images are limited to {IMAGE_MAX_BYTES // (1024 * 1024)} MB")
+                    digest.update(chunk)
+                    await run_in_threadpool(out.write, chunk)
+            if extension is None:
+                raise UnsupportedImageError("Empty upload")
+
+            key = digest.hexdigest()
+            existing = self.original_path(key)
+            if existing is not None:
+                # Same bytes already stored: the temp file is discarded below
+                return key, existing[1]
+            target = os.path.join(self.root, "originals", key[:2], f"{key}.{extension}")
+            await run_in_threadpool(os.makedirs, os.path.dirname(target), exist_ok=True)
+            os.replace(tmp, target)
+            return key, extension
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def variants_ready(self, digest: str) -> bool:
+        return all(os.path.exists(self.variant_path(digest, name)) for name in VARIANTS)
+
+    def schedule(self, digest: str, retry: bool = False):
+        """Render variants in the process pool unless they exist or are in progress.
+
+        A failed job is only tried again with ``retry`` (a fresh upload), so
+        an image that crashes the renderer is not resubmitted on every read.
+        """
+        if digest in self._jobs or self.variants_ready(digest):
+            return
+        if digest in self._failed and not retry:
+            return
+        original = self.original_path(digest)
+        if original is None:
+            return
+        self._failed.pop(digest, None)
+        loop = asyncio.get_running_loop()
+        destination = os.path.dirname(self.variant_path(digest, "thumb"))
+        pool = self._get_pool()
+        try:
+            job = loop.run_in_executor(pool, render_variants, original[0], destination, VARIANTS)
+        except BrokenProcessPool:
+            # A worker died since the last job finished; start a fresh pool
+            self._discard(pool)
+            pool = self._get_pool()
+            job = loop.run_in_executor(pool, render_variants, original[0], destination, VARIANTS)
+        self._jobs[digest] = job
+        job.add_done_callback(lambda done: self._finish(digest, done, pool))
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next job starts a fresh one"""
+        if self._pool is pool:
+            print("Image pool broke; restarting")
+            self.close()
+
+    def _finish(self, digest: str, job: asyncio.Future, pool: ProcessPoolExecutor):
+        self._jobs.pop(digest, None)
+        if job.cancelled():
+            return
+        error = job.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. out of memory on a huge PNG); every job in
+            # that pool fails with it, and retrying would likely crash again
+            self._discard(pool)
+            self._failed[digest] = "Image processing worker crashed"
+        elif error is not None:
+            print(f"Image variant error for {digest}: {error}")
+            self._failed[digest] = str(error) or type(error).__name__
+
+    def status(self, digest: str) -> Optional[dict]:
+        """Job status for a stored image, or None if it is unknown"""
+        if self.original_path(digest) is None:
+            return None
+        if self.variants_ready(digest):
+            state = "done"
+        elif digest in self._failed:
+            return {"image_id": digest, "status": "failed", "error": self._failed[digest]}
+        else:
+            # Also recovers jobs lost to a restart or owned by another worker
+            self.schedule(digest)
+            state = "processing"
+        return {"image_id": digest, "status": state, "variants": list(VARIANTS)}
+
+
+image_store = ImageStore()
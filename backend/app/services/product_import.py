@@ -0,0 +1,207 @@
+import codecs
+import csv
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from app.services.geo import locate
+from app.storage.base import Storage
+
+IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", 500))
+IMPORT_MAX_ROWS = int(os.getenv("PRODUCT_IMPORT_MAX_ROWS", 10000))
+IMPORT_MAX_RECORD_BYTES = 64 * 1024
+# Per-row error entries returned; the failed count still covers every row
+IMPORT_MAX_REPORTED_ERRORS = 200
+
+
+class ImportFormatError(Exception):
+    """The upload cannot be parsed at all (as opposed to a bad row)"""
+
+
+async def iter_records(chunks: AsyncIterator[bytes], quoted: bool) -> AsyncIterator[str]:
+    """Split a streamed UTF-8 body into records without reading it all.
+
+    With ``quoted`` a newline inside a double-quoted CSV field does not end
+    the record: a record is complete only once its quote count is even.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="strict")
+    pending: List[str] = []
+    pending_size = 0
+    quotes = 0
+    try:
+        async for chunk in chunks:
+            text = decoder.decode(chunk)
+            start = 0
+            while True:
+                newline = text.find("\n", start)
+                if newline < 0:
+                    break
+                segment = text[start:newline]
+                start = newline + 1
+                if quoted:
+                    quotes += segment.count('"')
+                if quotes % 2:
+                    pending.append(segment + "\n")
+                    pending_size += len(segment) + 1
+                    continue
+                pending.append(segment)
+                yield "".join(pending).rstrip("\r")
+                pending, pending_size, quotes = [], 0, 0
+            rest = text[start:]
+            if rest:
+                pending.append(rest)
+                pending_size += len(rest)
+                if quoted:
+                    quotes += rest.count('"')
+            if pending_size > IMPORT_MAX_RECORD_BYTES:
+                raise ImportFormatError(f"Record longer than {IMPORT_MAX_RECORD_BYTES} bytes")
+        pending.append(decoder.decode(b"", final=True))
+    except UnicodeDecodeError:
+        raise ImportFormatError("Upload is not valid UTF-8")
+    record = "".join(pending)
+    if record.strip():
+        yield record.rstrip("\r")
+
+
+async def iter_rows(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    required: Iterable[str] = (),
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(row number, fields, parse error) for each non-blank record.
+
+    Rows are numbered by record from 1; for CSV the header is row 1.
+    """
+    if fmt == "ndjson":
+        row = 0
+        async for record in iter_records(chunks, quoted=False):
+            row += 1
+            if not record.strip():
+                continue
+            try:
+                fields = json.loads(record)
+            except ValueError as e:
+                yield row, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(fields, dict):
+                yield row, None, "Each line must be a JSON object"
+                continue
+            yield row, fields, None
+        return
+
+    header: Optional[List[str]] = None
+    row = 0
+    async for record in iter_records(chunks, quoted=True):
+        row += 1
+        if not record.strip():
+            continue
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as e:
+            if header is None:
+                raise ImportFormatError(f"Invalid CSV header: {e}")
+            yield row, None, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            missing = [name for name in required if name not in header]
+            if missing:
+                raise ImportFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+            continue
+        if len(values) > len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells count as missing so required fields are reported
+        yield row, {name: value for name, value in zip(header, values) if value != ""}, None
+
+
+def row_errors(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()]
+
+
+class ImportReport:
+    def __init__(self):
+        self.import_id = uuid.uuid4().hex[:8]
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+        # Why the upload stopped early, if it did; earlier rows stay imported
+        self.aborted: Optional[str] = None
+
+    def fail(self, row: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": messages})
+
+    def to_dict(self) -> dict:
+        return {
+            "import_id": self.import_id,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+
+async def import_products(
+    storage: Storage,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    model: type,
+    on_batch: Callable[[List[dict]], Awaitable[None]],
+) -> dict:
+    """Validate rows as they stream in and store them in batches.
+
+    Each batch is written in one storage call and then handed to
+    ``on_batch`` so secondary indexes (search) only ever see stored rows.
+    Bad rows are reported by number and skipped; good rows are kept. If
+    the stream itself turns out to be unreadable after rows were stored,
+    the import stops there and says so instead of failing as a whole.
+    """
+    report = ImportReport()
+    batch: List[dict] = []
+
+    async def flush():
+        created_at = datetime.now().isoformat()
+        for product in batch:
+            product["created_at"] = created_at
+        await storage.add_products(batch)
+        await on_batch(batch)
+        report.imported += len(batch)
+        batch.clear()
+
+    required = [name for name, field in model.model_fields.items() if field.is_required()]
+    rows = 0
+    try:
+        async for row, fields, error in iter_rows(chunks, fmt, required):
+            rows += 1
+            if rows > IMPORT_MAX_ROWS:
+                raise ImportFormatError(f"Imports are limited to {IMPORT_MAX_ROWS} rows")
+            if error is not None:
+                report.fail(row, [error])
+                continue
+            try:
+                product: BaseModel = model.model_validate(fields)
+            except ValidationError as e:
+                report.fail(row, row_errors(e))
+                continue
+            batch.append(locate({
+                # One random prefix per import instead of a uuid4 per row
+                "id": f"prod-{report.import_id}-{row}",
+                **product.model_dump(),
+                "image_url": None,
+            }))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+    except ImportFormatError as e:
+        if not report.imported and not batch:
+            raise
+        report.aborted = str(e)
+    if batch:
+        await flush()
+    return report.to_dict()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.geo import GeoIndex, resolve_location
+from app.services.search_index import BM25Index
+from app.storage.base import Storage
+
+# Seconds between checks for products created by other workers
+SEARCH_SYNC_INTERVAL = float(os.getenv("PRODUCT_SEARCH_SYNC_INTERVAL", 2))
+SEARCH_SYNC_BATCH = 1000
+
+
+class ProductSearch:
+    """Ranked full-text and proximity product search over in-process indexes.
+
+    The indexes follow storage by insertion sequence and are only fed by
+    ``sync``, so every stored row is tokenized once. Writers in this process
+    sync right after storing; rows written by other workers are pulled in
+    incrementally on the next search.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything indexed, e.g. when a new storage backend is opened"""
+        self.index = BM25Index({"name": 3.0, "category": 2.0, "location": 1.5, "description": 1.0})
+        self.geo = GeoIndex()
+        self._prices: Dict[str, float] = {}
+        self._categories: Dict[str, str] = {}
+        self._last_seq = 0
+        self._last_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+
+    def _add(self, product: dict):
+        self.index.add(product["id"], product)
+        self._prices[product["id"]] = product["price"]
+        self._categories[product["id"]] = product["category"]
+        # Rows stored before coordinates existed are placed by their district
+        if product.get("latitude") is not None and product.get("longitude") is not None:
+            coords = (product["latitude"], product["longitude"])
+        else:
+            coords = resolve_location(product["location"])
+        if coords is not None:
+            self.geo.add(product["id"], *coords)
+
+    async def sync(self, storage: Storage, force: bool = False):
+        """Index products stored since the last sync"""
+        if not force and time.monotonic() - self._last_sync < SEARCH_SYNC_INTERVAL:
+            return
+        async with self._sync_lock:
+            while True:
+                rows = await storage.products_since(self._last_seq, SEARCH_SYNC_BATCH)
+                for seq, product in rows:
+                    self._add(product)
+                    self._last_seq = seq
+                if len(rows) < SEARCH_SYNC_BATCH:
+                    break
+            self._last_sync = time.monotonic()
+
+    async def search(
+        self,
+        storage: Storage,
+        query: str,
+        limit: int = 20,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Tuple[str, float]]:
+        await self.sync(storage)
+
+        def accept(product_id: str) -> bool:
+            price = self._prices[product_id]
+            if min_price is not None and price < min_price:
+                return False
+            if max_price is not None and price > max_price:
+                return False
+            return not category or self._categories[product_id] == category
+
+        filtered = category or min_price is not None or max_price is not None
+        return self.index.search(query, limit, accept if filtered else None)
+
+    async def nearby(
+        self,
+        storage: Storage,
+        lat: float,
+        lon: float,
+        limit: int = 20,
+        radius_km: Optional[float] = None,
+        category: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """(product id, distance km) nearest first, within ``radius_km`` if given"""
+        await self.sync(storage)
+        accept = (lambda product_id: self._categories[product_id] == category) if category else None
+        if radius_km is not None:
+            return self.geo.within(lat, lon, radius_km, limit=limit, accept=accept)
+        return self.geo.nearest(lat, lon, limit, accept=accept)
+
+
+product_search = ProductSearch()
@@ -0,0 +1,206 @@
+import base64
+import json
+import re
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def location_tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def created_timestamp(created_at: str) -> float:
+    return datetime.fromisoformat(created_at).timestamp()
+
+
+# Stable sort orders as ascending key tuples; the insertion sequence breaks
+# ties so every product has a unique position for keyset pagination
+SORT_KEYS: Dict[str, Callable[[dict, int], tuple]] = {
+    "newest": lambda product, seq: (-created_timestamp(product["created_at"]), -seq),
+    "price_asc": lambda product, seq: (product["price"], seq),
+    "price_desc": lambda product, seq: (-product["price"], seq),
+}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise InvalidCursorError("Malformed cursor")
+    if not isinstance(key, list) or not key or not all(isinstance(v, (int, float)) for v in key):
+        raise InvalidCursorError("Malformed cursor")
+    return tuple(key)
+
+
+class ProductRepository:
+    """In-memory product catalogue with id, category and location indexes.
+
+    Postings are insertion-ordered dicts used as ordered sets. A filter
+    walks the smallest matching posting list and probes the others, so it
+    costs the size of the result rather than the size of the catalogue.
+    """
+
+    def __init__(self, products: Iterable[dict] = ()):
+        self._by_id: Dict[str, dict] = {}
+        # Insertion sequence (from 1), to return filtered results in
+        # catalogue order and let readers catch up on new products
+        self._seq: Dict[str, int] = {}
+        self._inserted: List[str] = []
+        self._by_category: Dict[str, Dict[str, None]] = {}
+        self._by_location_token: Dict[str, Dict[str, None]] = {}
+        # Sorted vocabulary for prefix lookups ("meer" -> "meerut")
+        self._location_vocab: List[str] = []
+        # Per sort order: sorted (key, id) pairs
+        self._orders: Dict[str, List[Tuple[tuple, str]]] = {name: [] for name in SORT_KEYS}
+        for product in products:
+            self.add(product)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _index(self, product: dict):
+        pid = product["id"]
+        self._by_category.setdefault(product["category"], {})[pid] = None
+        for token in location_tokens(product["location"]):
+            posting = self._by_location_token.get(token)
+            if posting is None:
+                posting = self._by_location_token[token] = {}
+                self._location_vocab.insert(bisect_left(self._location_vocab, token), token)
+            posting[pid] = None
+
+        for name, order in self._orders.items():
+            insort(order, (self._sort_key(name, product), pid))
+
+    def _unindex(self, product: dict):
+        pid = product["id"]
+        self._by_category.get(product["category"], {}).pop(pid, None)
+        for token in location_tokens(product["location"]):
+            self._by_location_token.get(token, {}).pop(pid, None)
+        for name, order in self._orders.items():
+            entry = (self._sort_key(name, product), pid)
+            position = bisect_left(order, entry)
+            if position < len(order) and order[position] == entry:
+                del order[position]
+
+    def _sort_key(self, sort: str, product: dict) -> tuple:
+        return SORT_KEYS[sort](product, self._seq[product["id"]])
+
+    def add(self, product: dict) -> dict:
+        if product["id"] in self._by_id:
+            self._unindex(self._by_id[product["id"]])
+        else:
+            self._inserted.append(product["id"])
+            self._seq[product["id"]] = len(self._inserted)
+        self._by_id[product["id"]] = product
+        self._index(product)
+        return product
+
+    def get(self, product_id: str) -> Optional[dict]:
+        return self._by_id.get(product_id)
+
+    def update(self, product_id: str, **fields) -> Optional[dict]:
+        product = self._by_id.get(product_id)
+        if product is None:
+            return None
+        reindex = any(name in fields for name in ("category", "location", "price", "created_at"))
+        if reindex:
+            self._unindex(product)
+        product.update(fields)
+        if reindex:
+            self._index(product)
+        return product
+
+    def since(self, after_seq: int, limit: int) -> List[Tuple[int, dict]]:
+        """(seq, product) pairs added after ``after_seq``"""
+        ids = self._inserted[after_seq:after_seq + limit]
+        return [(after_seq + offset + 1, self._by_id[pid]) for offset, pid in enumerate(ids)]
+
+    def all(self) -> List[dict]:
+        return list(self._by_id.values())
+
+    def _location_ids(self, token: str) -> Dict[str, None]:
+        """Ids whose location has a word starting with ``token``"""
+        exact = self._by_location_token.get(token)
+        vocab = self._location_vocab
+        position = bisect_left(vocab, token)
+        words = []
+        while position < len(vocab) and vocab[position].startswith(token):
+            words.append(vocab[position])
+            position += 1
+        if len(words) == 1 and exact is not None:
+            return exact
+        ids: Dict[str, None] = {}
+        for word in words:
+            ids.update(self._by_location_token[word])
+        return ids
+
+    def _matching_ids(self, category: Optional[str], location: Optional[str]) -> Optional[List[str]]:
+        """Ids matching the filters, or None when there are no filters"""
+        candidates: List[Dict[str, None]] = []
+        if category:
+            candidates.append(self._by_category.get(category, {}))
+        if location:
+            tokens = location_tokens(location)
+            if not tokens:
+                return []
+            candidates.extend(self._location_ids(token) for token in tokens)
+        if not candidates:
+            return None
+
+        candidates.sort(key=len)
+        smallest, rest = candidates[0], candidates[1:]
+        return [pid for pid in smallest if all(pid in ids for ids in rest)]
+
+    def filter(self, category: Optional[str] = None, location: Optional[str] = None) -> List[dict]:
+        """Products matching the category exactly and every word of the location"""
+        matches = self._matching_ids(category, location)
+        if matches is None:
+            return self.all()
+        if location:
+            # Prefix unions are not in catalogue order
+            matches.sort(key=self._seq.__getitem__)
+        return [self._by_id[pid] for pid in matches]
+
+    def count(self, category: Optional[str] = None, location: Optional[str] = None) -> int:
+        """Number of matching products, without building the product list"""
+        matches = self._matching_ids(category, location)
+        return len(self._by_id) if matches is None else len(matches)
+
+    def page(
+        self,
+        sort: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        category: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[tuple]]:
+        """One keyset page in ``sort`` order, and the key to continue after"""
+        matches = self._matching_ids(category, location)
+        if matches is None:
+            # Unfiltered: bisect straight into the maintained sort order
+            order = self._orders[sort]
+            start = bisect_right(order, (after, chr(0x10FFFF))) if after else 0
+            window = order[start:start + limit + 1]
+        else:
+            # Filtered: only the matches are sorted, so cost follows the result size
+            window = sorted((self._sort_key(sort, self._by_id[pid]), pid) for pid in matches)
+            if after:
+                window = window[bisect_right(window, (after, chr(0x10FFFF))):]
+            window = window[:limit + 1]
+
+        has_more = len(window) > limit
+        window = window[:limit]
+        next_key = window[-1][0] if has_more else None
+        return [self._by_id[pid] for _, pid in window], next_key
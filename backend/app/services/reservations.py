@@ -0,0 +1,91 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from app.storage.base import Storage
+
+# Seconds a checkout holds stock before it must be confirmed
+RESERVATION_TTL = float(os.getenv("RESERVATION_TTL", 600))
+RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", 30))
+
+
+class IdempotencyConflictError(Exception):
+    """An idempotency key was reused for a different checkout"""
+
+
+class OutOfStockError(Exception):
+    pass
+
+
+def new_order(product: dict, quantity: int, buyer: dict, idempotency_key: Optional[str], now: float) -> dict:
+    """Order record for a fresh reservation"""
+    return {
+        "order_id": f"ORD-{uuid.uuid4().hex[:8].upper()}",
+        "idempotency_key": idempotency_key,
+        "product_id": product["id"],
+        "product_name": product["name"],
+        "quantity": quantity,
+        "unit_price": product["price"],
+        "total_amount": product["price"] * quantity,
+        "seller_contact": product["seller_phone"],
+        **buyer,
+        "status": "reserved",
+        "created_at": datetime.fromtimestamp(now).isoformat(),
+        "expires_at": datetime.fromtimestamp(now + RESERVATION_TTL).isoformat(),
+        "expires_ts": now + RESERVATION_TTL,
+    }
+
+
+async def reserve(
+    storage: Storage,
+    product: dict,
+    quantity: int,
+    buyer: dict,
+    idempotency_key: Optional[str] = None,
+) -> dict:
+    """Reserve stock for a checkout; retries with the same key get the same order"""
+    order = await storage.create_order(new_order(product, quantity, buyer, idempotency_key, time.time()))
+    if order is None:
+        raise OutOfStockError(product["id"])
+    if idempotency_key and (
+        order["product_id"] != product["id"]
+        or order["quantity"] != quantity
+        or order["buyer_phone"] != buyer["buyer_phone"]
+    ):
+        raise IdempotencyConflictError(idempotency_key)
+    return order
+
+
+class ReservationSweeper:
+    """Periodically returns stock held by reservations that were never confirmed"""
+
+    def __init__(self):
+        self.expired = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self, storage: Storage):
+        while True:
+            try:
+                self.expired += await storage.expire_orders(time.time())
+            except Exception as e:
+                print(f"Reservation sweep failed: {e}")
+            await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+
+    def start(self, storage: Storage):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(storage))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reservation_sweeper = ReservationSweeper()
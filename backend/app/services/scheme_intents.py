@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Tuple
+
+from app.services.scheme_search import scheme_search
+from app.services.search_index import phrase, tokenize
+from app.utils.aho_corasick import AhoCorasick
+
+# Keyword weights by where the keyword came from
+KEYWORD_WEIGHT = 2.0
+CATEGORY_WEIGHT = 1.5
+NAME_WEIGHT = 1.0
+SYNONYM_FACTOR = 0.8
+
+MIN_SCORE = 1.0
+MAX_SUGGESTIONS = 3
+
+# Name words too common across schemes to signal intent
+GENERIC_NAME_WORDS = {"pm", "pradhan", "mantri", "yojana", "scheme", "samman", "nidhi", "bharat", "national"}
+
+
+def scheme_keywords(scheme: dict) -> Dict[str, float]:
+    """Normalized keyword phrase -> weight for one scheme"""
+    keywords: Dict[str, float] = {}
+
+    def add(text: str, weight: float):
+        key = phrase(text)
+        if key and weight > keywords.get(key, 0.0):
+            keywords[key] = weight
+
+    for keyword in scheme.get("keywords") or []:
+        add(keyword, KEYWORD_WEIGHT)
+    for word in tokenize(scheme.get("name") or ""):
+        if word not in GENERIC_NAME_WORDS and not word.isdigit():
+            add(word, NAME_WEIGHT)
+    add_synonyms(keywords)
+    return keywords
+
+
+def add_synonyms(keywords: Dict[str, float]):
+    """Let single-word keywords also answer to their synonyms and transliterations"""
+    for key, weight in list(keywords.items()):
+        words = key.split()
+        if len(words) == 1:
+            for synonym in scheme_search.synonyms.get(words[0], {}):
+                synonym_key = f" {synonym} "
+                keywords[synonym_key] = max(keywords.get(synonym_key, 0.0), weight * SYNONYM_FACTOR)
+
+
+def render_response(matches: List[Tuple[dict, float]], categories: List[str]) -> str:
+    if not matches:
+        topics = ", ".join(categories) if categories else "farming, health or business"
+        return f"I can help you find government schemes. Try asking about {topics} schemes."
+    best = {field: str(value).rstrip(". ") for field, value in matches[0][0].items()}
+    response = (
+        f"I recommend {best['name']}: {best['description']}. "
+        f"Benefits: {best['benefits']}. Eligibility: {best['eligibility']}. "
+        f"How to apply: {best['application_process']}."
+    )
+    if len(matches) > 1:
+        response += " You could also look at " + ", ".join(scheme["name"] for scheme, _ in matches[1:]) + "."
+    return response
+
+
+class SchemeIntents:
+    """Keyword intent matcher compiled from the scheme catalogue.
+
+    Every scheme's keywords go into one Aho-Corasick automaton, so a chat
+    message is scored against all schemes in a single pass. Category words
+    ("health") are shared by many schemes, so they are matched once per
+    category and only boost schemes, instead of fanning out to each one.
+    """
+
+    def __init__(self):
+        self.automaton: Optional[AhoCorasick] = None
+        self.schemes: Dict[str, dict] = {}
+        self.categories: Dict[str, List[str]] = {}
+
+    def compile(self, schemes: List[dict]) -> Tuple[AhoCorasick, Dict[str, dict], Dict[str, List[str]]]:
+        """The automaton and lookups for ``schemes``, ready for :meth:`install`"""
+        # keyword phrase -> [(kind, scheme id or category, weight)]
+        patterns: Dict[str, List[Tuple[str, str, float]]] = {}
+        categories: Dict[str, List[str]] = {}
+        for scheme in schemes:
+            for keyword, weight in scheme_keywords(scheme).items():
+                patterns.setdefault(keyword, []).append(("scheme", scheme["id"], weight))
+            categories.setdefault(scheme["category"], []).append(scheme["id"])
+        for category in categories:
+            keywords = {phrase(category): CATEGORY_WEIGHT}
+            add_synonyms(keywords)
+            for keyword, weight in keywords.items():
+                patterns.setdefault(keyword, []).append(("category", category, weight))
+        return AhoCorasick(patterns.items()), {scheme["id"]: scheme for scheme in schemes}, categories
+
+    def install(self, compiled: Tuple[AhoCorasick, Dict[str, dict], Dict[str, List[str]]]):
+        self.automaton, self.schemes, self.categories = compiled
+
+    def build(self, schemes: List[dict]):
+        self.install(self.compile(schemes))
+
+    def match(self, message: str, limit: int = MAX_SUGGESTIONS) -> List[Tuple[dict, float, List[str]]]:
+        """(scheme, score, matched keywords) best first"""
+        automaton, schemes, categories = self.automaton, self.schemes, self.categories
+        if automaton is None:
+            return []
+        text = phrase(message)
+        scores: Dict[str, float] = {}
+        matched: Dict[str, List[str]] = {}
+        category_scores: Dict[str, float] = {}
+        category_words: Dict[str, List[str]] = {}
+        seen = set()
+        # Patterns start and end with a space; neighbouring words share it,
+        # so overlapping matches are what we want here
+        for start, end, targets in automaton.iter_matches(text):
+            keyword = text[start + 1:end - 1]
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            for kind, target, weight in targets:
+                if kind == "category":
+                    category_scores[target] = max(category_scores.get(target, 0.0), weight)
+                    category_words.setdefault(target, []).append(keyword)
+                else:
+                    scores[target] = scores.get(target, 0.0) + weight
+                    matched.setdefault(target, []).append(keyword)
+
+        if not scores and category_scores:
+            # Only a topic was named: suggest that topic's schemes in catalogue order
+            best = max(category_scores, key=category_scores.get)
+            for scheme_id in categories[best][:limit]:
+                scores[scheme_id] = 0.0
+                matched[scheme_id] = []
+        for scheme_id in scores:
+            category = schemes[scheme_id]["category"]
+            if category in category_scores:
+                scores[scheme_id] += category_scores[category]
+                matched[scheme_id] = matched[scheme_id] + category_words[category]
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= MIN_SCORE),
+            key=lambda item: -item[1]
+        )[:limit]
+        return [(schemes[scheme_id], score, matched[scheme_id]) for scheme_id, score in ranked]
+
+    def reply(self, message: str) -> dict:
+        matches = self.match(message)
+        return {
+            "response": render_response([(scheme, score) for scheme, score, _ in matches], sorted(self.categories)),
+            "suggested_schemes": [scheme["id"] for scheme, _, _ in matches],
+            "matches": [
+                {"id": scheme["id"], "name": scheme["name"], "score": round(score, 2), "keywords": keywords}
+                for scheme, score, keywords in matches
+            ],
+        }
+
+
+scheme_intents = SchemeIntents()
@@ -0,0 +1,150 @@
+import html
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.services.search_index import BM25Index, stem, tokenize
+
+# Words a rural user may type for the same idea: English, Hinglish
+# spellings and Devanagari. Every word in a group expands to the others.
+SYNONYM_GROUPS = [
+    ["farmer", "kisan", "kisaan", "kheti", "krishi", "agriculture", "agricultural", "farming",
+     "cultivator", "annadata", "किसान", "खेती", "कृषि"],
+    ["crop", "fasal", "फसल"],
+    ["land", "zameen", "jameen", "bhumi", "भूमि", "जमीन"],
+    ["health", "medical", "swasthya", "swasth", "arogya", "ilaj", "treatment", "स्वास्थ्य", "इलाज"],
+    ["hospital", "aspatal", "dawakhana", "अस्पताल"],
+    ["insurance", "bima", "beema", "बीमा"],
+    ["loan", "credit", "rin", "karz", "karza", "ऋण", "कर्ज"],
+    ["business", "enterprise", "vyapar", "vyavsay", "udyam", "व्यापार", "उद्यम"],
+    ["employment", "job", "rozgar", "naukri", "रोजगार", "नौकरी"],
+    ["scheme", "yojana", "yojna", "योजना"],
+    ["house", "housing", "home", "awas", "ghar", "आवास", "घर"],
+    ["woman", "women", "mahila", "female", "महिला"],
+    ["pension", "vridha", "vriddha", "पेंशन"],
+    ["education", "school", "shiksha", "padhai", "scholarship", "शिक्षा"],
+    ["poor", "garib", "gareeb", "bpl", "गरीब"],
+    ["family", "parivar", "परिवार"],
+    ["money", "paisa", "income", "पैसा"],
+]
+
+SYNONYM_WEIGHT = 0.8
+SNIPPET_WORDS = 24
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "description": 1.5,
+    "benefits": 1.0,
+    "eligibility": 1.0,
+    "application_process": 0.5,
+    "documents_required": 0.5,
+}
+# Fields worth showing a snippet from, in display order
+SNIPPET_FIELDS = ("description", "benefits", "eligibility", "application_process", "documents_required", "name")
+
+_TEXT_WORD = re.compile(r"[A-Za-z0-9]+|[\u0900-\u0963\u0966-\u097f]+")
+
+
+def build_synonyms(groups: List[List[str]]) -> Dict[str, Dict[str, float]]:
+    """Stemmed word -> {alternate: weight}, merged across groups"""
+    synonyms: Dict[str, Dict[str, float]] = {}
+    for group in groups:
+        words = {term for word in group for term in tokenize(word)}
+        for word in words:
+            alternates = synonyms.setdefault(word, {})
+            for other in words - {word}:
+                alternates[other] = SYNONYM_WEIGHT
+    return synonyms
+
+
+def scheme_fields(scheme: dict) -> Dict[str, str]:
+    return {
+        field: ", ".join(scheme.get(field) or []) if field == "documents_required" else scheme.get(field) or ""
+        for field in FIELD_WEIGHTS
+    }
+
+
+def highlight(text: str, terms: Set[str], max_words: int = SNIPPET_WORDS) -> Optional[str]:
+    """HTML-escaped window of ``text`` around its first matching word, matches in <mark>"""
+    words = list(_TEXT_WORD.finditer(text))
+    hits = [i for i, word in enumerate(words) if stem(word.group().lower()) in terms]
+    if not hits:
+        return None
+    first = max(hits[0] - max_words // 4, 0)
+    last = min(first + max_words, len(words)) - 1
+    start, end = words[first].start(), words[last].end()
+    if first == 0:
+        start = 0
+    if last == len(words) - 1:
+        end = len(text)
+
+    parts = ["… " if start > 0 else ""]
+    position = start
+    for i in hits:
+        if i < first or i > last:
+            continue
+        word = words[i]
+        parts.append(html.escape(text[position:word.start()]))
+        parts.append(f"<mark>{html.escape(word.group())}</mark>")
+        position = word.end()
+    parts.append(html.escape(text[position:end]))
+    parts.append(" …" if end < len(text) else "")
+    return "".join(parts)
+
+
+class SchemeSearch:
+    """BM25 index over every text field of the scheme catalogue.
+
+    Rebuilt from the catalogue snapshot at startup and on every reload;
+    queries only touch the precomputed postings.
+    """
+
+    def __init__(self, synonym_groups: List[List[str]] = SYNONYM_GROUPS):
+        self.synonyms = build_synonyms(synonym_groups)
+        self.index = BM25Index(FIELD_WEIGHTS)
+        self.schemes: Dict[str, dict] = {}
+
+    def _expand(self, word: str) -> Dict[str, float]:
+        return self.synonyms.get(word, {})
+
+    def compile(self, schemes: List[dict]) -> Tuple[BM25Index, Dict[str, dict]]:
+        """An index built from ``schemes``, ready for :meth:`install`"""
+        index = BM25Index(FIELD_WEIGHTS)
+        for scheme in schemes:
+            index.add(scheme["id"], scheme_fields(scheme))
+        return index, {scheme["id"]: scheme for scheme in schemes}
+
+    def install(self, compiled: Tuple[BM25Index, Dict[str, dict]]):
+        # Swap in complete structures so concurrent readers never see a partial index
+        self.index, self.schemes = compiled
+
+    def build(self, schemes: List[dict]):
+        """Replace the index with one built from ``schemes``"""
+        self.install(self.compile(schemes))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        category: Optional[str] = None,
+    ) -> List[Tuple[dict, float, List[dict]]]:
+        """(scheme, score, highlights) best first"""
+        index, schemes = self.index, self.schemes
+        accept = (lambda scheme_id: schemes[scheme_id]["category"] == category) if category else None
+        ranked = index.search(query, limit, accept=accept, expand=self._expand)
+        terms = {term for group in index.query_terms(query, self._expand) for term in group}
+
+        results = []
+        for scheme_id, score in ranked:
+            scheme = schemes[scheme_id]
+            fields = scheme_fields(scheme)
+            highlights = []
+            for field in SNIPPET_FIELDS:
+                snippet = highlight(fields[field], terms)
+                if snippet:
+                    highlights.append({"field": field, "snippet": snippet})
+            results.append((scheme, score, highlights))
+        return results
+
+
+scheme_search = SchemeSearch()
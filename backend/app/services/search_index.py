@@ -0,0 +1,217 @@
+import math
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+# Latin words and Devanagari words (vowel signs are in the same block)
+_WORD = re.compile(r"[a-z0-9]+|[\u0900-\u0963\u0966-\u097f]+")
+
+STOPWORDS = {"a", "an", "and", "the", "of", "for", "in", "on", "to", "with", "from", "by", "or", "at", "is"}
+
+
+def stem(word: str) -> str:
+    """Fold simple English plurals (tomatoes -> tomato, berries -> berry)"""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ses", "xes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def phrase(text: str) -> str:
+    """Space-delimited normalized tokens, so patterns only match whole words"""
+    tokens = tokenize(text)
+    return f" {' '.join(tokens)} " if tokens else ""
+
+
+class BM25Index:
+    """Incrementally maintained inverted index with BM25 ranking.
+
+    Documents are dicts of field name -> text; ``field_weights`` scales each
+    field's term frequencies (a simple BM25F). Query words also match
+    indexed terms they are a prefix of, at ``prefix_weight`` of the score.
+    Postings are kept as dicts for cheap updates and materialized as numpy
+    arrays on first use, so scoring a term is one vectorized pass.
+    """
+
+    def __init__(
+        self,
+        field_weights: Dict[str, float],
+        k1: float = 1.2,
+        b: float = 0.75,
+        prefix_weight: float = 0.6,
+        max_prefix_terms: int = 30,
+        tokenizer: Callable[[str], List[str]] = tokenize,
+    ):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.max_prefix_terms = max_prefix_terms
+        self.tokenizer = tokenizer
+        # Documents live in integer slots; freed slots are reused
+        self._slots: Dict[Hashable, int] = {}
+        self._slot_ids: List[Optional[Hashable]] = []
+        self._free: List[int] = []
+        self._lengths = np.zeros(64)
+        self._total_length = 0.0
+        # term -> {slot: weighted term frequency}, plus cached array form
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        # Sorted vocabulary for prefix expansion
+        self._vocab: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._slots
+
+    def _allocate(self, doc_id: Hashable) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._slot_ids[slot] = doc_id
+        else:
+            slot = len(self._slot_ids)
+            self._slot_ids.append(doc_id)
+            if slot >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(len(self._lengths))])
+        self._slots[doc_id] = slot
+        return slot
+
+    def add(self, doc_id: Hashable, fields: Dict[str, str]):
+        """Index a document, replacing any previous version"""
+        if doc_id in self._slots:
+            self.remove(doc_id)
+        terms: Counter = Counter()
+        for field, weight in self.field_weights.items():
+            for term in self.tokenizer(fields.get(field) or ""):
+                terms[term] += weight
+        slot = self._allocate(doc_id)
+        for term, tf in terms.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                self._vocab.insert(bisect_left(self._vocab, term), term)
+            posting[slot] = tf
+            self._arrays.pop(term, None)
+        length = sum(terms.values())
+        self._doc_terms[slot] = dict(terms)
+        self._lengths[slot] = length
+        self._total_length += length
+
+    def remove(self, doc_id: Hashable):
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return
+        for term in self._doc_terms.pop(slot):
+            posting = self._postings[term]
+            posting.pop(slot, None)
+            self._arrays.pop(term, None)
+            if not posting:
+                del self._postings[term]
+                del self._vocab[bisect_left(self._vocab, term)]
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0.0
+        self._slot_ids[slot] = None
+        self._free.append(slot)
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self._postings[term]
+            arrays = self._arrays[term] = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting)),
+            )
+        return arrays
+
+    def _expand(self, word: str, prefix: bool = True) -> List[Tuple[str, float]]:
+        """(indexed term, weight) pairs a query word matches"""
+        matches = []
+        if word in self._postings:
+            matches.append((word, 1.0))
+        if prefix and len(word) >= 2:
+            position = bisect_left(self._vocab, word)
+            while (
+                position < len(self._vocab)
+                and len(matches) < self.max_prefix_terms
+                and self._vocab[position].startswith(word)
+            ):
+                term = self._vocab[position]
+                if term != word:
+                    matches.append((term, self.prefix_weight))
+                position += 1
+        return matches
+
+    def query_terms(
+        self,
+        query: str,
+        expand: Optional[Callable[[str], Dict[str, float]]] = None,
+    ) -> List[Dict[str, float]]:
+        """Indexed terms matched by each query word, with their weights.
+
+        ``expand`` maps a query word to alternate words (synonyms) and their
+        weights; only the word as typed is also prefix-matched.
+        """
+        groups = []
+        for word in dict.fromkeys(self.tokenizer(query)):
+            variants = {word: 1.0}
+            if expand is not None:
+                for alternate, weight in expand(word).items():
+                    variants.setdefault(alternate, weight)
+            terms: Dict[str, float] = {}
+            for variant, variant_weight in variants.items():
+                for term, weight in self._expand(variant, prefix=variant == word):
+                    # A term reached several ways counts once, at its best weight
+                    terms[term] = max(terms.get(term, 0.0), variant_weight * weight)
+            if terms:
+                groups.append(terms)
+        return groups
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        accept: Optional[Callable[[Hashable], bool]] = None,
+        expand: Optional[Callable[[str], Dict[str, float]]] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """Top ``limit`` (doc_id, score) pairs, best first; ``accept`` filters candidates"""
+        n_docs = len(self._slots)
+        if not n_docs:
+            return []
+        avg_length = self._total_length / n_docs
+        size = len(self._slot_ids)
+        lengths = self._lengths[:size]
+        scores = np.zeros(size)
+        for terms in self.query_terms(query, expand):
+            for term, weight in terms.items():
+                slots, tf = self._posting_arrays(term)
+                idf = math.log(1 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[slots] / avg_length)
+                scores[slots] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = np.flatnonzero(scores)
+        if accept is None and len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        results = []
+        for slot in candidates:
+            doc_id = self._slot_ids[slot]
+            if accept is None or accept(doc_id):
+                results.append((doc_id, float(scores[slot])))
+                if len(results) == limit:
+                    break
+        return results
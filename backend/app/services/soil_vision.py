@@ -0,0 +1,357 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi import UploadFile
+
+from app.services.image_store import (
+    IMAGE_MAX_BYTES, UPLOAD_CHUNK_SIZE, ImageTooLargeError, UnsupportedImageError, sniff_image
+)
+
+SOIL_IMAGE_WORKERS = int(os.getenv("SOIL_IMAGE_WORKERS", 2))
+# Photos waiting for a worker beyond the ones being analyzed; more get a 503
+SOIL_IMAGE_QUEUE_DEPTH = int(os.getenv("SOIL_IMAGE_QUEUE_DEPTH", 8))
+# Photos are analyzed at this longest edge, whatever the camera resolution
+SOIL_IMAGE_EDGE = int(os.getenv("SOIL_IMAGE_EDGE", 384))
+# Seconds a client is asked to wait when the pool is saturated
+RETRY_AFTER = 5
+# Share of the photo that must look like soil (not plants, sky or glare)
+MIN_SOIL_COVERAGE = 0.25
+
+# Munsell hue families in order round the hue circle, 10 hue steps each
+HUE_FAMILIES = ("R", "YR", "Y", "GY", "G", "BG", "B", "PB", "P", "RP")
+MUNSELL_PATTERN = r"^(10|[1-9](?:\.\d+)?)(R|YR|Y|GY|G|BG|B|PB|P|RP) (\d+(?:\.\d+)?)/(\d+(?:\.\d+)?)$"
+
+# CIELAB hue angle of each family's 5-hue (5R, 5YR, ...), for converting
+# measured colors to Munsell-style hue; the last entry wraps round to 5R
+_LAB_HUE_ANCHORS = np.array([24, 58, 92, 119, 163, 198, 232, 274, 313, 347, 384], dtype=np.float32)
+_MUNSELL_HUE_ANCHORS = np.arange(5, 115, 10, dtype=np.float32)
+
+# Histogram cells centred on Munsell chips: hue in 2.5 steps round the
+# circle, value 0..10 and chroma 0..10+ in whole steps
+HUE_BINS, VALUE_BINS, CHROMA_BINS = 40, 11, 11
+# How far from a reference profile a color or texture may drift and still fit it
+HUE_TOLERANCE, VALUE_TOLERANCE, CHROMA_TOLERANCE = 2.5, 1.0, 1.25
+GRANULARITY_TOLERANCE = 0.12
+
+# sRGB byte -> linear light, applied by lookup instead of a power per pixel
+_LINEAR = np.where(
+    (np.arange(256) / 255.0) <= 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4,
+).astype(np.float32)
+# Linear sRGB -> XYZ scaled by the D65 white point, so white is (1, 1, 1)
+_RGB_TO_XYZ = (np.array([
+    [0.4124, 0.3576, 0.1805],
+    [0.2126, 0.7152, 0.0722],
+    [0.0193, 0.1192, 0.9505],
+]) / np.array([[0.95047], [1.0], [1.08883]])).T.astype(np.float32)
+
+
+class SoilImageBusyError(Exception):
+    pass
+
+
+class NoSoilVisibleError(Exception):
+    pass
+
+
+class SoilProfiles(NamedTuple):
+    """Reference profiles compiled for the workers"""
+    ids: List[str]
+    # histogram cells x profiles: how well each cell's color fits each profile
+    color_fit: np.ndarray
+    value: np.ndarray
+    granularity: np.ndarray
+
+
+def munsell_hue(notation: str) -> float:
+    """Position on the 0-100 hue circle: 5R = 5, 10YR = 20, 2.5Y = 22.5"""
+    number, family = re.match(r"^([\d.]+)([A-Z]+)$", notation).groups()
+    return (HUE_FAMILIES.index(family) * 10 + float(number)) % 100
+
+
+def parse_munsell(notation: str) -> Tuple[float, float, float]:
+    """(hue, value, chroma) of a notation such as "7.5YR 4/3" """
+    match = re.match(MUNSELL_PATTERN, notation.strip())
+    if match is None:
+        raise ValueError(f"Not a Munsell color: {notation!r}")
+    number, family, value, chroma = match.groups()
+    return munsell_hue(number + family), float(value), float(chroma)
+
+
+def format_munsell(hue: float, value: float, chroma: float) -> str:
+    if round(chroma) == 0:
+        return f"N {round(value):d}/"
+    steps = int(round(hue / 2.5)) % 40
+    family, number = divmod(steps, 4)
+    if number == 0:
+        # Munsell writes the end of a family as 10YR rather than 0Y
+        family, number = (family - 1) % 10, 4
+    number = f"{number * 2.5:g}"
+    return f"{number}{HUE_FAMILIES[family]} {round(value):d}/{round(chroma):d}"
+
+
+def _hue_distance(a, b):
+    return (a - b + 50) % 100 - 50
+
+
+def _cell_centers() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hue, value, chroma = np.meshgrid(
+        np.arange(HUE_BINS) * (100 / HUE_BINS),
+        np.arange(VALUE_BINS),
+        np.arange(CHROMA_BINS),
+        indexing="ij",
+    )
+    return hue.ravel(), value.ravel(), chroma.ravel()
+
+
+def compile_profiles(soil_types: Dict[str, dict]) -> SoilProfiles:
+    """Profiles of the soil types that have an ``image_profile`` in the catalogue"""
+    ids, colors, granularity = [], [], []
+    for soil_id, soil in soil_types.items():
+        profile = soil.get("image_profile")
+        if profile:
+            ids.append(soil_id)
+            colors.append(parse_munsell(profile["munsell"]))
+            granularity.append(profile["granularity"])
+    if not ids:
+        raise ValueError("No soil type has an image_profile to compare photos with")
+    colors = np.array(colors, dtype=np.float32).reshape(-1, 3)
+    hue, value, chroma = _cell_centers()
+    distance = (
+        (_hue_distance(hue[:, None], colors[:, 0]) / HUE_TOLERANCE) ** 2
+        + ((value[:, None] - colors[:, 1]) / VALUE_TOLERANCE) ** 2
+        + ((chroma[:, None] - colors[:, 2]) / CHROMA_TOLERANCE) ** 2
+    )
+    return SoilProfiles(
+        ids=ids,
+        color_fit=np.exp(-0.5 * distance).astype(np.float32),
+        value=colors[:, 1],
+        granularity=np.array(granularity, dtype=np.float32),
+    )
+
+
+def decode(data: bytes, edge: int) -> np.ndarray:
+    """RGB pixels of an upload, downscaled to ``edge`` on its longest side"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEGs are decoded straight at 1/2..1/8 scale, never at full size
+            image.draft("RGB", (edge, edge))
+            image = image.convert("RGB")
+            image.thumbnail((edge, edge), Image.Resampling.BOX)
+            return np.asarray(image)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise UnsupportedImageError(f"Could not read image: {e}")
+
+
+def munsell_pixels(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-pixel CIELAB lightness and Munsell-style (hue, value, chroma)"""
+    xyz = _LINEAR[pixels.reshape(-1, 3)] @ _RGB_TO_XYZ
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16 / 116)
+    lightness = 116 * f[:, 1] - 16
+    a = 500 * (f[:, 0] - f[:, 1])
+    b = 200 * (f[:, 1] - f[:, 2])
+    angle = np.degrees(np.arctan2(b, a)) % 360
+    angle = np.where(angle < _LAB_HUE_ANCHORS[0], angle + 360, angle)
+    hue = np.interp(angle, _LAB_HUE_ANCHORS, _MUNSELL_HUE_ANCHORS) % 100
+    # Munsell value is close to L*/10; one chroma step is roughly 5.5 units of C*
+    return lightness, hue, lightness / 10, np.hypot(a, b) / 5.5
+
+
+def granularity(lightness: np.ndarray) -> float:
+    """Fine-grain share of the image's contrast, 0 (smooth) .. 1 (gritty).
+
+    Contrast between neighbouring pixels is compared with contrast between
+    4x4 block averages: sand grains show up at the pixel scale, clods and
+    cracks of clay at the block scale.
+    """
+    height, width = (lightness.shape[0] // 4) * 4, (lightness.shape[1] // 4) * 4
+    lightness = lightness[:height, :width]
+    fine = np.abs(np.diff(lightness, axis=0)).mean() + np.abs(np.diff(lightness, axis=1)).mean()
+    blocks = lightness.reshape(height // 4, 4, width // 4, 4).mean(axis=(1, 3))
+    coarse = np.abs(np.diff(blocks, axis=0)).mean() + np.abs(np.diff(blocks, axis=1)).mean()
+    return float(fine / (fine + coarse + 1e-6))
+
+
+def analyze_image(data: bytes, profiles: SoilProfiles, edge: int = SOIL_IMAGE_EDGE) -> dict:
+    """Color and texture features of a soil photo and its fit to each profile (runs in a worker process)"""
+    pixels = decode(data, edge)
+    lightness, hue, value, chroma = munsell_pixels(pixels)
+
+    # Wet soil reflects the sky as near-white glare; plants and sky are too
+    # saturated in the green..purple hues to be soil
+    glare = lightness > 92
+    foreign = (chroma >= 2.5) & (hue >= 30) & (hue < 95)
+    soil = ~glare & ~foreign & (lightness > 4)
+    coverage = float(soil.mean())
+    if coverage < MIN_SOIL_COVERAGE:
+        raise NoSoilVisibleError("No soil visible in the image; photograph bare soil in daylight")
+
+    cells = (
+        (np.rint(hue[soil] / (100 / HUE_BINS)).astype(np.int32) % HUE_BINS) * (VALUE_BINS * CHROMA_BINS)
+        + np.minimum(np.rint(value[soil]).astype(np.int32), VALUE_BINS - 1) * CHROMA_BINS
+        + np.minimum(np.rint(chroma[soil]).astype(np.int32), CHROMA_BINS - 1)
+    )
+    histogram = np.bincount(cells, minlength=HUE_BINS * VALUE_BINS * CHROMA_BINS).astype(np.float32)
+    histogram /= histogram.sum()
+
+    grain = granularity(lightness.reshape(pixels.shape[:2]))
+    color_fit = histogram @ profiles.color_fit
+    log_fit = np.log(color_fit + 1e-6) - 0.5 * ((grain - profiles.granularity) / GRANULARITY_TOLERANCE) ** 2
+    probability = np.exp(log_fit - log_fit.max())
+    probability /= probability.sum()
+
+    # Mean hue taken round the circle so 9.5R and 0.5YR average to 10R
+    angle = hue[soil] * (2 * np.pi / 100)
+    mean_hue = float(np.arctan2(np.sin(angle).mean(), np.cos(angle).mean()) * 100 / (2 * np.pi)) % 100
+    top_cells = np.argsort(-histogram)[:3]
+    centers = _cell_centers()
+    return {
+        "hue": mean_hue,
+        "value": float(np.median(value[soil])),
+        "chroma": float(np.median(chroma[soil])),
+        "granularity": grain,
+        "glare": float(glare.mean()),
+        "coverage": coverage,
+        "scores": {soil_id: float(p) for soil_id, p in zip(profiles.ids, probability)},
+        "dominant_colors": [
+            {"munsell": format_munsell(*(axis[cell] for axis in centers)), "share": float(histogram[cell])}
+            for cell in top_cells if histogram[cell] > 0
+        ],
+    }
+
+
+def color_name(hue: float, value: float, chroma: float) -> str:
+    shade = "Very dark" if value < 3 else "Dark" if value < 4.5 else "Light" if value >= 6.5 else ""
+    if chroma < 1.5:
+        if value < 2.5:
+            return "Black"
+        tint = "grey"
+    elif hue < 12.5 or hue >= 95:
+        tint = "reddish brown"
+    elif hue >= 21.25:
+        tint = "yellowish brown"
+    else:
+        tint = "brown"
+    return f"{shade} {tint}".strip().capitalize()
+
+
+def describe(features: dict, profiles: SoilProfiles) -> dict:
+    """Human-readable reading of the features for the detected soil type"""
+    soil_id = max(features["scores"], key=features["scores"].get)
+    reference_value = float(profiles.value[profiles.ids.index(soil_id)])
+    # Wetting darkens soil by one to two Munsell value steps, and wet
+    # surfaces catch glare
+    darkening = min(max((reference_value - features["value"]) / 1.5, 0.0), 1.0)
+    moisture = max(darkening, min(features["glare"] * 20, 1.0))
+    # Organic matter darkens soil too; judge it on the value it would have dry
+    dry_value = features["value"] + darkening * 1.5
+    grain = features["granularity"]
+    return {
+        "soil_type": soil_id,
+        "confidence": round(features["scores"][soil_id] * 100),
+        "color": color_name(features["hue"], features["value"], features["chroma"]),
+        "munsell": format_munsell(features["hue"], features["value"], features["chroma"]),
+        "texture": "Coarse" if grain >= 0.65 else "Fine" if grain < 0.45 else "Medium",
+        "moisture": "Moist" if moisture >= 0.66 else "Moderate" if moisture >= 0.33 else "Dry",
+        "organic_content": "Good" if dry_value < 4 else "Moderate" if dry_value < 5.5 else "Low",
+    }
+
+
+class SoilImageClassifier:
+    """Soil photo analysis in a bounded process pool.
+
+    Decoding and feature extraction are CPU-bound, so they run in worker
+    processes and the event loop only streams the upload. At most
+    ``workers + max_queue`` photos are admitted at once; beyond that the
+    caller gets :class:`SoilImageBusyError` straight away instead of an
+    ever-growing queue.
+    """
+
+    def __init__(self, workers: int = SOIL_IMAGE_WORKERS, max_queue: int = SOIL_IMAGE_QUEUE_DEPTH):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.profiles: Optional[SoilProfiles] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def compile(self, soil_types: Dict[str, dict]) -> SoilProfiles:
+        return compile_profiles(soil_types)
+
+    def install(self, profiles: SoilProfiles):
+        self.profiles = profiles
+
+    def build(self, soil_types: Dict[str, dict]):
+        self.install(self.compile(soil_types))
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    async def read(self, upload: UploadFile) -> bytes:
+        chunks, size = [], 0
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if not chunks and sniff_image(chunk) is None:
+                raise UnsupportedImageError("Only JPEG, PNG and WebP images are supported")
+            size += len(chunk)
+            if size > IMAGE_MAX_BYTES:
+                raise ImageTooLargeError(f"Images are limited to {IMAGE_MAX_BYTES // (1024 * 1024)} MB")
+            chunks.append(chunk)
+        if not chunks:
+            raise UnsupportedImageError("Empty upload")
+        return b"".join(chunks)
+
+    async def analyze(self, upload: UploadFile) -> dict:
+        if self.pending >= self.capacity:
+            raise SoilImageBusyError("Soil image analysis is busy, please retry shortly")
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        job: Optional[Future] = None
+        try:
+            data = await self.read(upload)
+            profiles = self.profiles
+            job = self._get_pool().submit(analyze_image, data, profiles)
+            # The slot is held until the worker is done, even if the client
+            # goes away, so abandoned requests still count against the queue
+            job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+            features = await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            print("Soil image pool broke; restarting")
+            self.close()
+            raise SoilImageBusyError("Soil image analysis is restarting, please retry shortly")
+        finally:
+            if job is None:
+                self._release()
+        return {"features": features, **describe(features, profiles)}
+
+    def _release(self):
+        self.pending -= 1
+
+
+soil_image_classifier = SoilImageClassifier()
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.search_index import phrase
+from app.utils.aho_corasick import AhoCorasick
+
+# Conditions scoring below this cosine similarity are not suggested
+MIN_SCORE = 0.2
+MAX_CONDITIONS = 3
+# A symptom directly after one of these words is reported absent ("no fever")
+NEGATIONS = {"no", "not", "without", "nahi", "nahin", "नहीं"}
+
+GENERAL_CONCERN = {
+    "condition": "General Health Concern",
+    "severity": "Unknown",
+    "recommendations": [
+        "Monitor symptoms closely",
+        "Consult healthcare provider for proper diagnosis",
+        "Maintain good hygiene and rest"
+    ],
+    "emergency": False,
+}
+
+
+class SymptomModel:
+    """Symptom vocabulary and weights compiled from the symptom catalogue.
+
+    ``weights`` is a symptoms x conditions matrix; a case is a 0/1 vector
+    over symptoms, so scoring every condition is one row sum (or one matrix
+    product for a batch). Scores are cosine similarities, so conditions
+    with long symptom lists are not favoured just for having more weight.
+    Red flags are symptoms x flags masks that fire when all of a flag's
+    symptoms are present, and always override the scores.
+    """
+
+    def __init__(self, catalogue: dict):
+        self.symptoms = list(catalogue["symptoms"])
+        index = {name: i for i, name in enumerate(self.symptoms)}
+        patterns: Dict[str, int] = {}
+        for name, synonyms in catalogue["symptoms"].items():
+            for text in [name, *synonyms]:
+                key = phrase(text)
+                if key:
+                    patterns[key] = index[name]
+        self.automaton = AhoCorasick(patterns.items())
+
+        self.condition_ids = list(catalogue["conditions"])
+        self.conditions = catalogue["conditions"]
+        self.weights = np.zeros((len(self.symptoms), len(self.condition_ids)), dtype=np.float32)
+        for j, condition in enumerate(self.conditions.values()):
+            for name, weight in condition["weights"].items():
+                self.weights[index[name], j] = weight
+        norms = np.linalg.norm(self.weights, axis=0)
+        self.norms = np.where(norms > 0, norms, 1.0).astype(np.float32)
+
+        self.red_flags = catalogue.get("red_flags") or []
+        self.flag_masks = np.zeros((len(self.red_flags), len(self.symptoms)), dtype=np.int32)
+        for f, flag in enumerate(self.red_flags):
+            self.flag_masks[f, [index[name] for name in flag["symptoms"]]] = 1
+        self.flag_sizes = self.flag_masks.sum(axis=1)
+        self.flag_min_age = np.array(
+            [-np.inf if flag.get("min_age") is None else flag["min_age"] for flag in self.red_flags], dtype=float
+        )
+        self.flag_max_age = np.array(
+            [np.inf if flag.get("max_age") is None else flag["max_age"] for flag in self.red_flags], dtype=float
+        )
+
+    def parse(self, texts: List[str]) -> Tuple[List[int], List[str]]:
+        """(symptom indices present, input texts with no recognized symptom)"""
+        present, absent, unrecognized = set(), set(), []
+        for text in texts:
+            key = phrase(text)
+            matches = sorted(self.automaton.iter_matches(key), key=lambda m: (m[0], -m[1]))
+            if not matches:
+                unrecognized.append(text)
+                continue
+            covered_to = -1
+            for start, end, symptom in matches:
+                # Keep the longest phrase: "severe bleeding" over "bleeding"
+                if end <= covered_to:
+                    continue
+                covered_to = end
+                previous = key[:start].split()
+                (absent if previous and previous[-1] in NEGATIONS else present).add(symptom)
+        return sorted(present - absent), unrecognized
+
+    def vectors(self, cases: List[List[int]]) -> np.ndarray:
+        matrix = np.zeros((len(cases), len(self.symptoms)), dtype=np.float32)
+        for row, indices in enumerate(cases):
+            matrix[row, indices] = 1.0
+        return matrix
+
+    def score(self, cases: List[List[int]], ages: List[Optional[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(cases x conditions scores, cases x red flags fired)"""
+        x = self.vectors(cases)
+        counts = np.maximum(x.sum(axis=1, keepdims=True), 1.0)
+        scores = (x @ self.weights) / (np.sqrt(counts) * self.norms)
+        age = np.array([np.nan if a is None else a for a in ages], dtype=float)[:, None]
+        with np.errstate(invalid="ignore"):
+            # An unknown age never satisfies an age-limited flag
+            in_age = (age >= self.flag_min_age) & (age <= self.flag_max_age)
+        unlimited = np.isinf(self.flag_min_age) & np.isinf(self.flag_max_age)
+        fired = ((x.astype(np.int32) @ self.flag_masks.T) == self.flag_sizes) & (in_age | unlimited)
+        return scores, fired
+
+    def result(self, indices: List[int], unrecognized: List[str], scores: np.ndarray, fired: np.ndarray) -> dict:
+        top = np.argsort(-scores, kind="stable")[:MAX_CONDITIONS]
+        possible = [
+            {"id": self.condition_ids[j], "condition": self.conditions[self.condition_ids[j]]["name"],
+             "score": round(float(scores[j]), 3)}
+            for j in top if scores[j] >= MIN_SCORE
+        ]
+        flags = [self.red_flags[f] for f in np.flatnonzero(fired)]
+        if flags:
+            # Flags are listed by priority; the first one decides the advice
+            chosen = self.conditions[flags[0]["condition"]]
+            primary = {
+                "condition": chosen["name"],
+                "severity": "High",
+                "recommendations": [f"{flags[0]['reason']}: seek medical attention now", *chosen["recommendations"]],
+                "emergency": True,
+            }
+        elif possible:
+            chosen = self.conditions[possible[0]["id"]]
+            primary = {
+                "condition": chosen["name"],
+                "severity": chosen["severity"],
+                "recommendations": chosen["recommendations"],
+                "emergency": chosen["emergency"],
+            }
+        else:
+            primary = dict(GENERAL_CONCERN)
+        return {
+            **primary,
+            "red_flags": [{"id": flag["id"], "reason": flag["reason"]} for flag in flags],
+            "possible_conditions": possible,
+            "matched_symptoms": [self.symptoms[i] for i in indices],
+            "unrecognized": unrecognized,
+        }
+
+
+class SymptomChecker:
+    """Holds the compiled model for the current symptom catalogue"""
+
+    def __init__(self):
+        self.model: Optional[SymptomModel] = None
+
+    def compile(self, catalogue: dict) -> SymptomModel:
+        return SymptomModel(catalogue)
+
+    def install(self, model: SymptomModel):
+        self.model = model
+
+    def build(self, catalogue: dict):
+        self.install(self.compile(catalogue))
+
+    def check(self, symptoms: List[str], age: Optional[int] = None) -> dict:
+        return self.check_batch([(symptoms, age)])[0]
+
+    def check_batch(self, cases: List[Tuple[List[str], Optional[int]]]) -> List[dict]:
+        model = self.model
+        parsed = [model.parse(symptoms) for symptoms, _ in cases]
+        scores, fired = model.score([indices for indices, _ in parsed], [age for _, age in cases])
+        return [
+            model.result(indices, unrecognized, scores[row], fired[row])
+            for row, (indices, unrecognized) in enumerate(parsed)
+        ]
+
+
+symptom_checker = SymptomChecker()
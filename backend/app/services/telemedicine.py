@@ -0,0 +1,392 @@
+import asyncio
+import math
+import os
+import time
+import uuid
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from app.storage.base import Storage
+
+SLOT_MINUTES = int(os.getenv("CONSULTATION_SLOT_MINUTES", 15))
+# Days ahead (including today) that can be booked
+HORIZON_DAYS = int(os.getenv("CONSULTATION_HORIZON_DAYS", 7))
+# Seconds between re-reading bookings made by other workers and
+# extending the calendar as days pass
+SYNC_INTERVAL = float(os.getenv("CONSULTATION_SYNC_INTERVAL", 30))
+LINK_BASE = os.getenv("CONSULTATION_LINK_BASE", "https://meet.gramsathi.com/consultation")
+# Attempts at the next nearest slot when other workers keep winning the race
+MAX_ATTEMPTS = 20
+
+CLINIC_TZ = timezone(timedelta(hours=5, minutes=30))
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+SLOT_SECONDS = SLOT_MINUTES * 60
+# Slot numbers count from a local midnight so slots line up with clock times
+_ORIGIN = datetime(2024, 1, 1, tzinfo=CLINIC_TZ).timestamp()
+
+
+def slot_of(ts: float) -> int:
+    return int((ts - _ORIGIN) // SLOT_SECONDS)
+
+
+def slot_start(slot: int) -> float:
+    return _ORIGIN + slot * SLOT_SECONDS
+
+
+def local_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, CLINIC_TZ).isoformat()
+
+
+def parse_time(text: str) -> float:
+    """Timestamp of an ISO date/time; times without a zone are clinic local time"""
+    moment = datetime.fromisoformat(text.strip())
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=CLINIC_TZ)
+    return moment.timestamp()
+
+
+class _AlreadyHandled(Exception):
+    """A waitlisted booking was promoted or cancelled by another request"""
+
+
+class SlotIntervals:
+    """Disjoint, sorted half-open runs ``[start, end)`` of slot numbers.
+
+    A doctor's free time is a few runs per day rather than one entry per
+    slot, so taking, releasing and finding the nearest free slot are a
+    bisect plus a small list edit.
+    """
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, slot: int) -> bool:
+        i = bisect_right(self.starts, slot) - 1
+        return i >= 0 and slot < self.ends[i]
+
+    def add(self, start: int, end: int):
+        """Mark ``[start, end)`` free; it must not overlap free slots"""
+        if start >= end:
+            return
+        i = bisect_right(self.starts, start)
+        joins_left = i > 0 and self.ends[i - 1] == start
+        joins_right = i < len(self.starts) and self.starts[i] == end
+        if joins_left and joins_right:
+            self.ends[i - 1] = self.ends[i]
+            del self.starts[i], self.ends[i]
+        elif joins_left:
+            self.ends[i - 1] = end
+        elif joins_right:
+            self.starts[i] = start
+        else:
+            self.starts.insert(i, start)
+            self.ends.insert(i, end)
+        self.size += end - start
+
+    def take(self, slot: int) -> bool:
+        """Remove one slot; False if it was not free"""
+        i = bisect_right(self.starts, slot) - 1
+        if i < 0 or slot >= self.ends[i]:
+            return False
+        start, end = self.starts[i], self.ends[i]
+        if start == slot and end == slot + 1:
+            del self.starts[i], self.ends[i]
+        elif start == slot:
+            self.starts[i] = slot + 1
+        elif end == slot + 1:
+            self.ends[i] = slot
+        else:
+            self.ends[i] = slot
+            self.starts.insert(i + 1, slot + 1)
+            self.ends.insert(i + 1, end)
+        self.size -= 1
+        return True
+
+    def nearest(self, target: int, lowest: int) -> Optional[int]:
+        """Free slot closest to ``target`` that is not before ``lowest``; ties go to the later one"""
+        best = None
+        after = max(target, lowest)
+        i = bisect_right(self.starts, after) - 1
+        if i >= 0 and after < self.ends[i]:
+            best = after
+        elif i + 1 < len(self.starts):
+            best = self.starts[i + 1]
+        if target > lowest:
+            j = bisect_right(self.starts, target - 1) - 1
+            if j >= 0:
+                before = min(self.ends[j] - 1, target - 1)
+                if before >= max(self.starts[j], lowest) and (best is None or target - before < best - target):
+                    best = before
+        return best
+
+    def between(self, low: int, high: int) -> Iterator[int]:
+        """Free slots in ``[low, high)``"""
+        i = max(bisect_right(self.starts, low) - 1, 0)
+        while i < len(self.starts) and self.starts[i] < high:
+            yield from range(max(self.starts[i], low), min(self.ends[i], high))
+            i += 1
+
+
+def working_slots(hours: Dict[str, List[List[str]]], first_day: datetime, days: int) -> SlotIntervals:
+    """Slots inside a weekly roster (``{"mon": [["09:00", "13:00"]], ...}``) over ``days`` days"""
+    slots = SlotIntervals()
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        for opens, closes in hours.get(WEEKDAYS[day.weekday()], []):
+            start = datetime.combine(day.date(), datetime.strptime(opens, "%H:%M").time(), CLINIC_TZ)
+            end = datetime.combine(day.date(), datetime.strptime(closes, "%H:%M").time(), CLINIC_TZ)
+            # Partial slots at either end of a shift are dropped
+            slots.add(math.ceil((start.timestamp() - _ORIGIN) / SLOT_SECONDS), slot_of(end.timestamp()))
+    return slots
+
+
+class DoctorCalendar:
+    def __init__(self, doctor_id: str, doctor: dict, working: SlotIntervals):
+        self.doctor_id = doctor_id
+        self.doctor = doctor
+        self.working = working
+        self.free = SlotIntervals()
+        for start, end in zip(working.starts, working.ends):
+            self.free.add(start, end)
+
+
+class TelemedicineScheduler:
+    """Allocates consultation slots from the doctors' rosters.
+
+    Each worker keeps every doctor's free slots in ``SlotIntervals`` and
+    picks and removes a slot without awaiting, so concurrent requests in a
+    worker never pick the same one. Storage has a unique index on
+    (doctor, slot), so a slot another worker booked first is refused there;
+    it is dropped locally and the next nearest slot is tried. Requests that
+    find no capacity join a waitlist, promoted in order as slots free up.
+    """
+
+    def __init__(self):
+        self.doctors: Dict[str, dict] = {}
+        self.calendars: Dict[str, DoctorCalendar] = {}
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def compile(self, doctors: Dict[str, dict], storage: Storage) -> Dict[str, DoctorCalendar]:
+        """Free slots for a roster, less the bookings already in storage"""
+        now = time.time()
+        today = datetime.fromtimestamp(now, CLINIC_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        calendars = {
+            doctor_id: DoctorCalendar(doctor_id, doctor, working_slots(doctor["hours"], today, HORIZON_DAYS))
+            for doctor_id, doctor in doctors.items()
+        }
+        for booking in await storage.list_bookings("confirmed", from_ts=today.timestamp()):
+            calendar = calendars.get(booking["doctor_id"])
+            if calendar is not None:
+                calendar.free.take(slot_of(booking["start_ts"]))
+        return calendars
+
+    def install(self, doctors: Dict[str, dict], calendars: Dict[str, DoctorCalendar]):
+        """Use a new roster and the calendars compiled from it"""
+        self.doctors, self.calendars = doctors, calendars
+
+    async def refresh(self, storage: Storage):
+        """Rebuild free slots from the roster and the bookings in storage"""
+        async with self._refresh_lock:
+            doctors = self.doctors
+            calendars = await self.compile(doctors, storage)
+            # Swap whole structures; bookings in flight re-check in storage.
+            # A roster installed meanwhile came with its own calendars.
+            if self.doctors is doctors:
+                self.calendars = calendars
+        await self.promote_waitlist(storage)
+
+    @staticmethod
+    def serves(calendar: DoctorCalendar, specialty: Optional[str], doctor_id: Optional[str]) -> bool:
+        if doctor_id and calendar.doctor_id != doctor_id:
+            return False
+        return not specialty or calendar.doctor["specialty"].lower() == specialty.strip().lower()
+
+    def candidates(self, specialty: Optional[str], doctor_id: Optional[str]) -> List[DoctorCalendar]:
+        return [c for c in self.calendars.values() if self.serves(c, specialty, doctor_id)]
+
+    def allocate(self, preferred_ts: float, specialty: Optional[str] = None, doctor_id: Optional[str] = None):
+        """Take the free slot nearest to ``preferred_ts``: (calendar, slot) or None"""
+        target = slot_of(preferred_ts)
+        lowest = slot_of(time.time()) + 1
+        best = None
+        for calendar in self.candidates(specialty, doctor_id):
+            slot = calendar.free.nearest(target, lowest)
+            if slot is None:
+                continue
+            # Nearest first, later over earlier at equal distance, then the
+            # least booked doctor so load spreads across the roster
+            rank = (abs(slot - target), slot < target, -len(calendar.free))
+            if best is None or rank < best[0]:
+                best = (rank, calendar, slot)
+        if best is None:
+            return None
+        _, calendar, slot = best
+        calendar.free.take(slot)
+        return calendar, slot
+
+    def release(self, doctor_id: str, start_ts: float) -> Optional[DoctorCalendar]:
+        """Free a booked slot; the calendar that gained it, if any"""
+        calendar = self.calendars.get(doctor_id)
+        slot = slot_of(start_ts)
+        if calendar is not None and slot in calendar.working and slot not in calendar.free:
+            calendar.free.add(slot, slot + 1)
+            return calendar
+        return None
+
+    @staticmethod
+    def _booked_fields(calendar: DoctorCalendar, slot: int) -> dict:
+        start = slot_start(slot)
+        return {
+            "status": "confirmed",
+            "doctor_id": calendar.doctor_id,
+            "doctor": calendar.doctor["name"],
+            "specialty": calendar.doctor["specialty"],
+            "start_ts": start,
+            "scheduled_time": local_time(start),
+            "end_time": local_time(start + SLOT_SECONDS),
+        }
+
+    async def _place(self, storage: Storage, booking: dict, save) -> Optional[dict]:
+        """Find a slot for ``booking`` and store it with ``save``; None if no capacity"""
+        for _ in range(MAX_ATTEMPTS):
+            allocation = self.allocate(booking["preferred_ts"], booking.get("requested_specialty"),
+                                       booking.get("requested_doctor_id"))
+            if allocation is None:
+                return None
+            calendar, slot = allocation
+            try:
+                stored = await save(self._booked_fields(calendar, slot))
+            except Exception:
+                calendar.free.add(slot, slot + 1)
+                raise
+            if stored is not None:
+                return stored
+            # Another worker booked this slot first; it stays taken here too
+        return None
+
+    async def book(
+        self,
+        storage: Storage,
+        patient: dict,
+        preferred_ts: float,
+        specialty: Optional[str] = None,
+        doctor_id: Optional[str] = None,
+    ) -> dict:
+        booking_id = f"CONS-{uuid.uuid4().hex[:10].upper()}"
+        booking = {
+            "booking_id": booking_id,
+            **patient,
+            "requested_specialty": specialty,
+            "requested_doctor_id": doctor_id,
+            "preferred_time": local_time(preferred_ts),
+            "preferred_ts": preferred_ts,
+            "consultation_link": f"{LINK_BASE}/{booking_id}",
+            "created_at": local_time(time.time()),
+        }
+
+        async def save(fields: dict) -> Optional[dict]:
+            return await storage.create_booking({**booking, **fields})
+
+        stored = await self._place(storage, booking, save)
+        if stored is None:
+            stored = await storage.create_booking(
+                {**booking, "status": "waitlisted", "doctor_id": None, "start_ts": None}
+            )
+        return stored
+
+    async def cancel(self, storage: Storage, booking_id: str) -> Optional[dict]:
+        booking = await storage.get_booking(booking_id)
+        if booking is None or booking["status"] not in ("confirmed", "waitlisted"):
+            return None
+        status, doctor_id, start_ts = booking["status"], booking["doctor_id"], booking["start_ts"]
+        cancelled = await storage.update_booking(booking_id, status, status="cancelled")
+        if cancelled is None:
+            return None
+        if status == "confirmed":
+            freed = self.release(doctor_id, start_ts)
+            if freed is not None:
+                await self.promote_waitlist(storage, freed)
+        return cancelled
+
+    async def promote_waitlist(self, storage: Storage, freed: Optional[DoctorCalendar] = None) -> int:
+        """Give free slots to waitlisted patients, earliest request first.
+
+        After a cancellation only ``freed`` gained a slot, so only bookings
+        that doctor can take are tried, and only while it has free slots.
+        """
+        promoted = 0
+        for booking in await storage.list_bookings("waitlisted"):
+            specialty, doctor_id = booking.get("requested_specialty"), booking.get("requested_doctor_id")
+            if freed is not None:
+                if not len(freed.free):
+                    break
+                if not self.serves(freed, specialty, doctor_id):
+                    continue
+            elif not any(len(c.free) for c in self.candidates(specialty, doctor_id)):
+                continue
+
+            async def save(fields: dict, booking_id: str = booking["booking_id"]) -> Optional[dict]:
+                stored = await storage.update_booking(booking_id, "waitlisted", **fields)
+                if stored is None and (await storage.get_booking(booking_id) or {}).get("status") != "waitlisted":
+                    # Promoted or cancelled elsewhere: stop, and hand the slot back
+                    raise _AlreadyHandled()
+                return stored
+
+            try:
+                if await self._place(storage, booking, save) is not None:
+                    promoted += 1
+            except _AlreadyHandled:
+                continue
+        return promoted
+
+    def availability(
+        self,
+        start_ts: float,
+        end_ts: float,
+        specialty: Optional[str] = None,
+        doctor_id: Optional[str] = None,
+    ) -> List[dict]:
+        """Free slots per doctor in ``[start_ts, end_ts)``, read from the free intervals only"""
+        low = max(math.ceil((start_ts - _ORIGIN) / SLOT_SECONDS), slot_of(time.time()) + 1)
+        high = slot_of(end_ts)
+        return [
+            {
+                "doctor_id": calendar.doctor_id,
+                "doctor": calendar.doctor["name"],
+                "specialty": calendar.doctor["specialty"],
+                "languages": calendar.doctor.get("languages", []),
+                "free_slots": [local_time(slot_start(slot)) for slot in calendar.free.between(low, high)],
+            }
+            for calendar in self.candidates(specialty, doctor_id)
+        ]
+
+    async def run(self, storage: Storage):
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            try:
+                await self.refresh(storage)
+            except Exception as e:
+                print(f"Consultation calendar refresh failed: {e}")
+
+    def start(self, storage: Storage):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(storage))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+telemedicine_scheduler = TelemedicineScheduler()
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# Shared weather alert feeds. Each subscribed location is fetched once per
+# interval no matter how many clients watch it, and clients only receive an
+# event when an alert threshold is crossed (plus the current state when they
+# subscribe).
+ALERT_INTERVAL = float(os.getenv("WEATHER_ALERT_INTERVAL", 300))
+ALERT_MAX_SUBSCRIBERS = int(os.getenv("WEATHER_ALERT_MAX_SUBSCRIBERS", 500))
+ALERT_QUEUE_SIZE = int(os.getenv("WEATHER_ALERT_QUEUE_SIZE", 20))
+HEAT_THRESHOLD = float(os.getenv("WEATHER_ALERT_HEAT_C", 40))
+WIND_THRESHOLD = float(os.getenv("WEATHER_ALERT_WIND_KMH", 40))
+RAIN_WORDS = ("rain", "drizzle", "thunderstorm", "shower")
+
+
+class SubscriberLimitError(Exception):
+    """Raised when a location already has the maximum number of subscribers"""
+
+
+def alert_flags(weather: Any) -> Dict[str, bool]:
+    """Which alert thresholds the current conditions are past"""
+    description = weather.description.lower()
+    return {
+        "rain": any(word in description for word in RAIN_WORDS),
+        "heat": weather.temperature >= HEAT_THRESHOLD,
+        "wind": weather.wind_speed >= WIND_THRESHOLD,
+    }
+
+
+class Subscription:
+    """One client's bounded event queue; the oldest event is dropped when full"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=ALERT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, event: dict):
+        if self.queue.full():
+            # A slow client gets the latest state rather than stalling the feed
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class LocationFeed:
+    def __init__(self, location: str):
+        self.location = location
+        self.subscribers: Set[Subscription] = set()
+        self.last_event: Optional[dict] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class AlertHub:
+    """Polls each watched location once per interval and fans out changes"""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]], key: Callable[[str], str]):
+        self._fetch = fetch
+        self._key = key
+        self._feeds: Dict[str, LocationFeed] = {}
+
+    def subscribe(self, locations: List[str]) -> Subscription:
+        keys = {self._key(location): location for location in locations}
+        for key in keys:
+            feed = self._feeds.get(key)
+            if feed is not None and len(feed.subscribers) >= ALERT_MAX_SUBSCRIBERS:
+                raise SubscriberLimitError(f"Too many subscribers for {feed.location}")
+
+        subscription = Subscription()
+        for key, location in keys.items():
+            feed = self._feeds.get(key)
+            if feed is None:
+                feed = self._feeds[key] = LocationFeed(location)
+            feed.subscribers.add(subscription)
+            if feed.last_event is not None:
+                subscription.push(feed.last_event)
+            if feed.task is None:
+                feed.task = asyncio.create_task(self._poll(key, feed))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for key, feed in list(self._feeds.items()):
+            feed.subscribers.discard(subscription)
+            if not feed.subscribers:
+                # Nobody is watching; stop polling this location
+                if feed.task is not None:
+                    feed.task.cancel()
+                del self._feeds[key]
+
+    async def _poll(self, key: str, feed: LocationFeed):
+        while True:
+            try:
+                weather = await self._fetch(feed.location)
+                flags = alert_flags(weather)
+                previous = feed.last_event["alerts"] if feed.last_event else None
+                if flags != previous:
+                    # The first reading reports whichever alerts are already active
+                    changed = [
+                        name for name, on in flags.items()
+                        if (on if previous is None else previous[name] != on)
+                    ]
+                    feed.last_event = {
+                        "location": weather.location,
+                        "alerts": flags,
+                        "changed": changed,
+                        "temperature": weather.temperature,
+                        "wind_speed": weather.wind_speed,
+                        "description": weather.description,
+                        "timestamp": int(time.time()),
+                    }
+                    for subscription in list(feed.subscribers):
+                        subscription.push(feed.last_event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Weather alert poll failed for {feed.location}: {e}")
+            await asyncio.sleep(ALERT_INTERVAL)
+
+    async def stop(self):
+        for feed in self._feeds.values():
+            if feed.task is not None:
+                feed.task.cancel()
+        self._feeds.clear()
+
+    def stats(self) -> dict:
+        return {
+            "locations": len(self._feeds),
+            "subscribers": {feed.location: len(feed.subscribers) for feed in self._feeds.values()},
+        }
+
+
+def format_sse(event: dict) -> str:
+    return f"event: alert\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,118 @@
+import asyncio
+import os
+from typing import List, Optional
+
+from app.api import weather
+
+# Background refresh of popular cities so user requests hit warm cache entries.
+#
+# WEATHER_PREWARM_MODE:
+#   "all" - every city in INDIAN_CITIES
+#   "hot" - the WEATHER_PREWARM_TOP_N most requested locations, topped up
+#           from INDIAN_CITIES until enough real traffic has been seen
+#   comma separated list - exactly those cities
+PREWARM_MODE = os.getenv("WEATHER_PREWARM_MODE", "all")
+PREWARM_TOP_N = int(os.getenv("WEATHER_PREWARM_TOP_N", 30))
+# Free tier allows 60 calls/minute; leave headroom for user-driven misses
+PREWARM_CALLS_PER_MINUTE = float(os.getenv("WEATHER_PREWARM_CALLS_PER_MINUTE", 30))
+# Refresh once an entry has used this fraction of its TTL
+PREWARM_REFRESH_AT = float(os.getenv("WEATHER_PREWARM_REFRESH_AT", 0.8))
+PREWARM_FORECAST_DAYS = int(os.getenv("WEATHER_PREWARM_FORECAST_DAYS", 5))
+PREWARM_CHECK_INTERVAL = float(os.getenv("WEATHER_PREWARM_CHECK_INTERVAL", 30))
+
+
+class WeatherPrewarmer:
+    """Keeps current weather and forecasts for popular cities warm"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+
+    def cities(self) -> List[str]:
+        mode = PREWARM_MODE.strip()
+        if mode == "all":
+            return list(dict.fromkeys(weather.INDIAN_CITIES))
+        if mode == "hot":
+            cities = weather.hot_locations(PREWARM_TOP_N)
+            seen = {weather.normalize_location(c) for c in cities}
+            for city in weather.INDIAN_CITIES:
+                if len(cities) >= PREWARM_TOP_N:
+                    break
+                if weather.normalize_location(city) not in seen:
+                    seen.add(weather.normalize_location(city))
+                    cities.append(city)
+            return cities
+        return [c.strip() for c in mode.split(",") if c.strip()]
+
+    def is_due(self, kind: str, city: str) -> bool:
+        """Whether the cache entry is missing or close to expiry"""
+        key = weather.normalize_location(city)
+        if kind == "current":
+            cache = weather.current_weather_cache
+        else:
+            cache = weather.forecast_cache
+            key = (key, PREWARM_FORECAST_DAYS)
+        age = cache.age(key)
+        return age is None or age >= cache.ttl * PREWARM_REFRESH_AT
+
+    def due(self) -> List[tuple]:
+        """(kind, city) pairs that need refreshing"""
+        return [
+            (kind, city)
+            for city in self.cities()
+            for kind in ("current", "forecast")
+            if self.is_due(kind, city)
+        ]
+
+    async def refresh(self, kind: str, city: str):
+        key = weather.normalize_location(city)
+        try:
+            if kind == "current":
+                await weather.current_weather_cache.refresh(
+                    key, lambda: weather.fetch_current_weather(city)
+                )
+            else:
+                await weather.forecast_cache.refresh(
+                    (key, PREWARM_FORECAST_DAYS),
+                    lambda: weather.fetch_weather_forecast(city, PREWARM_FORECAST_DAYS)
+                )
+            self.refreshed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Weather pre-warm failed for {kind} {city}: {e}")
+
+    async def run(self):
+        spacing = 60.0 / PREWARM_CALLS_PER_MINUTE
+        while True:
+            jobs = self.due()
+            for kind, city in jobs:
+                # A user request may have refreshed it since the scan
+                if not self.is_due(kind, city):
+                    continue
+                await self.refresh(kind, city)
+                # Spread calls evenly to stay under the upstream rate limit
+                await asyncio.sleep(spacing)
+            if not jobs:
+                await asyncio.sleep(PREWARM_CHECK_INTERVAL)
+
+    def start(self):
+        if not os.getenv("OPENWEATHER_API_KEY"):
+            # Mock data needs no warming
+            return
+        if os.getenv("WEATHER_PREWARM_ENABLED", "true").lower() in ("0", "false", "no"):
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+prewarmer = WeatherPrewarmer()
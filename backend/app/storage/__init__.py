@@ -0,0 +1,30 @@
+# Pluggable storage backends
+import os
+from typing import Optional
+
+from app.storage.base import Storage
+
+_storage: Optional[Storage] = None
+
+
+def create_storage() -> Storage:
+    """Build the backend selected by STORAGE_BACKEND (sqlite or memory)"""
+    backend = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        from app.storage.memory import MemoryStorage
+        return MemoryStorage()
+    if backend == "sqlite":
+        from app.storage.sqlite import SQLiteStorage, database_path
+        return SQLiteStorage(
+            database_path(os.getenv("DATABASE_URL", "sqlite:///./gramsathi.db")),
+            pool_size=int(os.getenv("SQLITE_POOL_SIZE", 4))
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+def get_storage() -> Storage:
+    """Return the process-wide storage backend"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -0,0 +1,106 @@
+from typing import Iterable, List, Optional, Tuple
+
+
+class ProductExistsError(Exception):
+    """A product with the same id is already stored"""
+
+
+class Storage:
+    """Interface for marketplace and consultation persistence.
+
+    Every method is a coroutine so blocking backends can run their I/O off
+    the event loop. Product pagination keys have the shapes defined by
+    ``app.services.product_store.SORT_KEYS``.
+    """
+
+    async def start(self):
+        """Open connections and create the schema"""
+
+    async def close(self):
+        """Release connections"""
+
+    async def seed(self, products: Iterable[dict] = ()):
+        """Insert built-in products that are not stored yet"""
+        raise NotImplementedError
+
+    # Products
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_products(self, product_ids: List[str]) -> List[dict]:
+        """Products for the given ids, in the same order; unknown ids are skipped"""
+        raise NotImplementedError
+
+    async def products_since(self, after_seq: int, limit: int) -> List[Tuple[int, dict]]:
+        """(seq, product) pairs inserted after ``after_seq``, oldest first"""
+        raise NotImplementedError
+
+    async def add_products(self, products: List[dict]):
+        """Store new products all-or-nothing.
+
+        Raises ProductExistsError if any id is already taken; nothing from
+        the batch is stored then.
+        """
+        raise NotImplementedError
+
+    async def update_product(self, product_id: str, **fields) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def page_products(
+        self,
+        sort: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        category: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[tuple]]:
+        raise NotImplementedError
+
+    async def count_products(self, category: Optional[str] = None, location: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    # Orders and stock reservations
+    async def create_order(self, order: dict) -> Optional[dict]:
+        """Reserve ``order["quantity"]`` of the product and store the order atomically.
+
+        Stock is taken with a compare-and-swap decrement, so concurrent
+        checkouts can never oversell. If an order with the same
+        ``idempotency_key`` exists it is returned unchanged instead. Returns
+        None when there is not enough stock.
+        """
+        raise NotImplementedError
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def confirm_order(self, order_id: str, now: float) -> Optional[dict]:
+        """Mark an unexpired reservation confirmed; None if it is not reserved"""
+        raise NotImplementedError
+
+    async def cancel_order(self, order_id: str) -> Optional[dict]:
+        """Cancel a reservation and return its stock; None if it is not reserved"""
+        raise NotImplementedError
+
+    async def expire_orders(self, now: float) -> int:
+        """Expire reservations past their deadline and return their stock"""
+        raise NotImplementedError
+
+    # Telemedicine bookings
+    async def create_booking(self, booking: dict) -> Optional[dict]:
+        """Store a booking; None if its doctor and slot are already booked"""
+        raise NotImplementedError
+
+    async def get_booking(self, booking_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def update_booking(self, booking_id: str, expected_status: str, **fields) -> Optional[dict]:
+        """Change a booking that still has ``expected_status``.
+
+        Returns None if the status has changed meanwhile or the new
+        doctor/slot is already booked by someone else.
+        """
+        raise NotImplementedError
+
+    async def list_bookings(self, status: str, from_ts: Optional[float] = None) -> List[dict]:
+        """Bookings with ``status`` in creation order, from ``from_ts`` by slot start if given"""
+        raise NotImplementedError
@@ -0,0 +1,152 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.product_store import ProductRepository
+from app.storage.base import ProductExistsError, Storage
+
+
+class MemoryStorage(Storage):
+    """Process-local storage; data is lost on restart and not shared between workers"""
+
+    def __init__(self):
+        self.products = ProductRepository()
+        self.orders: Dict[str, dict] = {}
+        self.order_keys: Dict[str, str] = {}
+        # (expires_ts, order_id) of reservations, earliest first
+        self.reservation_deadlines: List[Tuple[float, str]] = []
+        self.bookings: Dict[str, dict] = {}
+        # (doctor_id, start_ts) -> booking_id of every booked slot
+        self.booked_slots: Dict[Tuple[str, float], str] = {}
+        # Waitlisted bookings in creation order, read on every promotion
+        self.waitlist: Dict[str, dict] = {}
+
+    async def seed(self, products: Iterable[dict] = ()):
+        for product in products:
+            if self.products.get(product["id"]) is None:
+                self.products.add(dict(product))
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        return self.products.get(product_id)
+
+    async def get_products(self, product_ids: List[str]) -> List[dict]:
+        products = (self.products.get(pid) for pid in product_ids)
+        return [product for product in products if product is not None]
+
+    async def products_since(self, after_seq: int, limit: int) -> List[Tuple[int, dict]]:
+        return self.products.since(after_seq, limit)
+
+    async def add_products(self, products: List[dict]):
+        ids = [product["id"] for product in products]
+        if len(set(ids)) < len(ids) or any(self.products.get(pid) is not None for pid in ids):
+            raise ProductExistsError(ids)
+        for product in products:
+            self.products.add(product)
+
+    async def update_product(self, product_id: str, **fields) -> Optional[dict]:
+        return self.products.update(product_id, **fields)
+
+    async def page_products(
+        self,
+        sort: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        category: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[tuple]]:
+        return self.products.page(sort, limit, after, category=category, location=location)
+
+    async def count_products(self, category: Optional[str] = None, location: Optional[str] = None) -> int:
+        return self.products.count(category=category, location=location)
+
+    # Each method below runs without awaiting, so the stock check and the
+    # decrement cannot interleave with another request on the event loop
+
+    async def create_order(self, order: dict) -> Optional[dict]:
+        key = order.get("idempotency_key")
+        if key and key in self.order_keys:
+            return self.orders[self.order_keys[key]]
+        product = self.products.get(order["product_id"])
+        if product is None or product["quantity_available"] < order["quantity"]:
+            return None
+        product["quantity_available"] -= order["quantity"]
+        order = dict(order)
+        self.orders[order["order_id"]] = order
+        if key:
+            self.order_keys[key] = order["order_id"]
+        heapq.heappush(self.reservation_deadlines, (order["expires_ts"], order["order_id"]))
+        return order
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        return self.orders.get(order_id)
+
+    async def confirm_order(self, order_id: str, now: float) -> Optional[dict]:
+        order = self.orders.get(order_id)
+        if order is None or order["status"] != "reserved" or order["expires_ts"] <= now:
+            return None
+        order["status"] = "confirmed"
+        return order
+
+    def _release(self, order: dict, status: str):
+        order["status"] = status
+        product = self.products.get(order["product_id"])
+        if product is not None:
+            product["quantity_available"] += order["quantity"]
+
+    async def cancel_order(self, order_id: str) -> Optional[dict]:
+        order = self.orders.get(order_id)
+        if order is None or order["status"] != "reserved":
+            return None
+        self._release(order, "cancelled")
+        return order
+
+    async def expire_orders(self, now: float) -> int:
+        expired = 0
+        deadlines = self.reservation_deadlines
+        while deadlines and deadlines[0][0] <= now:
+            _, order_id = heapq.heappop(deadlines)
+            order = self.orders[order_id]
+            if order["status"] == "reserved":
+                self._release(order, "expired")
+                expired += 1
+        return expired
+
+    async def create_booking(self, booking: dict) -> Optional[dict]:
+        booking = dict(booking)
+        if booking["status"] == "confirmed":
+            slot = (booking["doctor_id"], booking["start_ts"])
+            if slot in self.booked_slots:
+                return None
+            self.booked_slots[slot] = booking["booking_id"]
+        self.bookings[booking["booking_id"]] = booking
+        if booking["status"] == "waitlisted":
+            self.waitlist[booking["booking_id"]] = booking
+        return booking
+
+    async def get_booking(self, booking_id: str) -> Optional[dict]:
+        return self.bookings.get(booking_id)
+
+    async def update_booking(self, booking_id: str, expected_status: str, **fields) -> Optional[dict]:
+        booking = self.bookings.get(booking_id)
+        if booking is None or booking["status"] != expected_status:
+            return None
+        updated = {**booking, **fields}
+        old_slot = (booking.get("doctor_id"), booking.get("start_ts")) if booking["status"] == "confirmed" else None
+        new_slot = (updated.get("doctor_id"), updated.get("start_ts")) if updated["status"] == "confirmed" else None
+        if new_slot is not None and self.booked_slots.get(new_slot, booking_id) != booking_id:
+            return None
+        if old_slot is not None:
+            del self.booked_slots[old_slot]
+        if new_slot is not None:
+            self.booked_slots[new_slot] = booking_id
+        booking.update(fields)
+        if booking["status"] != "waitlisted":
+            # Nothing returns to the waitlist, so its order stays creation order
+            self.waitlist.pop(booking_id, None)
+        return booking
+
+    async def list_bookings(self, status: str, from_ts: Optional[float] = None) -> List[dict]:
+        bookings = self.waitlist if status == "waitlisted" else self.bookings
+        return [
+            b for b in bookings.values()
+            if b["status"] == status and (from_ts is None or (b.get("start_ts") or 0) >= from_ts)
+        ]
@@ -0,0 +1,470 @@
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.services.product_store import location_tokens, created_timestamp
+from app.storage.base import ProductExistsError, Storage
+
+PRODUCT_COLUMNS = [
+    "id", "name", "description", "price", "category", "seller_name", "seller_phone",
+    "location", "image_url", "quantity_available", "unit", "created_at",
+    "latitude", "longitude",
+]
+# Columns added after the first release, created on existing databases at start
+ADDED_PRODUCT_COLUMNS = {"latitude": "REAL", "longitude": "REAL"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL NOT NULL,
+    category TEXT NOT NULL,
+    seller_name TEXT NOT NULL,
+    seller_phone TEXT NOT NULL,
+    location TEXT NOT NULL,
+    image_url TEXT,
+    quantity_available INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    latitude REAL,
+    longitude REAL
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category, seq);
+CREATE INDEX IF NOT EXISTS idx_products_newest ON products (created_ts, seq);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price, seq);
+CREATE TABLE IF NOT EXISTS product_location_tokens (
+    token TEXT NOT NULL,
+    product_seq INTEGER NOT NULL REFERENCES products (seq) ON DELETE CASCADE,
+    PRIMARY KEY (token, product_seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    idempotency_key TEXT UNIQUE,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    expires_ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_reserved ON orders (status, expires_ts);
+CREATE TABLE IF NOT EXISTS bookings (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    booking_id TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    doctor_id TEXT,
+    start_ts REAL,
+    data TEXT NOT NULL
+);
+-- A slot can only be booked once, whichever worker gets there first
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_slot ON bookings (doctor_id, start_ts) WHERE status = 'confirmed';
+CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status, start_ts);
+"""
+
+# Hot queries are fixed strings so each pooled connection keeps them in its
+# prepared statement cache
+SELECT_PRODUCT = f"SELECT seq, created_ts, {', '.join(PRODUCT_COLUMNS)} FROM products"
+GET_PRODUCT = SELECT_PRODUCT + " WHERE id = ?"
+PRODUCTS_SINCE = SELECT_PRODUCT + " WHERE seq > ? ORDER BY seq LIMIT ?"
+# Compare-and-swap stock decrement: only succeeds if enough is left
+RESERVE_STOCK = (
+    "UPDATE products SET quantity_available = quantity_available - ? "
+    "WHERE id = ? AND quantity_available >= ?"
+)
+RETURN_STOCK = "UPDATE products SET quantity_available = quantity_available + ? WHERE id = ?"
+SELECT_ORDER = "SELECT status, data FROM orders"
+INSERT_ORDER = (
+    "INSERT INTO orders (order_id, idempotency_key, product_id, quantity, status, expires_ts, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_PRODUCT = (
+    f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}, created_ts) "
+    f"VALUES ({', '.join('?' for _ in PRODUCT_COLUMNS)}, ?)"
+)
+# Seeding runs in every worker at startup, so rows already there are skipped
+SEED_PRODUCT = INSERT_PRODUCT.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+INSERT_LOCATION_TOKEN = "INSERT OR IGNORE INTO product_location_tokens (token, product_seq) VALUES (?, ?)"
+DELETE_LOCATION_TOKENS = "DELETE FROM product_location_tokens WHERE product_seq = ?"
+LOCATION_TOKEN_FILTER = "seq IN (SELECT product_seq FROM product_location_tokens WHERE token >= ? AND token < ?)"
+SELECT_BOOKING = "SELECT status, doctor_id, start_ts, data FROM bookings"
+INSERT_BOOKING = "INSERT INTO bookings (booking_id, status, doctor_id, start_ts, data) VALUES (?, ?, ?, ?, ?)"
+
+# Keyset pagination per sort order, matching SORT_KEYS:
+# (ORDER BY, "after cursor" predicate, cursor key -> params, row -> cursor key)
+SQL_SORTS: Dict[str, Tuple[str, str, Callable, Callable]] = {
+    "newest": (
+        "created_ts DESC, seq DESC",
+        "(created_ts < ? OR (created_ts = ? AND seq < ?))",
+        lambda key: (-key[0], -key[0], -key[1]),
+        lambda row: (-row["created_ts"], -row["seq"]),
+    ),
+    "price_asc": (
+        "price ASC, seq ASC",
+        "(price > ? OR (price = ? AND seq > ?))",
+        lambda key: (key[0], key[0], key[1]),
+        lambda row: (row["price"], row["seq"]),
+    ),
+    "price_desc": (
+        "price DESC, seq ASC",
+        "(price < ? OR (price = ? AND seq > ?))",
+        lambda key: (-key[0], -key[0], key[1]),
+        lambda row: (-row["price"], row["seq"]),
+    ),
+}
+
+
+def database_path(url: str) -> str:
+    """File path from a sqlite:/// DATABASE_URL (or a bare path)"""
+    if url.startswith("sqlite:///"):
+        return url[len("sqlite:///"):]
+    return url
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by worker threads"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(size):
+            conn = self._connect()
+            self._all.append(conn)
+            self._idle.put(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, cached_statements=128)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers in other workers proceed while one writer commits
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+
+
+def _product(row: sqlite3.Row) -> dict:
+    return {name: row[name] for name in PRODUCT_COLUMNS}
+
+
+def _order(row: sqlite3.Row) -> dict:
+    return {**json.loads(row["data"]), "status": row["status"]}
+
+
+def _booking(row: sqlite3.Row) -> dict:
+    return {**json.loads(row["data"]), "status": row["status"], "doctor_id": row["doctor_id"], "start_ts": row["start_ts"]}
+
+
+def _booking_params(booking: dict) -> tuple:
+    data = {name: value for name, value in booking.items() if name not in ("status", "doctor_id", "start_ts")}
+    return booking["status"], booking.get("doctor_id"), booking.get("start_ts"), json.dumps(data)
+
+
+class SQLiteStorage(Storage):
+    """SQLite (WAL) storage shared by every worker process on one machine"""
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool_size = pool_size
+        self.pool: Optional[ConnectionPool] = None
+
+    async def _run(self, fn: Callable, *args):
+        """Run a blocking function with a pooled connection in a worker thread"""
+        def call():
+            with self.pool.connection() as conn:
+                return fn(conn, *args)
+        return await run_in_threadpool(call)
+
+    async def start(self):
+        if self.pool is None:
+            self.pool = ConnectionPool(self.path, self.pool_size)
+            await self._run(self._migrate)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(products)")}
+        for name, kind in ADDED_PRODUCT_COLUMNS.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE products ADD COLUMN {name} {kind}")
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    # Products
+
+    @staticmethod
+    def _insert_products(conn: sqlite3.Connection, products: List[dict], statement: str = INSERT_PRODUCT):
+        tokens = []
+        with conn:
+            for product in products:
+                cursor = conn.execute(
+                    statement,
+                    [product.get(name) for name in PRODUCT_COLUMNS] + [created_timestamp(product["created_at"])]
+                )
+                if cursor.rowcount:
+                    seq = cursor.lastrowid
+                    tokens.extend((token, seq) for token in set(location_tokens(product["location"])))
+            conn.executemany(INSERT_LOCATION_TOKEN, tokens)
+
+    async def add_products(self, products: List[dict]):
+        try:
+            await self._run(self._insert_products, products)
+        except sqlite3.IntegrityError as e:
+            # The transaction was rolled back, so none of the batch is stored
+            raise ProductExistsError([product["id"] for product in products]) from e
+
+    async def get_product(self, product_id: str) -> Optional[dict]:
+        def get(conn):
+            row = conn.execute(GET_PRODUCT, (product_id,)).fetchone()
+            return _product(row) if row else None
+        return await self._run(get)
+
+    async def get_products(self, product_ids: List[str]) -> List[dict]:
+        if not product_ids:
+            return []
+
+        def get(conn):
+            placeholders = ", ".join("?" for _ in product_ids)
+            rows = conn.execute(f"{SELECT_PRODUCT} WHERE id IN ({placeholders})", product_ids).fetchall()
+            by_id = {row["id"]: _product(row) for row in rows}
+            return [by_id[pid] for pid in product_ids if pid in by_id]
+        return await self._run(get)
+
+    async def products_since(self, after_seq: int, limit: int) -> List[Tuple[int, dict]]:
+        def since(conn):
+            rows = conn.execute(PRODUCTS_SINCE, (after_seq, limit)).fetchall()
+            return [(row["seq"], _product(row)) for row in rows]
+        return await self._run(since)
+
+    async def update_product(self, product_id: str, **fields) -> Optional[dict]:
+        fields = {name: value for name, value in fields.items() if name in PRODUCT_COLUMNS and name != "id"}
+
+        def update(conn):
+            with conn:
+                row = conn.execute(GET_PRODUCT, (product_id,)).fetchone()
+                if row is None:
+                    return None
+                if fields:
+                    values = dict(fields)
+                    if "created_at" in values:
+                        values["created_ts"] = created_timestamp(values["created_at"])
+                    assignments = ", ".join(f"{name} = ?" for name in values)
+                    conn.execute(
+                        f"UPDATE products SET {assignments} WHERE seq = ?",
+                        list(values.values()) + [row["seq"]]
+                    )
+                    if "location" in fields:
+                        conn.execute(DELETE_LOCATION_TOKENS, (row["seq"],))
+                        conn.executemany(
+                            INSERT_LOCATION_TOKEN,
+                            [(token, row["seq"]) for token in set(location_tokens(fields["location"]))]
+                        )
+                product = _product(row)
+                product.update(fields)
+                return product
+        return await self._run(update)
+
+    @staticmethod
+    def _filters(category: Optional[str], location: Optional[str]) -> Optional[Tuple[List[str], list]]:
+        """WHERE clauses and params, or None if nothing can match"""
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if location:
+            tokens = location_tokens(location)
+            if not tokens:
+                return None
+            for token in tokens:
+                # Word-prefix match as a range scan on the token index
+                clauses.append(LOCATION_TOKEN_FILTER)
+                params.extend((token, token + "\uffff"))
+        return clauses, params
+
+    async def page_products(
+        self,
+        sort: str,
+        limit: int,
+        after: Optional[tuple] = None,
+        category: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[tuple]]:
+        filters = self._filters(category, location)
+        if filters is None:
+            return [], None
+        clauses, params = filters
+        order_by, after_clause, after_params, row_key = SQL_SORTS[sort]
+        if after:
+            clauses = clauses + [after_clause]
+            params = params + list(after_params(after))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"{SELECT_PRODUCT}{where} ORDER BY {order_by} LIMIT ?"
+
+        def page(conn):
+            rows = conn.execute(sql, params + [limit + 1]).fetchall()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            return [_product(row) for row in rows], (row_key(rows[-1]) if has_more else None)
+        return await self._run(page)
+
+    async def count_products(self, category: Optional[str] = None, location: Optional[str] = None) -> int:
+        filters = self._filters(category, location)
+        if filters is None:
+            return 0
+        clauses, params = filters
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return await self._run(
+            lambda conn: conn.execute(f"SELECT COUNT(*) FROM products{where}", params).fetchone()[0]
+        )
+
+    # Built-in products
+
+    async def seed(self, products: Iterable[dict] = ()):
+        products = list(products)
+        # INSERT OR IGNORE keeps this safe when several workers start at once
+        await self._run(self._insert_products, products, SEED_PRODUCT)
+
+    # Orders
+
+    async def create_order(self, order: dict) -> Optional[dict]:
+        key = order.get("idempotency_key")
+
+        def existing(conn):
+            row = conn.execute(SELECT_ORDER + " WHERE idempotency_key = ?", (key,)).fetchone()
+            return _order(row) if row else None
+
+        def create(conn):
+            if key:
+                found = existing(conn)
+                if found is not None:
+                    return found
+            data = {name: value for name, value in order.items() if name != "status"}
+            try:
+                with conn:
+                    if not conn.execute(
+                        RESERVE_STOCK, (order["quantity"], order["product_id"], order["quantity"])
+                    ).rowcount:
+                        return None
+                    conn.execute(INSERT_ORDER, (
+                        order["order_id"], key, order["product_id"], order["quantity"],
+                        order["status"], order["expires_ts"], json.dumps(data)
+                    ))
+            except sqlite3.IntegrityError:
+                # Another worker stored the same idempotency key first; the
+                # rollback has already put our stock back
+                return existing(conn)
+            return dict(order)
+        return await self._run(create)
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        def get(conn):
+            row = conn.execute(SELECT_ORDER + " WHERE order_id = ?", (order_id,)).fetchone()
+            return _order(row) if row else None
+        return await self._run(get)
+
+    async def confirm_order(self, order_id: str, now: float) -> Optional[dict]:
+        def confirm(conn):
+            with conn:
+                rows = conn.execute(
+                    "UPDATE orders SET status = 'confirmed' "
+                    "WHERE order_id = ? AND status = 'reserved' AND expires_ts > ? RETURNING status, data",
+                    (order_id, now)
+                ).fetchall()
+            return _order(rows[0]) if rows else None
+        return await self._run(confirm)
+
+    async def cancel_order(self, order_id: str) -> Optional[dict]:
+        def cancel(conn):
+            with conn:
+                rows = conn.execute(
+                    "UPDATE orders SET status = 'cancelled' "
+                    "WHERE order_id = ? AND status = 'reserved' RETURNING product_id, quantity, status, data",
+                    (order_id,)
+                ).fetchall()
+                if not rows:
+                    return None
+                conn.execute(RETURN_STOCK, (rows[0]["quantity"], rows[0]["product_id"]))
+            return _order(rows[0])
+        return await self._run(cancel)
+
+    async def expire_orders(self, now: float) -> int:
+        def expire(conn):
+            with conn:
+                rows = conn.execute(
+                    "UPDATE orders SET status = 'expired' "
+                    "WHERE status = 'reserved' AND expires_ts <= ? RETURNING product_id, quantity",
+                    (now,)
+                ).fetchall()
+                conn.executemany(RETURN_STOCK, [(row["quantity"], row["product_id"]) for row in rows])
+            return len(rows)
+        return await self._run(expire)
+
+    # Telemedicine bookings
+
+    async def create_booking(self, booking: dict) -> Optional[dict]:
+        def create(conn):
+            try:
+                with conn:
+                    conn.execute(INSERT_BOOKING, (booking["booking_id"], *_booking_params(booking)))
+            except sqlite3.IntegrityError:
+                return None
+            return dict(booking)
+        return await self._run(create)
+
+    async def get_booking(self, booking_id: str) -> Optional[dict]:
+        def get(conn):
+            row = conn.execute(SELECT_BOOKING + " WHERE booking_id = ?", (booking_id,)).fetchone()
+            return _booking(row) if row else None
+        return await self._run(get)
+
+    async def update_booking(self, booking_id: str, expected_status: str, **fields) -> Optional[dict]:
+        def update(conn):
+            row = conn.execute(SELECT_BOOKING + " WHERE booking_id = ?", (booking_id,)).fetchone()
+            if row is None or row["status"] != expected_status:
+                return None
+            booking = {**_booking(row), **fields}
+            try:
+                with conn:
+                    # The status check makes this a compare-and-swap across workers
+                    changed = conn.execute(
+                        "UPDATE bookings SET status = ?, doctor_id = ?, start_ts = ?, data = ? "
+                        "WHERE booking_id = ? AND status = ?",
+                        (*_booking_params(booking), booking_id, expected_status)
+                    ).rowcount
+            except sqlite3.IntegrityError:
+                return None
+            return booking if changed else None
+        return await self._run(update)
+
+    async def list_bookings(self, status: str, from_ts: Optional[float] = None) -> List[dict]:
+        def list_rows(conn):
+            if from_ts is None:
+                rows = conn.execute(SELECT_BOOKING + " WHERE status = ? ORDER BY seq", (status,))
+            else:
+                rows = conn.execute(
+                    SELECT_BOOKING + " WHERE status = ? AND start_ts >= ? ORDER BY seq", (status, from_ts)
+                )
+            return [_booking(row) for row in rows]
+        return await self._run(list_rows)
@@ -0,0 +1,66 @@
+from collections import deque
+from typing import Dict, Generic, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class AhoCorasick(Generic[T]):
+    """Multi-pattern string matcher.
+
+    All patterns are compiled into one automaton, so a text is scanned in a
+    single pass whose cost depends on the text length and the number of
+    matches, not on how many patterns there are.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, T]]):
+        # Trie transitions, failure links and (pattern length, value) outputs per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, T]]] = [[]]
+        for pattern, value in patterns:
+            if pattern:
+                self._insert(pattern, value)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def _insert(self, pattern: str, value: T):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append((len(pattern), value))
+
+    def _link(self):
+        """Breadth-first failure links; outputs are merged along them"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, T]]:
+        """(start, end, value) for every pattern occurrence, overlaps included"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                end = position + 1
+                for length, value in out[state]:
+                    yield end - length, end, value
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+
+class TTLCache:
+    """Async LRU cache with TTL, request coalescing and stale-while-revalidate.
+
+    Entries younger than ``ttl`` are served directly. Entries older than
+    ``ttl`` but within ``ttl + stale_ttl`` are served immediately while a
+    single background refresh runs. Concurrent misses for the same key
+    share one in-flight fetch.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, max_entries: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def age(self, key: Hashable) -> Optional[float]:
+        """Seconds since ``key`` was stored, or None if it is not cached"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[1]
+
+    def last_known(self, key: Hashable) -> Optional[tuple]:
+        """(value, age_seconds) of whatever is stored for ``key``, however old"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0], time.monotonic() - entry[1]
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _fetch_shared(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        future = self._inflight.get(key)
+        if future is not None:
+            return future
+
+        async def run():
+            try:
+                value = await fetch()
+                self._store(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        future = asyncio.ensure_future(run())
+        self._inflight[key] = future
+        return future
+
+    def _refresh_in_background(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]):
+        if key in self._inflight:
+            return
+        future = self._fetch_shared(key, fetch)
+
+        def done(fut: asyncio.Future):
+            self._background.discard(fut)
+            if not fut.cancelled() and fut.exception() is not None:
+                self.refresh_errors += 1
+                print(f"{self.name} cache refresh failed for {key}: {fut.exception()}")
+
+        self._background.add(future)
+        future.add_done_callback(done)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._refresh_in_background(key, fetch)
+                return value
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # shield() so a cancelled client request does not cancel the fetch
+        # other waiters are sharing
+        return await asyncio.shield(self._fetch_shared(key, fetch))
+
+    async def refresh(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Fetch and store ``key`` now, sharing any in-flight fetch; not counted in stats"""
+        return await asyncio.shield(self._fetch_shared(key, fetch))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "refresh_errors": self.refresh_errors,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.stale_hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
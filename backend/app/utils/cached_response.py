@@ -0,0 +1,96 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+# Cache-Control for responses that only change with a deploy
+STATIC_RESPONSE_MAX_AGE = int(os.getenv("STATIC_RESPONSE_MAX_AGE", 86400))
+STATIC_CACHE_CONTROL = f"public, max-age={STATIC_RESPONSE_MAX_AGE}"
+# Hot-reloadable catalogue data; keep short so a reload reaches clients quickly
+CATALOGUE_RESPONSE_MAX_AGE = int(os.getenv("CATALOGUE_RESPONSE_MAX_AGE", 60))
+CATALOGUE_CACHE_CONTROL = f"public, max-age={CATALOGUE_RESPONSE_MAX_AGE}"
+
+
+def dump_json(content: Any) -> bytes:
+    """Encode exactly as FastAPI's JSONResponse would"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return header.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, cache_control: str = "no-cache") -> Response:
+    """Send pre-serialized JSON, or 304 when the client already has this version"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_endpoint(
+    cache_control: str = STATIC_CACHE_CONTROL,
+    version: Callable[[], Hashable] = lambda: None,
+    max_entries: int = 256,
+):
+    """Opt a GET endpoint into serving pre-encoded JSON with a strong ETag.
+
+    The endpoint runs once per distinct set of arguments and ``version()``
+    (e.g. a catalogue snapshot version); later requests reuse the encoded
+    bytes, and clients sending the ETag back get a bodiless 304. Entries for
+    an older version are dropped as soon as the version changes.
+    """
+    def decorate(endpoint):
+        signature = inspect.signature(endpoint)
+        passes_request = "request" in signature.parameters
+        entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        current = {"version": None}
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            request = kwargs["request"] if passes_request else kwargs.pop("request")
+            data_version = version()
+            if data_version != current["version"]:
+                entries.clear()
+                current["version"] = data_version
+            key = tuple(sorted((name, value) for name, value in kwargs.items() if name != "request"))
+            entry = entries.get(key)
+            if entry is None:
+                body = dump_json(jsonable_encoder(await endpoint(**kwargs)))
+                entry = (body, strong_etag(body))
+                entries[key] = entry
+                while len(entries) > max_entries:
+                    entries.popitem(last=False)
+            else:
+                entries.move_to_end(key)
+            return cached_json_response(request, *entry, cache_control)
+
+        if not passes_request:
+            parameters = [
+                *signature.parameters.values(),
+                inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ]
+            wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+    return decorate
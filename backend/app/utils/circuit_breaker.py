@@ -0,0 +1,160 @@
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is currently failing"""
+
+
+class BudgetExhaustedError(Exception):
+    """Raised when the per-minute upstream call budget is used up"""
+
+
+class CallBudget:
+    """Sliding one-minute window of allowed upstream calls"""
+
+    def __init__(self, calls_per_minute: int):
+        self.calls_per_minute = calls_per_minute
+        self._calls: deque = deque()
+
+    def _trim(self, now: float):
+        while self._calls and now - self._calls[0] >= 60:
+            self._calls.popleft()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._calls) >= self.calls_per_minute:
+            return False
+        self._calls.append(now)
+        return True
+
+    def remaining(self) -> int:
+        self._trim(time.monotonic())
+        return max(0, self.calls_per_minute - len(self._calls))
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by recent error rate and latency.
+
+    Outcomes from the last ``window`` seconds are kept. Once at least
+    ``min_calls`` were seen, the circuit opens when the share of failed
+    calls or of calls slower than ``slow_call_seconds`` reaches
+    ``failure_ratio``. After ``open_seconds`` one trial call is let
+    through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        budget: Optional[CallBudget] = None,
+        window: float = 60,
+        min_calls: int = 10,
+        failure_ratio: float = 0.5,
+        slow_call_seconds: float = 5,
+        open_seconds: float = 30,
+    ):
+        self.name = name
+        self.budget = budget
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # (finished_at, failed, slow)
+        self._outcomes: deque = deque()
+        self.rejected = 0
+        self.budget_rejected = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float):
+        if self.state != self.OPEN:
+            print(f"Circuit '{self.name}' opened")
+        self.state = self.OPEN
+        self._opened_at = now
+
+    def _before_call(self):
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is half-open")
+            self._trial_in_flight = True
+        if self.budget is not None and not self.budget.try_acquire():
+            self._trial_in_flight = False
+            self.budget_rejected += 1
+            raise BudgetExhaustedError(f"{self.name} call budget exhausted")
+
+    def _record(self, failed: bool, elapsed: float):
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call_seconds
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+            if failed or slow:
+                self._open(now)
+            else:
+                print(f"Circuit '{self.name}' closed")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((now, failed, slow))
+        self._trim(now)
+        total = len(self._outcomes)
+        if total < self.min_calls:
+            return
+        failures = sum(1 for _, f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, _, s in self._outcomes if s)
+        if failures / total >= self.failure_ratio or slow_calls / total >= self.failure_ratio:
+            self._open(now)
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        is_failure: Callable[[Any], bool] = lambda result: False,
+    ) -> Any:
+        """Run ``fn`` through the breaker; exceptions count as failures"""
+        self._before_call()
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except Exception:
+            self._record(True, time.monotonic() - started)
+            raise
+        except BaseException:
+            # Cancelled, not failed: let the next call be the trial
+            self._trial_in_flight = False
+            raise
+        self._record(is_failure(result), time.monotonic() - started)
+        return result
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._trim(now)
+        total = len(self._outcomes)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "recent_calls": total,
+            "recent_failures": sum(1 for _, f, _ in self._outcomes if f),
+            "recent_slow_calls": sum(1 for _, _, s in self._outcomes if s),
+            "rejected": self.rejected,
+            "budget_rejected": self.budget_rejected,
+            "budget_remaining": self.budget.remaining() if self.budget else None,
+        }
@@ -0,0 +1,48 @@
+import os
+from typing import Optional
+
+import httpx
+
+# Shared async HTTP client for upstream APIs (OpenWeatherMap etc.).
+# Created once in the app lifespan so keep-alive connections are pooled
+# across requests instead of being opened per call.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 50)),
+        max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 30)),
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("UPSTREAM_TIMEOUT", 10)),
+        connect=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 3)),
+        pool=float(os.getenv("UPSTREAM_POOL_TIMEOUT", 5)),
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the shared upstream client"""
+    return get_http_client()
+
+
+async def close_http_client():
+    """Close the shared upstream client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared upstream client"""
+    global _client
+    if _client is None:
+        # Outside the app lifespan (scripts, TestClient without context);
+        # create lazily so callers never fall back to blocking I/O.
+        _client = httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+    return _client
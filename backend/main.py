@@ -1,14 +1,92 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import auth, weather, schemes, health, marketplace, soil
+from app.api import auth, weather, schemes, health, marketplace, soil, catalogues as catalogue_api
+from app.utils.http_client import start_http_client, close_http_client
+from app.services.weather_prewarm import prewarmer
+from app.api.weather import alert_hub
+from app.storage import get_storage
+from app.services.product_search import product_search
+from app.services.geo import locate
+from app.services.scheme_search import scheme_search
+from app.services.scheme_intents import scheme_intents
+from app.services.eligibility import eligibility_engine
+from app.services.symptom_checker import symptom_checker
+from app.services.telemedicine import telemedicine_scheduler
+from app.services.image_store import image_store
+from app.services.soil_vision import soil_image_classifier
+from app.services.crop_suitability import crop_advisor
+from app.services.reservations import reservation_sweeper
+from app.services.catalogue import CatalogueSnapshot, catalogues
 import os
 
 # Environment variables are automatically loaded by Render
 
+async def prepare_catalogues(snapshot: CatalogueSnapshot):
+    """Build everything that comes from a snapshot; the returned install switches to it"""
+    storage = get_storage()
+    data = snapshot.data
+    schemes = data["schemes"]
+    # Compile everything before installing anything, so a catalogue that
+    # breaks any one of them leaves the running version untouched
+    search_index = scheme_search.compile(schemes)
+    intents = scheme_intents.compile(schemes)
+    eligibility = eligibility_engine.compile(schemes)
+    symptom_model = symptom_checker.compile(data["symptom_checker"])
+    soil_profiles = soil_image_classifier.compile(data["soil_types"])
+    crop_table = crop_advisor.compile(data["crops"], data["soil_types"])
+    calendars = await telemedicine_scheduler.compile(data["doctors"], storage)
+    # Products are only seeded: stock and edits made through the API win
+    await storage.seed(products=[locate(dict(product)) for product in data["products"]])
+
+    def install():
+        scheme_search.install(search_index)
+        scheme_intents.install(intents)
+        eligibility_engine.install(eligibility)
+        symptom_checker.install(symptom_model)
+        soil_image_classifier.install(soil_profiles)
+        crop_advisor.install(crop_table)
+        telemedicine_scheduler.install(data["doctors"], calendars)
+
+    return install
+
+catalogues.on_reload(prepare_catalogues)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled client for upstream APIs
+    await start_http_client()
+    storage = get_storage()
+    await storage.start()
+    # Reference data files, then the search indexes built from them
+    await catalogues.open()
+    product_search.reset()
+    await product_search.sync(storage, force=True)
+    await telemedicine_scheduler.promote_waitlist(storage)
+    # Pick up edits to the catalogue files without a redeploy
+    catalogues.start()
+    # Return stock held by checkouts that were never confirmed
+    reservation_sweeper.start(storage)
+    # Follow other workers' consultation bookings and roll the calendar forward
+    telemedicine_scheduler.start(storage)
+    # Keep popular cities' weather warm in the cache
+    prewarmer.start()
+    yield
+    await alert_hub.stop()
+    await catalogues.stop()
+    await reservation_sweeper.stop()
+    await telemedicine_scheduler.stop()
+    await prewarmer.stop()
+    image_store.close()
+    soil_image_classifier.close()
+    await storage.close()
+    await close_http_client()
+
 app = FastAPI(
     title="GramSathi API",
     description="Rural Empowerment Platform API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -29,6 +107,7 @@ app.include_router(schemes.router, prefix="/api/schemes", tags=["Government Sche
 app.include_router(health.router, prefix="/api/health", tags=["Health"])
 app.include_router(marketplace.router, prefix="/api/marketplace", tags=["Marketplace"])
 app.include_router(soil.router, prefix="/api/soil", tags=["Soil Health"])
+app.include_router(catalogue_api.router, prefix="/api/catalogues", tags=["Catalogues"])
 
 @app.get("/")
 async def root():
@@ -42,4 +121,6 @@ if __name__ == "__main__":
     import uvicorn
     import os
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Workers share state through the SQLite storage backend
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
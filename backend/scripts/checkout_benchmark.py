@@ -0,0 +1,85 @@
+"""Flash-sale checkout benchmark: many buyers racing for one hot product.
+
+Runs the app in-process against the configured storage backend, fires
+concurrent checkouts at a single listing and checks nothing was oversold:
+
+    python scripts/checkout_benchmark.py --stock 500 --buyers 2000 --concurrency 200
+    STORAGE_BACKEND=memory python scripts/checkout_benchmark.py
+
+Every fifth buyer retries its request with the same Idempotency-Key, which
+must not reserve twice.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def main(args):
+    if os.getenv("STORAGE_BACKEND", "sqlite") == "sqlite" and "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/checkout_benchmark.db"
+
+    import httpx
+    import main as api
+
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            product = (await client.post("/api/marketplace/products", json={
+                "name": "Flash Sale Mangoes", "description": "Benchmark lot", "price": 50,
+                "category": "fruits", "seller_name": "Bench", "seller_phone": "+91 90000 00000",
+                "location": "Ratnagiri, Maharashtra", "quantity_available": args.stock, "unit": "kg"
+            })).json()
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+            statuses = {}
+            latencies = []
+            orders = {}
+
+            async def buy(i: int):
+                params = {
+                    "product_id": product["id"], "quantity": 1, "buyer_name": f"Buyer {i}",
+                    "buyer_phone": f"+91 9{i:09d}", "delivery_address": "Ratnagiri"
+                }
+                headers = {"Idempotency-Key": f"bench-{i}"}
+                async with semaphore:
+                    for _ in range(2 if i % 5 == 0 else 1):
+                        start = time.perf_counter()
+                        response = await client.post("/api/marketplace/checkout", params=params, headers=headers)
+                        latencies.append(time.perf_counter() - start)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                        if response.status_code == 200:
+                            orders.setdefault(i, set()).add(response.json()["order_id"])
+
+            start = time.perf_counter()
+            await asyncio.gather(*(buy(i) for i in range(args.buyers)))
+            elapsed = time.perf_counter() - start
+
+            remaining = (await client.get(f"/api/marketplace/products/{product['id']}")).json()["quantity_available"]
+
+    latencies.sort()
+    requests = len(latencies)
+    print(f"backend:      {os.getenv('STORAGE_BACKEND', 'sqlite')}")
+    print(f"requests:     {requests} in {elapsed:.2f}s ({requests / elapsed:.0f} req/s)")
+    print(f"latency p50:  {latencies[requests // 2] * 1000:.1f} ms")
+    print(f"latency p99:  {latencies[int(requests * 0.99)] * 1000:.1f} ms")
+    print(f"statuses:     {dict(sorted(statuses.items()))}")
+    print(f"reserved:     {len(orders)} orders, stock left {remaining} of {args.stock}")
+
+    duplicated = [i for i, ids in orders.items() if len(ids) > 1]
+    assert not duplicated, f"idempotent retries created extra orders for buyers {duplicated[:5]}"
+    assert len(orders) + remaining == args.stock, "stock and reservations disagree"
+    assert len(orders) <= args.stock, "oversold"
+    print("ok: no overselling, retries deduplicated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--buyers", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""Health camp benchmark: a burst of telemedicine bookings for the same morning.
+
+Runs the app in-process against the configured storage backend, fires
+concurrent bookings whose preferred times cluster around one camp hour
+and checks that no doctor slot was given out twice:
+
+    python scripts/consultation_benchmark.py --patients 3000 --concurrency 200
+    STORAGE_BACKEND=memory python scripts/consultation_benchmark.py
+
+Once capacity runs out the rest must land on the waitlist; a handful of
+cancellations at the end must promote waitlisted patients into the
+freed slots.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+async def main(args):
+    if os.getenv("STORAGE_BACKEND", "sqlite") == "sqlite" and "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/consultation_benchmark.db"
+
+    import httpx
+    import main as api
+    from app.services.telemedicine import CLINIC_TZ
+
+    # Camp day: the next weekday, preferred times spread around 10:30
+    day = datetime.now(CLINIC_TZ) + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    camp = day.replace(hour=10, minute=30, second=0, microsecond=0)
+    rng = random.Random(7)
+
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+            bookings = []
+
+            async def book(i: int):
+                preferred = camp + timedelta(minutes=rng.gauss(0, args.spread_minutes))
+                params = {
+                    "patient_name": f"Patient {i}", "phone": f"+91 9{i:09d}",
+                    "preferred_time": preferred.replace(tzinfo=None).isoformat(timespec="minutes"),
+                    "symptoms": "fever and cough",
+                }
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/api/health/book-consultation", params=params)
+                    latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+                bookings.append(response.json())
+
+            start = time.perf_counter()
+            await asyncio.gather(*(book(i) for i in range(args.patients)))
+            elapsed = time.perf_counter() - start
+
+            confirmed = [b for b in bookings if b["status"] == "confirmed"]
+            waitlisted = [b for b in bookings if b["status"] == "waitlisted"]
+            distance = sorted(
+                abs(datetime.fromisoformat(b["scheduled_time"]) - datetime.fromisoformat(b["preferred_time"]))
+                for b in confirmed
+            )
+
+            start_availability = time.perf_counter()
+            availability = (await client.get("/api/health/availability", params={"days": 7})).json()
+            availability_ms = (time.perf_counter() - start_availability) * 1000
+            free_left = sum(len(doctor["free_slots"]) for doctor in availability["doctors"])
+
+            cancelled = confirmed[:args.cancellations]
+            for booking in cancelled:
+                response = await client.post(f"/api/health/consultations/{booking['booking_id']}/cancel")
+                assert response.status_code == 200, response.text
+            promoted = 0
+            for booking in waitlisted[:len(cancelled)]:
+                status = (await client.get(f"/api/health/consultations/{booking['booking_id']}")).json()["status"]
+                promoted += status == "confirmed"
+
+    latencies.sort()
+    requests = len(latencies)
+    print(f"backend:        {os.getenv('STORAGE_BACKEND', 'sqlite')}")
+    print(f"requests:       {requests} in {elapsed:.2f}s ({requests / elapsed * 60:.0f} bookings/min)")
+    print(f"latency p50:    {latencies[requests // 2] * 1000:.1f} ms")
+    print(f"latency p99:    {latencies[int(requests * 0.99)] * 1000:.1f} ms")
+    print(f"confirmed:      {len(confirmed)}, waitlisted {len(waitlisted)}, free slots left {free_left}")
+    if distance:
+        print(f"from preferred: median {distance[len(distance) // 2]}, max {distance[-1]}")
+    print(f"availability:   {availability_ms:.1f} ms for {len(availability['doctors'])} doctors x 7 days")
+    print(f"cancellations:  {len(cancelled)}, waitlisted patients promoted {promoted}")
+
+    slots = {(b["doctor_id"], b["start_ts"]) for b in confirmed}
+    assert len(slots) == len(confirmed), "a slot was booked twice"
+    assert not waitlisted or free_left == 0, "patients were waitlisted while slots were free"
+    assert promoted == min(len(cancelled), len(waitlisted)), "freed slots were not given to the waitlist"
+    print("ok: no double booking, waitlist used only when full and promoted on cancellation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--spread-minutes", type=float, default=90)
+    parser.add_argument("--cancellations", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
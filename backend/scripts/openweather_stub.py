@@ -0,0 +1,90 @@
+"""Local OpenWeatherMap stub with injectable latency and errors.
+
+Run it next to the API and point the weather router at it:
+
+    uvicorn scripts.openweather_stub:app --port 9000
+    OPENWEATHER_BASE_URL=http://127.0.0.1:9000/data/2.5 OPENWEATHER_API_KEY=stub python main.py
+
+Change behaviour while it runs, e.g. to watch the circuit open and the
+API fall back to cached values:
+
+    curl -X POST "http://127.0.0.1:9000/control?latency=8&error_rate=0.7"
+    curl -X POST "http://127.0.0.1:9000/control?status=429&error_rate=1"
+    curl -X POST "http://127.0.0.1:9000/control?latency=0&error_rate=0"
+"""
+import asyncio
+import random
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="OpenWeatherMap stub")
+
+settings = {"latency": 0.0, "error_rate": 0.0, "status": 500}
+calls = {"total": 0, "failed": 0}
+
+
+@app.post("/control")
+async def control(latency: Optional[float] = None, error_rate: Optional[float] = None, status: Optional[int] = None):
+    """Set injected latency (seconds), error rate (0-1) and error status"""
+    if latency is not None:
+        settings["latency"] = latency
+    if error_rate is not None:
+        settings["error_rate"] = error_rate
+    if status is not None:
+        settings["status"] = status
+    return {"settings": settings, "calls": calls}
+
+
+async def _inject() -> Optional[JSONResponse]:
+    calls["total"] += 1
+    if settings["latency"]:
+        await asyncio.sleep(settings["latency"])
+    if random.random() < settings["error_rate"]:
+        calls["failed"] += 1
+        return JSONResponse({"cod": settings["status"], "message": "injected error"}, status_code=settings["status"])
+    return None
+
+
+def _name(q: Optional[str]) -> str:
+    return q.split(",")[0] if q else "Stub City"
+
+
+@app.get("/data/2.5/weather")
+async def weather(q: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None):
+    error = await _inject()
+    if error:
+        return error
+    return {
+        "name": _name(q),
+        "coord": {"lat": lat or 0.0, "lon": lon or 0.0},
+        "sys": {"country": "IN"},
+        "main": {"temp": 29.4, "feels_like": 32.1, "humidity": 62, "pressure": 1008},
+        "weather": [{"description": "scattered clouds", "icon": "03d"}],
+        "wind": {"speed": 3.2},
+        "visibility": 9000,
+        "timezone": 19800,
+        "dt": int(time.time()),
+    }
+
+
+@app.get("/data/2.5/forecast")
+async def forecast(q: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None, cnt: int = 40):
+    error = await _inject()
+    if error:
+        return error
+    start = int(time.time()) // 10800 * 10800
+    items = [
+        {
+            "dt": start + i * 10800,
+            "main": {"temp": 22 + (i % 8) * 1.5, "humidity": 55 + i % 5},
+            "weather": [{"description": "clear sky" if i % 4 else "light rain", "icon": "01d" if i % 4 else "10d"}],
+            "wind": {"speed": 2.5},
+            "pop": 0.0 if i % 4 else 0.6,
+            "rain": {} if i % 4 else {"3h": 1.2},
+        }
+        for i in range(cnt)
+    ]
+    return {"list": items, "city": {"name": _name(q), "timezone": 19800}}
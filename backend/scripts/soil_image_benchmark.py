@@ -0,0 +1,132 @@
+"""Soil photo benchmark: images analyzed per second per core.
+
+Renders synthetic phone-sized photos (default 3024x4032 JPEG) of each soil
+type in the catalogue from its reference color and texture, then measures:
+
+  * one core: ``analyze_image`` called directly in this process
+  * the pool: uploads through the API with more clients than the pool
+    admits, so some must be turned away with 503 + Retry-After
+
+    python scripts/soil_image_benchmark.py --images 40 --concurrency 32
+    SOIL_IMAGE_WORKERS=4 python scripts/soil_image_benchmark.py
+
+Each photo's detected soil type is checked against the type it was
+rendered from.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def render(profile: dict, size, rng) -> bytes:
+    """A JPEG of soil with the profile's color and lighting varied a little"""
+    from PIL import Image
+    from app.services.soil_vision import _LAB_HUE_ANCHORS, _MUNSELL_HUE_ANCHORS, parse_munsell
+
+    hue, value, chroma = parse_munsell(profile["munsell"])
+    value += rng.uniform(-0.4, 0.4)
+    # Texture drawn at analysis scale: grain-sized noise over clod-sized patches
+    height, width = 384, 288
+    fine = rng.normal(size=(height, width))
+    coarse = np.kron(rng.normal(size=(height // 8, width // 8)), np.ones((8, 8)))
+    grain = profile["granularity"]
+    lightness = value * 10 + 6 * (grain * fine + (1 - grain) * coarse)
+    angle = np.radians(np.interp(hue, _MUNSELL_HUE_ANCHORS, _LAB_HUE_ANCHORS))
+    c = chroma * 5.5 + rng.normal(0, 1.5, size=lightness.shape)
+    lab = np.stack([lightness, c * np.cos(angle), c * np.sin(angle)], axis=-1)
+
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack([fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200], axis=-1)
+    xyz = np.where(f > 6 / 29, f ** 3, (f - 16 / 116) / 7.787) * np.array([0.95047, 1.0, 1.08883])
+    linear = xyz @ np.array([
+        [3.2406, -1.5372, -0.4986],
+        [-0.9689, 1.8758, 0.0415],
+        [0.0557, -0.2040, 1.0570],
+    ]).T
+    linear = np.clip(linear, 0, 1)
+    srgb = np.where(linear <= 0.0031308, 12.92 * linear, 1.055 * linear ** (1 / 2.4) - 0.055)
+    image = Image.fromarray((srgb * 255).round().astype(np.uint8)).resize(size, Image.Resampling.BICUBIC)
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=88)
+    return out.getvalue()
+
+
+async def main(args):
+    if os.getenv("STORAGE_BACKEND", "sqlite") == "sqlite" and "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/soil_image_benchmark.db"
+
+    import httpx
+    import main as api
+    from app.services.catalogue import catalogues
+    from app.services.soil_vision import analyze_image, compile_profiles, soil_image_classifier
+
+    soil_types = catalogues.load().data["soil_types"]
+    profiled = {soil_id: soil["image_profile"] for soil_id, soil in soil_types.items() if soil.get("image_profile")}
+    rng = np.random.default_rng(11)
+    photos = []
+    for i in range(args.images):
+        soil_id = list(profiled)[i % len(profiled)]
+        photos.append((soil_id, render(profiled[soil_id], (args.width, args.height), rng)))
+    megabytes = sum(len(data) for _, data in photos) / len(photos) / 1e6
+    print(f"photos:         {len(photos)} at {args.width}x{args.height}, {megabytes:.1f} MB each")
+
+    profiles = compile_profiles(soil_types)
+    analyze_image(photos[0][1], profiles)
+    start = time.perf_counter()
+    correct = 0
+    for soil_id, data in photos:
+        scores = analyze_image(data, profiles)["scores"]
+        correct += max(scores, key=scores.get) == soil_id
+    single = len(photos) / (time.perf_counter() - start)
+    print(f"one core:       {single:.1f} images/s ({1000 / single:.1f} ms each), {correct}/{len(photos)} correct")
+
+    async with api.app.router.lifespan_context(api.app):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # Start the workers before timing
+            await client.post("/api/soil/image-analysis", files={"file": ("soil.jpg", photos[0][1], "image/jpeg")})
+
+            statuses, detected = [], []
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def upload(soil_id: str, data: bytes):
+                async with gate:
+                    response = await client.post(
+                        "/api/soil/image-analysis", files={"file": ("soil.jpg", data, "image/jpeg")}
+                    )
+                statuses.append(response.status_code)
+                if response.status_code == 200:
+                    detected.append(response.json()["detected_soil_type"] == soil_id)
+                else:
+                    assert response.status_code == 503 and response.headers.get("retry-after"), response.text
+
+            start = time.perf_counter()
+            await asyncio.gather(*(upload(soil_id, data) for soil_id, data in photos))
+            elapsed = time.perf_counter() - start
+
+    workers = soil_image_classifier.workers
+    cores = min(workers, os.cpu_count() or 1)
+    analyzed = statuses.count(200)
+    print(f"pool:           {workers} workers on {os.cpu_count()} cores, "
+          f"{soil_image_classifier.capacity} admitted at once, {args.concurrency} clients")
+    print(f"throughput:     {analyzed / elapsed:.1f} images/s, {analyzed / elapsed / cores:.1f} images/s/core")
+    print(f"responses:      {analyzed} analyzed ({sum(detected)} correct), {statuses.count(503)} turned away with 503")
+    assert correct == len(photos) and all(detected), "a rendered soil type was misclassified"
+    print("ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--width", type=int, default=3024)
+    parser.add_argument("--height", type=int, default=4032)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Tests run against in-process mock data: no file watcher, no real OpenWeatherMap
+os.environ["CATALOGUE_WATCH_INTERVAL"] = "0"
+os.environ.pop("OPENWEATHER_API_KEY", None)
+
+import app.storage  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def use_storage(monkeypatch, tmp_path):
+    """Select the storage backend the app builds next (memory or sqlite)"""
+    def select(backend: str):
+        monkeypatch.setenv("STORAGE_BACKEND", backend)
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/gramsathi-test.db")
+        monkeypatch.setattr(app.storage, "_storage", None)
+    return select
+
+
+@pytest.fixture
+def client(use_storage):
+    """TestClient for the whole app, started on in-memory storage"""
+    from fastapi.testclient import TestClient
+    import main
+
+    use_storage("memory")
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.utils.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache("test", ttl=60)
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"temperature": 30}
+
+    waiters = [asyncio.ensure_future(cache.get_or_fetch("pune", fetch)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.misses == 1 and cache.coalesced == 9
+
+
+async def test_stale_value_is_served_while_refreshing():
+    # ttl 0: every stored entry is already stale but still servable
+    cache = TTLCache("test", ttl=0, stale_ttl=60)
+    values = iter([1, 2])
+    release = asyncio.Event()
+
+    async def fetch():
+        value = next(values)
+        if value == 2:
+            await release.wait()
+        return value
+
+    assert await cache.get_or_fetch("pune", fetch) == 1
+    # The refresh is blocked, yet the stale value comes back at once
+    assert await asyncio.wait_for(cache.get_or_fetch("pune", fetch), timeout=1) == 1
+    assert cache.stale_hits == 1 and cache.stats()["in_flight"] == 1
+
+    release.set()
+    await asyncio.gather(*cache._background)
+    assert await cache.get_or_fetch("pune", fetch) == 2
+
+
+async def test_failed_refresh_keeps_the_stale_value():
+    cache = TTLCache("test", ttl=0, stale_ttl=60)
+    await cache.get_or_fetch("pune", lambda: asyncio.sleep(0, result="cached"))
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    assert await cache.get_or_fetch("pune", failing) == "cached"
+    await asyncio.gather(*cache._background, return_exceptions=True)
+    assert cache.refresh_errors == 1
+    assert cache.last_known("pune")[0] == "cached"
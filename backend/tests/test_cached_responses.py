@@ -0,0 +1,43 @@
+import pytest
+
+from app.utils.cached_response import CATALOGUE_CACHE_CONTROL, STATIC_CACHE_CONTROL
+
+ENDPOINTS = [
+    ("/api/marketplace/categories", STATIC_CACHE_CONTROL),
+    ("/api/health/emergency-contacts", STATIC_CACHE_CONTROL),
+    ("/api/weather/cities", STATIC_CACHE_CONTROL),
+    ("/api/soil/crop-calendar/nashik", STATIC_CACHE_CONTROL),
+    ("/api/soil/soil-types", CATALOGUE_CACHE_CONTROL),
+    ("/api/schemes/", CATALOGUE_CACHE_CONTROL),
+    ("/api/schemes/?category=agriculture", CATALOGUE_CACHE_CONTROL),
+    ("/api/health/tips", CATALOGUE_CACHE_CONTROL),
+    ("/api/health/tips?category=general", CATALOGUE_CACHE_CONTROL),
+]
+
+
+@pytest.mark.parametrize("path, cache_control", ENDPOINTS)
+def test_revalidation_returns_304_without_a_body(client, path, cache_control):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == cache_control
+    etag = first.headers["etag"]
+    assert client.get(path).headers["etag"] == etag
+
+    for if_none_match in (etag, f"W/{etag}", f'"stale", {etag}'):
+        revalidated = client.get(path, headers={"If-None-Match": if_none_match})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+
+    changed = client.get(path, headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+    assert changed.json() == first.json()
+
+
+def test_each_district_gets_its_own_etag(client):
+    pune = client.get("/api/soil/crop-calendar/pune")
+    nashik = client.get("/api/soil/crop-calendar/nashik")
+    assert pune.json()["district"] == "pune" and nashik.json()["district"] == "nashik"
+    assert pune.headers["etag"] != nashik.headers["etag"]
+    stale = client.get("/api/soil/crop-calendar/pune", headers={"If-None-Match": nashik.headers["etag"]})
+    assert stale.status_code == 200
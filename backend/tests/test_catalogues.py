@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from app.services.catalogue import CATALOGUES, CatalogueError, CatalogueStore, catalogues
+
+pytestmark = pytest.mark.anyio
+
+
+def test_default_directory_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    store = CatalogueStore()
+    snapshot = store.load()
+    assert set(snapshot.data) == set(CATALOGUES)
+    assert all(os.path.isabs(path) for path in store.files.values())
+
+
+def test_catalogue_files_are_reported_with_absolute_paths(client):
+    described = client.get("/api/catalogues/").json()
+    files = [entry["file"] for entry in described["catalogues"].values()]
+    assert files and all(os.path.isabs(path) and os.path.exists(path) for path in files)
+
+
+async def test_invalid_edit_keeps_serving_the_previous_snapshot(tmp_path):
+    shutil.copytree(catalogues.directory, tmp_path / "data")
+    store = CatalogueStore(str(tmp_path / "data"))
+    store._schemas = catalogues._schemas
+    before = store.load()
+
+    (tmp_path / "data" / "health_tips.json").write_text(json.dumps([{"id": "tip", "title": "no category"}]))
+    with pytest.raises(CatalogueError):
+        await store.reload()
+    assert store.snapshot is before
+
+
+async def test_failed_build_swaps_neither_snapshot_nor_derived_state(tmp_path):
+    shutil.copytree(catalogues.directory, tmp_path / "data")
+    store = CatalogueStore(str(tmp_path / "data"))
+    installed = []
+
+    async def prepare(snapshot):
+        if any(tip["title"] == "unbuildable" for tip in snapshot.data["health_tips"]):
+            raise ValueError("cannot build")
+        return lambda: installed.append(snapshot.version)
+
+    store.on_reload(prepare)
+    before = await store.open()
+    assert installed == [before.version]
+
+    path = tmp_path / "data" / "health_tips.json"
+    tips = json.loads(path.read_text())
+    path.write_text(json.dumps([{**tips[0], "title": "unbuildable"}, *tips[1:]]))
+    with pytest.raises(CatalogueError):
+        await store.reload()
+    assert store.snapshot is before
+    assert installed == [before.version]
+    assert store.reloads == 0
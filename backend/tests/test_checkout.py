@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from app.api import marketplace
+
+pytestmark = pytest.mark.anyio
+
+STOCK = 40
+BUYERS = 120
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def client(request, use_storage):
+    use_storage(request.param)
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+async def create_product(client, stock: int) -> dict:
+    response = await client.post("/api/marketplace/products", json={
+        "name": "Flash Sale Mangoes", "description": "Test lot", "price": 50, "category": "fruits",
+        "seller_name": "Test FPO", "seller_phone": "+91 90000 00000",
+        "location": "Ratnagiri, Maharashtra", "quantity_available": stock, "unit": "kg"
+    })
+    return response.json()
+
+
+def checkout_params(product: dict, i: int, quantity: int = 1) -> dict:
+    return {
+        "product_id": product["id"], "quantity": quantity, "buyer_name": f"Buyer {i}",
+        "buyer_phone": f"+91 9{i:09d}", "delivery_address": "Ratnagiri"
+    }
+
+
+async def test_concurrent_checkouts_never_oversell(client):
+    product = await create_product(client, STOCK)
+    orders = {}
+
+    async def buy(i: int):
+        headers = {"Idempotency-Key": f"buyer-{i}"}
+        # Every third buyer retries, as a client would after a timeout
+        for _ in range(2 if i % 3 == 0 else 1):
+            response = await client.post(
+                "/api/marketplace/checkout", params=checkout_params(product, i), headers=headers
+            )
+            assert response.status_code in (200, 409), response.text
+            if response.status_code == 200:
+                orders.setdefault(i, set()).add((response.json()["order_id"], response.json()["quantity"]))
+
+    await asyncio.gather(*(buy(i) for i in range(BUYERS)))
+
+    assert all(len(placed) == 1 for placed in orders.values()), "a retry reserved twice"
+    sold = [quantity for placed in orders.values() for _, quantity in placed]
+    remaining = (await client.get(f"/api/marketplace/products/{product['id']}")).json()["quantity_available"]
+    assert sum(sold) + remaining == STOCK
+    # Three times as many buyers as units: everything sells, nothing more
+    assert sum(sold) == STOCK and remaining == 0
+    assert len(orders) == STOCK
+
+
+async def test_idempotency_key_replays_and_rejects_a_different_body(client):
+    product = await create_product(client, 5)
+    headers = {"Idempotency-Key": "retry-me"}
+    first = await client.post("/api/marketplace/checkout", params=checkout_params(product, 1), headers=headers)
+    again = await client.post("/api/marketplace/checkout", params=checkout_params(product, 1), headers=headers)
+    assert first.status_code == again.status_code == 200
+    assert again.json()["order_id"] == first.json()["order_id"]
+
+    changed = await client.post("/api/marketplace/checkout", params=checkout_params(product, 1, 2), headers=headers)
+    assert changed.status_code == 422
+
+    remaining = (await client.get(f"/api/marketplace/products/{product['id']}")).json()["quantity_available"]
+    assert remaining == 4
+
+
+async def test_out_of_stock_reports_the_stock_left_after_the_attempt(client, monkeypatch):
+    product = await create_product(client, 5)
+    real_reserve = marketplace.reserve
+
+    async def reserve_after_a_rival(storage, product, quantity, buyer, idempotency_key=None):
+        # Another buyer takes 4 units between the product read and our attempt
+        await real_reserve(storage, product, 4, {**buyer, "buyer_name": "Rival"})
+        return await real_reserve(storage, product, quantity, buyer, idempotency_key)
+
+    monkeypatch.setattr(marketplace, "reserve", reserve_after_a_rival)
+    response = await client.post("/api/marketplace/checkout", params=checkout_params(product, 1, 3))
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Only 1 kg available"
@@ -0,0 +1,94 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import app.api.soil  # noqa: F401  (registers the crop schema)
+from app.services.catalogue import CatalogueError, CatalogueStore, catalogues
+from app.services.crop_suitability import (
+    DOSE_ADJUSTMENT, HIGH_FROM, LOW_BELOW, OFF_SEASON, OTHER_SOIL, CropTable, fertilizer_plan
+)
+
+PADDY = {
+    "id": "paddy", "name": "Paddy", "ph": [6.0, 7.0], "ph_limits": [5.0, 8.0], "npk": [100, 50, 40],
+    "soils": {"clay": 1.0, "black": 0.6}, "seasons": ["kharif"],
+}
+
+
+@pytest.fixture
+def table():
+    return CropTable([PADDY], ["clay", "black", "red"])
+
+
+def factor(table: CropTable, name: str, **sample) -> float:
+    return float(table.factors([sample])[name][0, 0])
+
+
+def test_ph_fit_falls_from_the_optimum_to_zero_at_the_limits(table):
+    assert factor(table, "ph", ph_level=6.5) == 1.0
+    assert factor(table, "ph", ph_level=5.5) == pytest.approx(0.5)
+    assert factor(table, "ph", ph_level=7.75) == pytest.approx(0.25)
+    assert factor(table, "ph", ph_level=5.0) == factor(table, "ph", ph_level=9.0) == 0.0
+    # Untested pH does not count against any crop
+    assert factor(table, "ph") == 1.0
+
+
+def test_texture_uses_the_crop_factor_or_the_other_soil_penalty(table):
+    assert factor(table, "texture", soil_type="clay") == 1.0
+    assert factor(table, "texture", soil_type="black") == 0.6
+    assert factor(table, "texture", soil_type="red") == OTHER_SOIL
+    assert factor(table, "texture") == 1.0
+
+
+def test_sowing_off_season_is_penalised(table):
+    assert factor(table, "season", season="kharif") == 1.0
+    assert factor(table, "season", season="rabi") == OFF_SEASON
+    assert factor(table, "season") == 1.0
+
+
+def test_doses_rise_on_low_soil_and_fall_on_high_soil(table):
+    levels = np.array([LOW_BELOW * 0.5, HIGH_FROM * 2, (LOW_BELOW + HIGH_FROM) / 2, [np.nan] * 3])
+    doses = table.doses(levels, np.zeros(len(levels), dtype=int))
+    npk = np.array(PADDY["npk"], dtype=float)
+    np.testing.assert_allclose(doses[0], npk * (1 + DOSE_ADJUSTMENT))
+    np.testing.assert_allclose(doses[1], npk * (1 - DOSE_ADJUSTMENT))
+    np.testing.assert_allclose(doses[2], npk)
+    np.testing.assert_allclose(doses[3], npk)
+
+
+def test_fertilizer_plan_supplies_the_dose_and_fixes_the_soil():
+    plan = fertilizer_plan(np.array([100.0, 46.0, 60.0]), {"ph_level": 5.0, "organic_matter": "low"})
+    quantities = {item["fertilizer_type"]: item["quantity"] for item in plan}
+    # 100 kg DAP carries the 46 kg P2O5 and 18 kg of the N; urea makes up the rest
+    assert quantities["DAP (18:46:0)"] == "100 kg per hectare"
+    assert quantities["Urea (46% N)"] == "180 kg per hectare"
+    assert quantities["Muriate of Potash (60% K2O)"] == "100 kg per hectare"
+    assert "Farmyard manure or compost" in quantities
+    assert "Agricultural lime" in quantities
+
+
+@pytest.mark.parametrize("field, value", [
+    ("nitrogen", -50), ("phosphorus", "-5"), ("potassium", "nan"), ("organic_matter", -0.4),
+])
+def test_negative_soil_test_values_are_rejected(client, field, value):
+    response = client.post("/api/soil/analyze", json={"soil_type": "black", field: value})
+    assert response.status_code == 422
+    assert field in response.json()["detail"]
+
+
+def test_soil_test_ratings_and_numbers_are_both_accepted(client):
+    response = client.post("/api/soil/analyze", json={
+        "soil_type": "black", "nitrogen": "low", "phosphorus": "30", "potassium": 400,
+    })
+    assert response.status_code == 200
+    soil_test = response.json()["soil_test"]
+    assert [soil_test[n]["rating"] for n in ("nitrogen", "phosphorus", "potassium")] == ["low", "medium", "high"]
+
+
+def test_empty_crop_catalogue_is_rejected(tmp_path):
+    shutil.copytree(catalogues.directory, tmp_path / "data")
+    (tmp_path / "data" / "crops.json").write_text("[]")
+    store = CatalogueStore(str(tmp_path / "data"))
+    store._schemas = catalogues._schemas
+    with pytest.raises(CatalogueError, match="crops.json"):
+        store.load()
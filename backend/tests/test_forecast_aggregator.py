@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+
+from app.services.forecast_aggregator import aggregate_forecast
+
+IST = 5 * 3600 + 30 * 60
+
+
+def item(when: str, temp: float, description: str = "clear sky", rain: float = 0.0) -> dict:
+    dt = int(datetime.fromisoformat(when).replace(tzinfo=timezone.utc).timestamp())
+    return {
+        "dt": dt,
+        "main": {"temp": temp, "humidity": 50},
+        "weather": [{"description": description, "icon": "01d"}],
+        "wind": {"speed": 1.0},
+        "rain": {"3h": rain},
+        "pop": 0.2,
+    }
+
+
+SERIES = [
+    item("2026-03-09T18:00", 20),                      # 23:30 IST, 9 March
+    item("2026-03-09T21:00", 18, "light rain", 1.5),   # 02:30 IST, 10 March
+    item("2026-03-10T06:00", 30, "light rain", 2.0),
+    item("2026-03-10T09:00", 32),
+    item("2026-03-10T21:00", 22),                      # 02:30 IST, 11 March
+]
+
+
+def test_days_follow_the_city_timezone_not_utc():
+    daily = aggregate_forecast({"city": {"timezone": IST}, "list": SERIES}, days=5)
+    assert [day["date"] for day in daily] == ["2026-03-09", "2026-03-10", "2026-03-11"]
+    march_10 = daily[1]
+    assert (march_10["temperature_min"], march_10["temperature_max"]) == (18, 32)
+    assert march_10["temperature_mean"] == 80 / 3
+    assert march_10["rain_total"] == 3.5
+    assert march_10["description"] == "light rain"
+
+
+def test_without_an_offset_days_are_utc():
+    daily = aggregate_forecast({"city": {"timezone": 0}, "list": SERIES}, days=5)
+    assert [day["date"] for day in daily] == ["2026-03-09", "2026-03-10"]
+    assert (daily[0]["temperature_min"], daily[0]["temperature_max"]) == (18, 20)
+
+
+def test_days_limits_the_number_of_local_days():
+    daily = aggregate_forecast({"city": {"timezone": IST}, "list": SERIES}, days=2)
+    assert [day["date"] for day in daily] == ["2026-03-09", "2026-03-10"]
+    assert aggregate_forecast({"city": {"timezone": IST}, "list": []}, days=2) == []
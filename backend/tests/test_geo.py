@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from app.services.geo import GeoIndex, haversine_km, locate, resolve_location
+
+NEW_PRODUCT = {
+    "name": "Test Jaggery", "description": "Test lot", "price": 60, "category": "spices",
+    "seller_name": "Test FPO", "seller_phone": "+91 90000 00000",
+    "location": "Kolhapur, Maharashtra", "quantity_available": 10, "unit": "kg"
+}
+
+
+def brute_force(points, lat, lon):
+    return sorted(((key, haversine_km(lat, lon, plat, plon)) for key, (plat, plon) in points.items()),
+                  key=lambda item: item[1])
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(7)
+    return {i: (rng.uniform(8, 30), rng.uniform(70, 88)) for i in range(400)}
+
+
+@pytest.fixture
+def index(points):
+    index = GeoIndex()
+    for key, (lat, lon) in points.items():
+        index.add(key, lat, lon)
+    return index
+
+
+def test_haversine_matches_a_known_distance():
+    # Pune to Mumbai is about 120 km as the crow flies
+    assert haversine_km(18.5204, 73.8567, 19.076, 72.8777) == pytest.approx(120, abs=5)
+    assert haversine_km(20.0, 75.0, 20.0, 75.0) == 0
+
+
+@pytest.mark.parametrize("lat, lon", [(18.52, 73.85), (25.0, 80.0), (12.0, 77.75), (29.99, 87.99)])
+def test_nearest_matches_brute_force(index, points, lat, lon):
+    expected = brute_force(points, lat, lon)[:10]
+    assert index.nearest(lat, lon, 10) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("lat, lon", [(18.52, 73.85), (25.0, 80.0), (12.0, 77.75)])
+def test_within_is_the_radius_filter_sorted_by_distance(index, points, lat, lon):
+    expected = [(key, d) for key, d in brute_force(points, lat, lon) if d <= 150]
+    found = index.within(lat, lon, 150)
+    assert found == pytest.approx(expected)
+    assert [d for _, d in found] == sorted(d for _, d in found)
+    assert index.within(lat, lon, 150, limit=3) == pytest.approx(expected[:3])
+
+
+def test_points_across_a_cell_boundary_are_found():
+    index = GeoIndex(cell_degrees=0.25)
+    # 20.0 is a cell edge: the query sits just below it, the points just above
+    index.add("north", 20.001, 75.1)
+    index.add("far", 20.24, 75.1)
+    index.add("east", 19.999, 75.2501)
+    index.add("distant", 22.0, 78.0)
+    assert [key for key, _ in index.within(19.999, 75.1, 5)] == ["north"]
+    assert [key for key, _ in index.nearest(19.999, 75.1, 3)] == ["north", "east", "far"]
+
+
+def test_accept_filters_before_the_limit(index, points):
+    even = index.nearest(20.0, 78.0, 5, accept=lambda key: key % 2 == 0)
+    assert [key for key, _ in even] == [key for key, _ in brute_force(points, 20.0, 78.0) if key % 2 == 0][:5]
+
+
+def test_moving_and_removing_points():
+    index = GeoIndex()
+    index.add("a", 18.5, 73.8)
+    index.add("a", 28.6, 77.2)
+    assert len(index) == 1
+    assert index.within(18.5, 73.8, 50) == []
+    index.remove("a")
+    index.remove("a")
+    assert index.nearest(28.6, 77.2, 1) == []
+
+
+def test_locations_resolve_by_district():
+    assert resolve_location("Village Madhavpur, District Mathura, Uttar Pradesh") == (27.4924, 77.6737)
+    assert resolve_location("Kolhapur, Maharashtra") == (16.705, 74.2433)
+    assert resolve_location("Somewhere unknown") is None
+    assert locate({"location": "Nowhere"}) == {"location": "Nowhere", "latitude": None, "longitude": None}
+    assert locate({"location": "Kota", "latitude": 1.0, "longitude": 2.0})["latitude"] == 1.0
+
+
+def test_nearby_orders_by_distance_and_applies_the_radius(client):
+    near = client.post("/api/marketplace/products", json={**NEW_PRODUCT, "latitude": 16.71, "longitude": 74.25}).json()
+    farther = client.post("/api/marketplace/products", json={**NEW_PRODUCT, "latitude": 16.80, "longitude": 74.30}).json()
+    unplaced = client.post("/api/marketplace/products", json={**NEW_PRODUCT, "location": "Unknown hamlet"}).json()
+    assert unplaced["latitude"] is None
+
+    response = client.get("/api/marketplace/nearby", params={"lat": 16.705, "lon": 74.2433, "radius_km": 15})
+    assert response.status_code == 200
+    results = response.json()
+    ids = [product["id"] for product in results]
+    assert ids[:2] == [near["id"], farther["id"]]
+    assert unplaced["id"] not in ids
+    distances = [product["distance_km"] for product in results]
+    assert distances == sorted(distances) and distances[-1] <= 15
+
+    everything = client.get("/api/marketplace/nearby", params={"lat": 16.705, "lon": 74.2433, "limit": 100}).json()
+    assert unplaced["id"] not in [product["id"] for product in everything]
+
+
+def test_nearby_by_place_name(client):
+    response = client.get("/api/marketplace/nearby", params={"near": "Kolhapur", "radius_km": 2000})
+    assert response.status_code == 200
+    assert [p["distance_km"] for p in response.json()] == sorted(p["distance_km"] for p in response.json())
+    assert client.get("/api/marketplace/nearby", params={"near": "Atlantis"}).status_code == 404
+    assert client.get("/api/marketplace/nearby").status_code == 422
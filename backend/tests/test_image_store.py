@@ -0,0 +1,125 @@
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from app.api import marketplace
+from app.services import image_store as image_store_module
+from app.services.image_store import ImageStore
+
+
+def crash(*args):
+    """Stands in for render_variants: kills its worker like an out-of-memory decode"""
+    os._exit(1)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ImageStore(root=str(tmp_path / "media"), workers=1)
+    monkeypatch.setattr(marketplace, "image_store", store)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def product_id(client):
+    return client.get("/api/marketplace/products", params={"limit": 1}).json()["items"][0]["id"]
+
+
+def jpeg(color=(120, 80, 40), size=(640, 480)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def upload(client, product_id: str, data: bytes, name: str = "photo.jpg"):
+    return client.post(f"/api/marketplace/products/{product_id}/upload-image", files={"file": (name, data)})
+
+
+def wait_for(client, image_id: str, timeout: float = 30) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/api/marketplace/images/{image_id}/status").json()
+        if status["status"] != "processing" or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def test_upload_renders_variants_in_the_background(client, store, product_id):
+    response = upload(client, product_id, jpeg())
+    assert response.status_code == 202
+    image_id = response.json()["job"]["image_id"]
+    assert response.json()["image_url"] == f"/api/marketplace/images/{image_id}"
+    assert client.get(f"/api/marketplace/products/{product_id}").json()["image_url"] == response.json()["image_url"]
+
+    assert wait_for(client, image_id)["status"] == "done"
+    thumb = client.get(f"/api/marketplace/images/{image_id}", params={"variant": "thumb"})
+    assert thumb.status_code == 200
+    assert thumb.headers["content-type"] == "image/jpeg"
+    assert "immutable" in thumb.headers["cache-control"]
+    assert max(Image.open(io.BytesIO(thumb.content)).size) == 200
+
+
+def test_same_bytes_are_stored_once(client, store, product_id):
+    data = jpeg()
+    first = upload(client, product_id, data).json()["job"]["image_id"]
+    second = upload(client, product_id, data, name="copy.jpg").json()["job"]["image_id"]
+    assert first == second
+    originals = [name for _, _, names in os.walk(os.path.join(store.root, "originals")) for name in names]
+    assert originals == [f"{first}.jpg"]
+    assert os.listdir(os.path.join(store.root, "incoming")) == []
+
+
+def test_unreadable_image_is_reported_failed(client, store, product_id):
+    # Right signature, garbage after it
+    image_id = upload(client, product_id, b"\x89PNG\r\n\x1a\n" + b"\0" * 64, "broken.png").json()["job"]["image_id"]
+    status = wait_for(client, image_id)
+    assert status["status"] == "failed" and status["error"]
+
+
+def test_crashed_worker_fails_its_job_and_the_pool_is_rebuilt(client, store, product_id, monkeypatch):
+    render_variants = image_store_module.render_variants
+    monkeypatch.setattr(image_store_module, "render_variants", crash)
+    crashed = upload(client, product_id, jpeg((10, 10, 10))).json()["job"]["image_id"]
+    assert wait_for(client, crashed) == {
+        "image_id": crashed, "status": "failed", "error": "Image processing worker crashed"
+    }
+    # Reading the image still works and does not resubmit the crashing job
+    assert client.get(f"/api/marketplace/images/{crashed}").status_code == 200
+    assert crashed not in store._jobs
+
+    monkeypatch.setattr(image_store_module, "render_variants", render_variants)
+    healthy = upload(client, product_id, jpeg((200, 200, 200))).json()["job"]["image_id"]
+    assert wait_for(client, healthy)["status"] == "done"
+
+
+def test_original_is_served_with_byte_ranges(client, store, product_id):
+    data = jpeg()
+    image_id = upload(client, product_id, data).json()["job"]["image_id"]
+    url = f"/api/marketplace/images/{image_id}"
+
+    whole = client.get(url, params={"variant": "original"})
+    assert whole.status_code == 200 and whole.content == data
+    assert whole.headers["accept-ranges"] == "bytes"
+
+    part = client.get(url, params={"variant": "original"}, headers={"Range": "bytes=10-19"})
+    assert part.status_code == 206
+    assert part.content == data[10:20]
+    assert part.headers["content-range"] == f"bytes 10-19/{len(data)}"
+
+    tail = client.get(url, params={"variant": "original"}, headers={"Range": "bytes=-5"})
+    assert tail.status_code == 206 and tail.content == data[-5:]
+
+    beyond = client.get(url, params={"variant": "original"}, headers={"Range": f"bytes={len(data)}-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == f"bytes */{len(data)}"
+
+    cached = client.get(url, params={"variant": "original"}, headers={"If-None-Match": whole.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_unknown_images_are_404(client, store):
+    assert client.get("/api/marketplace/images/" + "0" * 64).status_code == 404
+    assert client.get("/api/marketplace/images/not-a-digest/status").status_code == 404
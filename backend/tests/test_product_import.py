@@ -0,0 +1,57 @@
+import json
+
+HEADER = "name,description,price,category,seller_name,seller_phone,location,quantity_available,unit"
+
+
+def test_csv_import_reports_bad_rows_and_keeps_good_ones(client):
+    body = "\n".join([
+        HEADER,
+        'Basmati Rice,"Aged, long grain",95,grains,Kisan FPO,+91 90000 00001,"Karnal, Haryana",500,kg',
+        "Wheat,Sharbati,not-a-price,grains,Kisan FPO,+91 90000 00001,Sehore,300,kg",
+        "Jaggery,Organic,60,spices,Kisan FPO,+91 90000 00001,Kolhapur,,kg",
+        "Onion,Red,25,vegetables,Kisan FPO,+91 90000 00001,Nashik,900,kg,extra",
+        "Turmeric,Lakadong,180,spices,Kisan FPO,+91 90000 00001,Meghalaya,50,kg",
+    ])
+    response = client.post(
+        "/api/marketplace/products/import", content=body.encode(), headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 2 and report["failed"] == 3
+    # CSV rows are numbered from the header (row 1)
+    errors = {error["row"]: error["errors"] for error in report["errors"]}
+    assert sorted(errors) == [3, 4, 5]
+    assert any(message.startswith("price") for message in errors[3])
+    assert any(message.startswith("quantity_available") for message in errors[4])
+    assert errors[5] == ["Expected 9 columns, got 10"]
+
+    # Stored rows are searchable straight away
+    found = client.get("/api/marketplace/search", params={"q": "basmati"})
+    assert any(item["name"] == "Basmati Rice" for item in found.json())
+
+
+def test_ndjson_import_reports_unparseable_lines(client):
+    good = {
+        "name": "Honey", "description": "Wild forest honey", "price": 400, "category": "dairy",
+        "seller_name": "Van Dhan", "seller_phone": "+91 90000 00002", "location": "Bastar",
+        "quantity_available": 20, "unit": "kg"
+    }
+    body = "\n".join([json.dumps(good), "{not json", "[1, 2]", json.dumps({**good, "price": "free"})])
+    response = client.post(
+        "/api/marketplace/products/import", content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    report = response.json()
+    assert report["imported"] == 1 and report["failed"] == 3
+    errors = {error["row"]: error["errors"] for error in report["errors"]}
+    assert errors[2][0].startswith("Invalid JSON")
+    assert errors[3] == ["Each line must be a JSON object"]
+    assert errors[4][0].startswith("price")
+
+
+def test_csv_without_required_columns_is_rejected_outright(client):
+    response = client.post(
+        "/api/marketplace/products/import", content=b"name,price\nRice,40\n", headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 400
+    assert "missing columns" in response.json()["detail"]
@@ -0,0 +1,85 @@
+import pytest
+
+from app.api import marketplace
+from app.services.search_index import BM25Index
+
+NEW_PRODUCT = {
+    "name": "Alphonso Mangoes", "description": "Hand picked, carbide free", "price": 400, "category": "fruits",
+    "seller_name": "Test FPO", "seller_phone": "+91 90000 00000",
+    "location": "Ratnagiri, Maharashtra", "quantity_available": 10, "unit": "dozen"
+}
+
+
+@pytest.fixture
+def index():
+    index = BM25Index({"name": 3.0, "description": 1.0})
+    index.add("tomato", {"name": "Fresh Tomatoes", "description": "Red and ripe"})
+    index.add("chutney", {"name": "Mango Chutney", "description": "Made with tomato and mango"})
+    index.add("tomatillo", {"name": "Tomatillo", "description": "Green husk fruit"})
+    index.add("rice", {"name": "Basmati Rice", "description": "Aged two years"})
+    return index
+
+
+def test_name_matches_outrank_description_matches(index):
+    ranked = [doc_id for doc_id, _ in index.search("tomato")]
+    assert ranked[:2] == ["tomato", "chutney"]
+    assert "rice" not in ranked
+
+
+def test_plurals_match_their_singular(index):
+    assert index.search("tomatoes")[0][0] == "tomato"
+
+
+def test_prefixes_expand_at_a_lower_weight(index):
+    ranked = dict(index.search("toma"))
+    # Only prefix hits, so both tomato and tomatillo are found
+    assert {"tomato", "chutney", "tomatillo"} <= set(ranked)
+    # An exact word beats the same document reached by prefix
+    assert index.search("tomatillo")[0][1] > ranked["tomatillo"]
+    # One letter is too short to expand
+    assert index.search("t") == []
+
+
+def test_prefix_expansion_is_capped():
+    index = BM25Index({"name": 1.0}, max_prefix_terms=2)
+    for i, word in enumerate(["seeda", "seedb", "seedc"]):
+        index.add(i, {"name": word})
+    assert len(index.search("see")) == 2
+
+
+def test_removed_documents_stop_matching(index):
+    index.remove("tomato")
+    assert "tomato" not in dict(index.search("tomato"))
+    assert "tomato" not in index
+
+
+def test_created_products_are_searchable_and_indexed_once(client, monkeypatch):
+    indexed = []
+    real_add = marketplace.product_search._add
+    monkeypatch.setattr(marketplace.product_search, "_add", lambda product: (indexed.append(product["id"]), real_add(product)))
+
+    created = client.post("/api/marketplace/products", json=NEW_PRODUCT).json()
+    assert indexed == [created["id"]]
+    results = client.get("/api/marketplace/search", params={"q": "alphon"}).json()
+    assert results[0]["id"] == created["id"]
+
+    # Later syncs start after the stored row instead of tokenizing it again
+    client.post("/api/marketplace/products", json={**NEW_PRODUCT, "name": "Kesar Mangoes"})
+    assert len(indexed) == 2 and indexed.count(created["id"]) == 1
+
+
+def test_imported_products_are_indexed_once(client, monkeypatch):
+    indexed = []
+    real_add = marketplace.product_search._add
+    monkeypatch.setattr(marketplace.product_search, "_add", lambda product: (indexed.append(product["id"]), real_add(product)))
+
+    body = "\n".join(
+        '{"name": "%s", "description": "Test lot", "price": 50, "category": "grains", "seller_name": "Test FPO", '
+        '"seller_phone": "+91 90000 00000", "location": "Nashik, Maharashtra", "quantity_available": 5, "unit": "kg"}' % name
+        for name in ("Jowar", "Bajra")
+    )
+    response = client.post("/api/marketplace/products/import", content=body, params={"format": "ndjson"})
+    assert response.json()["imported"] == 2
+    assert len(indexed) == len(set(indexed)) == 2
+    client.get("/api/marketplace/search", params={"q": "jowar"})
+    assert len(indexed) == 2
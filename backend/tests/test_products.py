@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.storage
+from app.api import marketplace
+from app.storage.base import ProductExistsError
+
+
+def test_unknown_product_is_a_404(client):
+    response = client.get("/api/marketplace/products/nope")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Product not found"}
+
+
+def test_product_details_come_from_storage(client):
+    product_id = client.get("/api/marketplace/products", params={"limit": 1}).json()["items"][0]["id"]
+    response = client.get(f"/api/marketplace/products/{product_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == product_id
+
+
+NEW_PRODUCT = {
+    "name": "Test Tomatoes", "description": "Test lot", "price": 30, "category": "vegetables",
+    "seller_name": "Test FPO", "seller_phone": "+91 90000 00000",
+    "location": "Nashik, Maharashtra", "quantity_available": 10, "unit": "kg"
+}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_adding_a_taken_product_id_stores_nothing(backend, use_storage):
+    use_storage(backend)
+    storage = app.storage.get_storage()
+    await storage.start()
+    try:
+        product = {**NEW_PRODUCT, "id": "prod-abc123", "image_url": None, "created_at": "2024-01-01T00:00:00"}
+        await storage.add_products([product])
+        rival = {**product, "name": "Rival"}
+        fresh = {**product, "id": "prod-def456"}
+        with pytest.raises(ProductExistsError):
+            await storage.add_products([fresh, rival])
+        assert (await storage.get_product("prod-abc123"))["name"] == "Test Tomatoes"
+        assert await storage.get_product("prod-def456") is None
+        # Seeding still skips rows that exist
+        await storage.seed([rival])
+        assert (await storage.get_product("prod-abc123"))["name"] == "Test Tomatoes"
+    finally:
+        await storage.close()
+
+
+def test_create_product_draws_a_new_id_on_collision(client, monkeypatch):
+    hexes = iter(["abc123" + "0" * 26, "abc123" + "0" * 26, "fedcba" + "0" * 26])
+    monkeypatch.setattr(marketplace.uuid, "uuid4", lambda: SimpleNamespace(hex=next(hexes)))
+
+    first = client.post("/api/marketplace/products", json=NEW_PRODUCT)
+    assert first.json()["id"] == "prod-abc123"
+    second = client.post("/api/marketplace/products", json={**NEW_PRODUCT, "name": "Test Onions"})
+    assert second.status_code == 200
+    assert second.json()["id"] == "prod-fedcba"
+    assert client.get("/api/marketplace/products/prod-abc123").json()["name"] == "Test Tomatoes"
@@ -0,0 +1,82 @@
+import json
+import shutil
+
+import pytest
+
+import app.api.schemes  # noqa: F401  (registers the scheme schema)
+from app.services.catalogue import CatalogueError, CatalogueStore, catalogues
+
+
+def test_unknown_scheme_is_a_404(client):
+    response = client.get("/api/schemes/nope")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Scheme not found"}
+
+
+def test_scheme_details_come_from_the_catalogue(client):
+    scheme_id = client.get("/api/schemes/").json()[0]["id"]
+    response = client.get(f"/api/schemes/{scheme_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == scheme_id
+
+
+def test_eligibility_lists_verified_schemes_first(client):
+    response = client.post("/api/schemes/eligibility", json={"occupation": "farmer", "annual_income": 100000})
+    assert response.status_code == 200
+    schemes = {scheme["id"]: scheme for scheme in response.json()["schemes"]}
+    assert list(schemes) == ["ayushman-bharat", "pm-kisan"]
+    assert schemes["ayushman-bharat"]["verified"] and schemes["ayushman-bharat"]["missing_fields"] == []
+    # Land size is unknown: still listed, but flagged for follow-up
+    assert not schemes["pm-kisan"]["verified"]
+    assert schemes["pm-kisan"]["missing_fields"] == ["land_acres"]
+
+
+def test_eligibility_excludes_schemes_a_profile_fails(client):
+    profile = {"age": 16, "occupation": "Trader", "annual_income": 500000, "land_acres": 2}
+    schemes = client.post("/api/schemes/eligibility", json=profile).json()["schemes"]
+    assert schemes == []
+
+
+def test_batch_eligibility_matches_each_profile(client):
+    response = client.post("/api/schemes/eligibility/batch", json={"profiles": [
+        {"age": 30, "occupation": "artisan", "annual_income": 200000},
+        {"land_acres": 1.5, "occupation": "farmer"},
+        {"land_acres": 10, "occupation": "farmer", "annual_income": 500000},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"index": 0, "eligible_schemes": ["ayushman-bharat", "mudra-yojana"]},
+        {"index": 1, "eligible_schemes": ["pm-kisan", "ayushman-bharat"]},
+        {"index": 2, "eligible_schemes": []},
+    ]
+
+
+def test_batch_eligibility_can_be_limited_to_some_schemes(client):
+    response = client.post("/api/schemes/eligibility/batch", json={
+        "profiles": [{"land_acres": 1.5, "occupation": "farmer"}],
+        "scheme_ids": ["pm-kisan"],
+    })
+    assert response.json()["results"] == [{"index": 0, "eligible_schemes": ["pm-kisan"]}]
+
+    response = client.post("/api/schemes/eligibility/batch", json={
+        "profiles": [{}], "scheme_ids": ["pm-kisan", "nope"],
+    })
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("rules", [
+    {"ocupation": ["farmer"]},
+    {"age": 18},
+    {"age": {"min": 60, "max": 18}},
+    {"land_acres": {"min": 1, "maximum": 5}},
+    {"gender": "female"},
+])
+def test_malformed_eligibility_rules_fail_the_catalogue(tmp_path, rules):
+    shutil.copytree(catalogues.directory, tmp_path / "data")
+    path = tmp_path / "data" / "schemes.json"
+    schemes = json.loads(path.read_text())
+    path.write_text(json.dumps([{**schemes[0], "rules": rules}, *schemes[1:]]))
+    store = CatalogueStore(str(tmp_path / "data"))
+    store._schemas = catalogues._schemas
+    with pytest.raises(CatalogueError):
+        store.load()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+import pytest
+
+import main
+from app.services.catalogue import CatalogueError, CatalogueStore, catalogues
+from app.services.soil_vision import RETRY_AFTER, soil_image_classifier
+from scripts.soil_image_benchmark import render
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def client(use_storage):
+    use_storage("memory")
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            yield client
+
+
+def photo(soil_id: str) -> bytes:
+    profile = catalogues.snapshot.data["soil_types"][soil_id]["image_profile"]
+    return render(profile, (600, 800), np.random.default_rng(3))
+
+
+async def upload(client, data: bytes) -> httpx.Response:
+    return await client.post("/api/soil/image-analysis", files={"file": ("soil.jpg", data, "image/jpeg")})
+
+
+async def test_photo_is_classified_in_the_worker_pool(client):
+    response = await upload(client, photo("black"))
+    assert response.status_code == 200, response.text
+    assert response.json()["detected_soil_type"] == "black"
+    assert soil_image_classifier.pending == 0
+
+
+async def test_uploads_beyond_capacity_get_503_with_retry_after(client, monkeypatch):
+    # One worker and one queue slot; the worker is held busy until released
+    monkeypatch.setattr(soil_image_classifier, "workers", 1)
+    monkeypatch.setattr(soil_image_classifier, "max_queue", 1)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(soil_image_classifier, "_pool", pool)
+    release = threading.Event()
+    pool.submit(release.wait)
+    try:
+        data = photo("clay")
+        admitted = [asyncio.create_task(upload(client, data)) for _ in range(2)]
+        while soil_image_classifier.pending < 2:
+            await asyncio.sleep(0.01)
+
+        rejected = await upload(client, data)
+        assert rejected.status_code == 503
+        assert rejected.headers["retry-after"] == str(RETRY_AFTER)
+    finally:
+        release.set()
+
+    assert [response.status_code for response in await asyncio.gather(*admitted)] == [200, 200]
+    assert soil_image_classifier.pending == 0
+    assert (await upload(client, data)).status_code == 200
+
+
+async def test_soil_type_removed_during_analysis_asks_for_a_retry(client, monkeypatch):
+    async def analyze(upload):
+        return {"soil_type": "removed-by-reload", "features": {}}
+
+    monkeypatch.setattr(soil_image_classifier, "analyze", analyze)
+    response = await upload(client, photo("black"))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(RETRY_AFTER)
+
+
+def test_catalogue_without_image_profiles_is_rejected(tmp_path):
+    shutil.copytree(catalogues.directory, tmp_path / "data")
+    path = tmp_path / "data" / "soil_types.json"
+    soil_types = json.loads(path.read_text())
+    for soil in soil_types.values():
+        soil.pop("image_profile", None)
+    path.write_text(json.dumps(soil_types))
+    store = CatalogueStore(str(tmp_path / "data"))
+    store._schemas = catalogues._schemas
+    with pytest.raises(CatalogueError, match="image_profile"):
+        store.load()
@@ -0,0 +1,54 @@
+import copy
+
+import pytest
+from pydantic import ValidationError
+
+from app.api.health import SymptomCatalogue
+from app.services.catalogue import catalogues
+
+CASES = [
+    {"symptoms": ["mild fever", "chest pain"]},
+    {"symptoms": ["no fever", "cough"]},
+    {"symptoms": ["fever"]},
+    {"symptoms": ["fever"], "age": 0},
+    {"symptoms": ["bukhar", "sar dard"], "age": 34},
+    {"symptoms": ["something unheard of"]},
+]
+
+
+def check(client, case):
+    response = client.post("/api/health/symptom-check", json=case)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_red_flag_wins_over_mild_symptoms(client):
+    result = check(client, {"symptoms": ["mild fever", "chest pain"]})
+    assert result["emergency"] is True
+    assert "chest-pain" in [flag["id"] for flag in result["red_flags"]]
+
+
+def test_negated_symptom_is_dropped(client):
+    result = check(client, {"symptoms": ["no fever", "cough"]})
+    assert "fever" not in result["matched_symptoms"]
+    assert "cough" in result["matched_symptoms"]
+
+
+def test_age_bounded_flag_needs_an_age(client):
+    assert "infant-fever" not in [flag["id"] for flag in check(client, {"symptoms": ["fever"]})["red_flags"]]
+    infant = check(client, {"symptoms": ["fever"], "age": 0})
+    assert "infant-fever" in [flag["id"] for flag in infant["red_flags"]]
+
+
+def test_batch_matches_single_checks(client):
+    response = client.post("/api/health/symptom-check/batch", json={"cases": CASES})
+    assert response.status_code == 200, response.text
+    results = [{key: value for key, value in result.items() if key != "index"} for result in response.json()["results"]]
+    assert results == [check(client, case) for case in CASES]
+
+
+def test_red_flag_without_symptoms_is_rejected():
+    catalogue = copy.deepcopy(catalogues.load().data["symptom_checker"])
+    catalogue["red_flags"][0]["symptoms"] = []
+    with pytest.raises(ValidationError, match="red_flags.0.symptoms"):
+        SymptomCatalogue.model_validate(catalogue)
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.telemedicine import CLINIC_TZ, WEEKDAYS, TelemedicineScheduler
+from app.storage import get_storage
+
+
+def next_weekday_at(hour: int, minute: int = 0) -> datetime:
+    day = datetime.now(CLINIC_TZ) + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+def book(client, preferred: datetime, **params):
+    return client.post("/api/health/book-consultation", params={
+        "patient_name": "Sita", "phone": "9876543210", "symptoms": "fever",
+        "preferred_time": preferred.isoformat(), **params,
+    })
+
+
+def test_unknown_specialty_is_rejected_instead_of_waitlisted(client):
+    response = book(client, next_weekday_at(10), specialty="nonexistent")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "No doctor with this specialty"}
+
+
+def test_specialty_the_chosen_doctor_lacks_is_rejected(client):
+    response = book(client, next_weekday_at(10), specialty="Paediatrics", doctor_id="dr-anita-sharma")
+    assert response.status_code == 404
+
+
+def test_known_specialty_is_matched_case_insensitively(client):
+    response = book(client, next_weekday_at(10), specialty="paediatrics")
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+    assert response.json()["doctor_id"] == "dr-suresh-patil"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def storage(request, use_storage):
+    use_storage(request.param)
+    storage = get_storage()
+    await storage.start()
+    yield storage
+    await storage.close()
+
+
+def roster(*doctors: tuple) -> dict:
+    """Doctors working one shift tomorrow only: (id, specialty, opens, closes)"""
+    day = WEEKDAYS[tomorrow_at(0).weekday()]
+    return {
+        doctor_id: {"name": doctor_id, "specialty": specialty, "hours": {day: [[opens, closes]]}}
+        for doctor_id, specialty, opens, closes in doctors
+    }
+
+
+def tomorrow_at(hour: int, minute: int = 0) -> datetime:
+    day = datetime.now(CLINIC_TZ) + timedelta(days=1)
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+async def scheduler_for(storage, doctors: dict) -> TelemedicineScheduler:
+    scheduler = TelemedicineScheduler()
+    scheduler.install(doctors, await scheduler.compile(doctors, storage))
+    return scheduler
+
+
+async def book_at(scheduler, storage, preferred: datetime, name: str = "Sita", **params) -> dict:
+    return await scheduler.book(storage, {"patient_name": name, "phone": "9876543210", "symptoms": "fever"},
+                                preferred.timestamp(), **params)
+
+
+def starts_at(booking: dict) -> datetime:
+    return datetime.fromtimestamp(booking["start_ts"], CLINIC_TZ)
+
+
+@pytest.mark.anyio
+async def test_bookings_take_the_nearest_free_slot(storage):
+    scheduler = await scheduler_for(storage, roster(("dr-a", "General", "09:00", "12:00")))
+    first = await book_at(scheduler, storage, tomorrow_at(10, 7))
+    assert starts_at(first) == tomorrow_at(10)
+    # 09:45 and 10:15 are equally near: the later one wins, then the other
+    second = await book_at(scheduler, storage, tomorrow_at(10))
+    third = await book_at(scheduler, storage, tomorrow_at(10))
+    assert (starts_at(second), starts_at(third)) == (tomorrow_at(10, 15), tomorrow_at(9, 45))
+    # Outside the shift: the nearest slot inside it
+    assert starts_at(await book_at(scheduler, storage, tomorrow_at(18))) == tomorrow_at(11, 45)
+
+
+@pytest.mark.anyio
+async def test_past_preferred_time_gets_the_earliest_future_slot(storage):
+    scheduler = await scheduler_for(storage, roster(("dr-a", "General", "09:00", "12:00")))
+    booking = await book_at(scheduler, storage, tomorrow_at(9) - timedelta(days=3))
+    assert booking["status"] == "confirmed"
+    assert starts_at(booking) == tomorrow_at(9)
+
+
+@pytest.mark.anyio
+async def test_cancellation_promotes_the_first_waitlisted_patient(storage):
+    scheduler = await scheduler_for(storage, roster(
+        ("dr-a", "General", "09:00", "09:30"), ("dr-b", "Paediatrics", "09:00", "09:15")
+    ))
+    confirmed = [await book_at(scheduler, storage, tomorrow_at(9), specialty="General") for _ in range(2)]
+    child = await book_at(scheduler, storage, tomorrow_at(9), specialty="Paediatrics")
+    waiting = [
+        await book_at(scheduler, storage, tomorrow_at(9), name="Later child", specialty="Paediatrics"),
+        await book_at(scheduler, storage, tomorrow_at(9), name="First", specialty="General"),
+        await book_at(scheduler, storage, tomorrow_at(9), name="Second", specialty="General"),
+    ]
+    assert [b["status"] for b in waiting] == ["waitlisted"] * 3
+
+    await scheduler.cancel(storage, confirmed[0]["booking_id"])
+    promoted, *still_waiting = [await storage.get_booking(b["booking_id"]) for b in waiting[1:]]
+    assert promoted["status"] == "confirmed"
+    assert (promoted["doctor_id"], promoted["start_ts"]) == (confirmed[0]["doctor_id"], confirmed[0]["start_ts"])
+    assert [b["status"] for b in still_waiting] == ["waitlisted"]
+    # A General slot freeing up does not move the paediatrics waitlist
+    assert (await storage.get_booking(waiting[0]["booking_id"]))["status"] == "waitlisted"
+
+    await scheduler.cancel(storage, child["booking_id"])
+    assert (await storage.get_booking(waiting[0]["booking_id"]))["status"] == "confirmed"
+
+
+@pytest.mark.anyio
+async def test_slot_taken_by_another_worker_moves_to_the_next_nearest(use_storage):
+    use_storage("sqlite")
+    storage = get_storage()
+    await storage.start()
+    try:
+        doctors = roster(("dr-a", "General", "09:00", "10:00"))
+        # Two workers with calendars compiled before either booked
+        worker_a, worker_b = await scheduler_for(storage, doctors), await scheduler_for(storage, doctors)
+        first = await book_at(worker_a, storage, tomorrow_at(9))
+        second = await book_at(worker_b, storage, tomorrow_at(9))
+        assert starts_at(first) == tomorrow_at(9)
+        # Storage refused 09:00 to the second worker, which then took the next slot
+        assert second["status"] == "confirmed"
+        assert starts_at(second) == tomorrow_at(9, 15)
+        assert len(await storage.list_bookings("confirmed")) == 2
+    finally:
+        await storage.close()
@@ -0,0 +1,149 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import weather
+from app.services import weather_alerts
+from app.services.weather_alerts import AlertHub, SubscriberLimitError
+
+pytestmark = pytest.mark.anyio
+
+CALM = {"temperature": 30.0, "wind_speed": 10.0, "description": "clear sky"}
+STORM = {"temperature": 30.0, "wind_speed": 55.0, "description": "thunderstorm"}
+
+
+class FakeWeather:
+    """Fetch stand-in: returns the conditions set per location and counts calls"""
+
+    def __init__(self):
+        self.conditions = {}
+        self.calls = []
+
+    async def __call__(self, location: str):
+        self.calls.append(location)
+        return SimpleNamespace(location=location.title(), **self.conditions.get(location.lower(), CALM))
+
+
+@pytest.fixture
+def fetch(monkeypatch):
+    monkeypatch.setattr(weather_alerts, "ALERT_INTERVAL", 0.01)
+    return FakeWeather()
+
+
+@pytest.fixture
+async def hub(fetch):
+    hub = AlertHub(fetch, key=lambda location: location.strip().lower())
+    yield hub
+    await hub.stop()
+
+
+async def next_event(subscription, timeout: float = 1):
+    return await asyncio.wait_for(subscription.queue.get(), timeout)
+
+
+async def test_subscribers_share_one_poller_per_location(hub, fetch):
+    subscriptions = [hub.subscribe(["Pune"]), hub.subscribe([" pune"]), hub.subscribe(["PUNE", "Nashik"])]
+    assert hub.stats()["locations"] == 2
+    for subscription in subscriptions:
+        assert (await next_event(subscription))["location"] == "Pune"
+    await asyncio.sleep(0.1)
+
+    pune_calls = [location for location in fetch.calls if location.strip().lower() == "pune"]
+    nashik_calls = [location for location in fetch.calls if location == "Nashik"]
+    # Three subscribers, yet Pune is polled at Nashik's pace
+    assert abs(len(pune_calls) - len(nashik_calls)) <= 1
+    assert len([feed for feed in hub._feeds.values() if feed.task is not None]) == 2
+
+
+async def test_repeated_conditions_are_sent_once(hub, fetch):
+    subscription = hub.subscribe(["Pune"])
+    first = await next_event(subscription)
+    assert first["alerts"] == {"rain": False, "heat": False, "wind": False}
+    assert first["changed"] == []
+
+    await asyncio.sleep(0.1)
+    assert len(fetch.calls) > 3
+    assert subscription.queue.empty()
+
+    fetch.conditions["pune"] = STORM
+    changed = await next_event(subscription)
+    assert changed["changed"] == ["rain", "wind"]
+    await asyncio.sleep(0.1)
+    assert subscription.queue.empty()
+
+
+async def test_late_subscribers_get_the_current_state(hub, fetch):
+    fetch.conditions["pune"] = STORM
+    early = hub.subscribe(["Pune"])
+    event = await next_event(early)
+    late = hub.subscribe(["Pune"])
+    assert late.queue.get_nowait() is event
+
+
+async def test_last_unsubscribe_cancels_the_poller(hub, fetch):
+    first, second = hub.subscribe(["Pune"]), hub.subscribe(["Pune"])
+    task = hub._feeds["pune"].task
+
+    hub.unsubscribe(first)
+    await asyncio.sleep(0.05)
+    assert not task.done()
+
+    hub.unsubscribe(second)
+    await asyncio.sleep(0)
+    assert task.cancelled()
+    assert hub.stats() == {"locations": 0, "subscribers": {}}
+    calls = len(fetch.calls)
+    await asyncio.sleep(0.05)
+    assert len(fetch.calls) == calls
+
+
+async def test_full_locations_refuse_new_subscribers(hub, monkeypatch):
+    monkeypatch.setattr(weather_alerts, "ALERT_MAX_SUBSCRIBERS", 2)
+    hub.subscribe(["Pune"])
+    hub.subscribe(["Pune"])
+    with pytest.raises(SubscriberLimitError):
+        hub.subscribe(["Nashik", "Pune"])
+    # Nothing was half-subscribed
+    assert hub.stats()["subscribers"] == {"Pune": 2}
+
+
+async def test_slow_clients_keep_the_latest_events(monkeypatch):
+    monkeypatch.setattr(weather_alerts, "ALERT_QUEUE_SIZE", 2)
+    subscription = weather_alerts.Subscription()
+    for i in range(5):
+        subscription.push({"n": i})
+    assert subscription.dropped == 3
+    assert [subscription.queue.get_nowait()["n"] for _ in range(2)] == [3, 4]
+
+
+async def test_stream_sends_events_and_unsubscribes_on_disconnect(hub, fetch, monkeypatch):
+    monkeypatch.setattr(weather, "alert_hub", hub)
+    monkeypatch.setattr(weather, "WEATHER_ALERT_HEARTBEAT", 0.05)
+    fetch.conditions["pune"] = STORM
+
+    response = await weather.stream_weather_alerts("Pune, Pune")
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    body = response.body_iterator
+    event = await anext(body)
+    assert event.startswith("event: alert\ndata: ") and '"thunderstorm"' in event
+    assert await anext(body) == ": ping\n\n"
+    assert hub.stats()["subscribers"] == {"Pune": 1}
+
+    task = hub._feeds["pune"].task
+    await body.aclose()
+    await asyncio.sleep(0)
+    assert hub.stats()["locations"] == 0
+    assert task.cancelled()
+
+
+async def test_stream_validates_locations(monkeypatch):
+    with pytest.raises(HTTPException) as empty:
+        await weather.stream_weather_alerts(" , ")
+    assert empty.value.status_code == 400
+    monkeypatch.setattr(weather, "WEATHER_ALERT_MAX_LOCATIONS", 2)
+    with pytest.raises(HTTPException) as too_many:
+        await weather.stream_weather_alerts("Pune,Nashik,Nagpur")
+    assert too_many.value.status_code == 400
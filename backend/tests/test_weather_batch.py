@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import weather
+from app.utils.cache import TTLCache
+
+
+class FakeUpstream:
+    """Stands in for the OpenWeatherMap fetches, recording calls and concurrency"""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.missing = {"Atlantis"}
+        self.broken = set()
+
+    async def _call(self, kind: str, location: str):
+        self.calls.append((kind, location))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if location in self.missing:
+            raise HTTPException(status_code=404, detail=f"Location '{location}' not found")
+        if location in self.broken:
+            raise RuntimeError("connection reset")
+
+    async def current(self, location: str):
+        await self._call("current", location)
+        return weather.WeatherResponse(
+            location=location, country="IN", temperature=30, feels_like=32,
+            humidity=50, description="clear sky", wind_speed=8, pressure=1010
+        )
+
+    async def forecast(self, location: str, days: int):
+        await self._call("forecast", location)
+        return weather.ForecastResponse(location=location, forecast=[
+            weather.ForecastDay(date=f"2024-06-0{day + 1}", temperature_max=34, temperature_min=24,
+                                description="clear sky", humidity=50)
+            for day in range(days)
+        ])
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    upstream = FakeUpstream()
+    monkeypatch.setattr(weather, "fetch_current_weather", upstream.current)
+    monkeypatch.setattr(weather, "fetch_weather_forecast", upstream.forecast)
+    monkeypatch.setattr(weather, "current_weather_cache", TTLCache("current-test", ttl=600))
+    monkeypatch.setattr(weather, "forecast_cache", TTLCache("forecast-test", ttl=600))
+    return upstream
+
+
+def test_repeated_and_alias_names_are_fetched_once(client, upstream):
+    response = client.post("/api/weather/batch", json={
+        "locations": ["Mumbai", "Bombay", " mumbai ", "Pune", "Poona", "", "Nashik"],
+        "include_forecast": True, "days": 3,
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    # First spelling wins and the caller's order is kept
+    assert [item["location"] for item in results] == ["Mumbai", "Pune", "Nashik"]
+    assert sorted(upstream.calls) == sorted(
+        (kind, city) for kind in ("current", "forecast") for city in ("Mumbai", "Pune", "Nashik")
+    )
+    assert all(len(item["forecast"]["forecast"]) == 3 for item in results)
+
+
+def test_one_failing_city_does_not_fail_the_batch(client, upstream):
+    upstream.broken.add("Nagpur")
+    response = client.post("/api/weather/batch", json={
+        "locations": ["Pune", "Atlantis", "Nagpur"], "include_forecast": True
+    })
+    assert response.status_code == 200
+    pune, atlantis, nagpur = response.json()["results"]
+    assert pune["errors"] == {} and pune["current"]["temperature"] == 30 and pune["forecast"]
+    assert atlantis["current"] is None and atlantis["forecast"] is None
+    assert atlantis["errors"] == {
+        "current": "Location 'Atlantis' not found", "forecast": "Location 'Atlantis' not found"
+    }
+    assert nagpur["errors"]["current"] == "Weather service unavailable"
+
+
+def test_upstream_calls_are_bounded(client, upstream, monkeypatch):
+    monkeypatch.setattr(weather, "WEATHER_BATCH_CONCURRENCY", 3)
+    cities = weather.INDIAN_CITIES[:12]
+    response = client.post("/api/weather/batch", json={"locations": cities, "include_forecast": True})
+    assert len(response.json()["results"]) == 12
+    assert len(upstream.calls) == 24
+    assert upstream.peak == 3
+
+
+def test_cached_cities_are_not_fetched_again(client, upstream):
+    client.post("/api/weather/batch", json={"locations": ["Pune"]})
+    client.post("/api/weather/batch", json={"locations": ["Poona", "Nashik"]})
+    assert upstream.calls == [("current", "Pune"), ("current", "Nashik")]
+
+
+def test_batches_are_limited_after_deduplication(client, upstream, monkeypatch):
+    monkeypatch.setattr(weather, "WEATHER_BATCH_MAX_LOCATIONS", 2)
+    too_many = client.post("/api/weather/batch", json={"locations": ["Pune", "Nashik", "Nagpur"]})
+    assert too_many.status_code == 400
+    assert too_many.json() == {"detail": "At most 2 locations per batch"}
+    assert upstream.calls == []
+
+    duplicates = client.post("/api/weather/batch", json={"locations": ["Pune", "Poona", "PUNE", "Nashik"]})
+    assert duplicates.status_code == 200
+    assert len(duplicates.json()["results"]) == 2
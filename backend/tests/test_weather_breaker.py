@@ -0,0 +1,59 @@
+import httpx
+import pytest
+
+from app.api import weather
+from app.utils import http_client
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from scripts import openweather_stub
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stub(monkeypatch):
+    """Route OpenWeatherMap calls to the local stub app, with a fresh breaker and cache"""
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "stub")
+    monkeypatch.setattr(weather, "OPENWEATHER_BASE_URL", "http://stub/data/2.5")
+    monkeypatch.setattr(weather, "openweather_breaker", CircuitBreaker(
+        "openweather-test", min_calls=3, failure_ratio=0.5, open_seconds=60
+    ))
+    # ttl 0: every request goes upstream, so failures are not hidden by fresh hits
+    monkeypatch.setattr(weather, "current_weather_cache", TTLCache("current-test", ttl=0))
+    monkeypatch.setattr(openweather_stub, "settings", {"latency": 0.0, "error_rate": 0.0, "status": 500})
+    monkeypatch.setattr(openweather_stub, "calls", {"total": 0, "failed": 0})
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=openweather_stub.app))
+    monkeypatch.setattr(http_client, "_client", client)
+    yield openweather_stub
+    await client.aclose()
+
+
+async def test_breaker_opens_and_last_good_value_is_served_stale(stub):
+    fresh = await weather.cached_current_weather("Pune")
+    assert fresh.stale is False and fresh.temperature == 29.4
+
+    # Upstream starts rate limiting every call
+    stub.settings.update(error_rate=1.0, status=429)
+    for _ in range(2):
+        fallback = await weather.cached_current_weather("Pune")
+        assert fallback.stale is True
+    assert weather.openweather_breaker.state == CircuitBreaker.OPEN
+
+    # While open, requests fail fast without reaching the upstream
+    upstream_calls = stub.calls["total"]
+    fallback = await weather.cached_current_weather("Pune")
+    assert stub.calls["total"] == upstream_calls
+    assert weather.openweather_breaker.rejected == 1
+    assert fallback.stale is True
+    assert fallback.data_age_seconds is not None and fallback.data_age_seconds >= 0
+    assert fallback.temperature == fresh.temperature
+
+
+async def test_without_a_cached_value_the_open_circuit_is_a_503(stub):
+    stub.settings.update(error_rate=1.0, status=429)
+    for _ in range(3):
+        with pytest.raises(weather.HTTPException):
+            await weather.cached_current_weather("Nashik")
+    with pytest.raises(weather.HTTPException) as error:
+        await weather.cached_current_weather("Nashik")
+    assert error.value.status_code == 503